@@ -15,60 +15,12 @@ Sortie : kiviat_prompt.html (ouvre auto).
 
 from __future__ import annotations
 import argparse, pathlib, webbrowser, random
-import plotly.graph_objects as go
 import pandas as pd
 from wikipedia_scoring_pipeline import compute_scores
+from radar import build_radar
 
 BASE_COLORS = ["#EF553B", "#636EFA", "#00CC96", "#AB63FA", "#FFA15A", "#19D3F3"]
 
-def build_radar(df: pd.DataFrame, sensitivity_scores: pd.Series) -> go.Figure:
-    categories = ["Heat", "Risk", "Quality (penalty)"]
-    fig = go.Figure()
-
-    # traces radar (inchangé)
-    for i, (idx, row) in enumerate(df.iterrows()):
-        color = BASE_COLORS[i % len(BASE_COLORS)]
-        q_pen = min(1, abs(row["quality"]))
-        r_vals = [row["heat"], row["risk"], q_pen, row["heat"]]
-        fig.add_trace(go.Scatterpolar(
-            r=r_vals,
-            theta=categories + [categories[0]],
-            fill='toself',
-            name=idx,
-            line=dict(color=color, width=3),
-            marker=dict(color=color, size=8),
-            opacity=0.6 + 0.1*(i%3),
-            hoverinfo='text',
-            hovertext=f"Heat: {row['heat']:.2f}<br>Risk: {row['risk']:.2f}<br>Quality: {row['quality']:.2f}"
-        ))
-
-    # annotations de sensibilité
-    for i, (idx, score) in enumerate(sensitivity_scores.items()):
-        fig.add_annotation(
-            x=0,  y=0.9 - i*0.1,   # x=0 pour être juste sur la marge gauche
-            xref="paper", yref="paper",
-            text=f"{idx} Sensitivity : {score:.2f}",
-            showarrow=False,
-            font=dict(size=12, color=BASE_COLORS[i % len(BASE_COLORS)]),
-            bgcolor="rgba(255,255,255,0.6)",
-            xanchor="left", yanchor="middle",
-            opacity=0.8
-        )
-
-    # mise en page avec marge élargie
-    fig.update_layout(
-        margin=dict(l=150, r=50, t=80, b=80),
-        polar=dict(
-            radialaxis=dict(range=[0, 1], showticklabels=True, dtick=0.2,
-                            gridcolor="lightgrey", gridwidth=1, tickfont=dict(size=12)),
-            angularaxis=dict(rotation=90, direction="clockwise")
-        ),
-        template="plotly_white",
-        title="Diagramme de Kiviat – Scores Heat / Risk / Quality",
-        legend=dict(orientation="h", yanchor="bottom", y=-0.15, xanchor="center", x=0.5)
-    )
-    return fig
-
 
 def main():
     ap = argparse.ArgumentParser(description="Radar chart des scores Wikipédia PROMPT")
@@ -88,7 +40,9 @@ def main():
 
     sensitivity_scores = scores.sensitivity
 
-    fig = build_radar(df, sensitivity_scores)
+    fig = build_radar(df, sensitivity_scores,
+                      title="Diagramme de Kiviat – Scores Heat / Risk / Quality",
+                      colors=BASE_COLORS, template="plotly_white", colored_notes=True)
     outfile = pathlib.Path(ns.outfile).with_suffix(".html").resolve()
     fig.write_html(outfile, include_plotlyjs="cdn")
     print(f"Diagramme de Kiviat enregistré dans {outfile}")
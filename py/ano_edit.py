@@ -12,24 +12,31 @@ Fonction clé
 
 Retourne une `pd.Series` *ratio* (0‑1) d’éditions anonymes.
 
+`get_anon_edit_daily(title, start, end, lang)` donne les comptes quotidiens
+(anon, total) d’un article, pour les séries glissantes (`sensitivity_series`).
+
 Implémentation :
   * Requêtes paginées à l’API MediaWiki (`prop=revisions`).
   * Compte les révisions où le champ `anon` est présent.
-  * Respecte les limites de l’API (`rvlimit=max`, pauses 100 ms entre pages).
+  * Respecte les limites de l’API (`rvlimit=max`, budget par wiki via `wiki_http`).
+  * Pagination bornée à `PAGE_BUDGET` secondes par article ; un article
+    hors budget ou en erreur vaut NaN (manquant), sans interrompre les autres.
 """
 
 from __future__ import annotations
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
+import sys
 import pandas as pd
-import requests, time
+import wiki_http
 
 UA = "AnonEditStatBot/1.1 (opsci)"
-_SESSION = requests.Session()
-_SESSION.headers.update({"User-Agent": UA})
+_HEADERS = {"User-Agent": UA}
+PAGE_BUDGET = 30.0           # secondes de pagination max par article
 
 
-def _anon_share_single(title: str, start: str, end: str, lang: str) -> Tuple[float, int, int]:
-    """Retourne (ratio, nb_anon, nb_total)."""
+def _revisions(title: str, start: str, end: str, lang: str,
+               budget: float = PAGE_BUDGET) -> Iterator[dict]:
+    """Révisions de `title` entre `start` et `end` (inclus), les plus récentes d’abord."""
     api = f"https://{lang}.wikipedia.org/w/api.php"
     params = {
         "action": "query",
@@ -41,32 +48,57 @@ def _anon_share_single(title: str, start: str, end: str, lang: str) -> Tuple[flo
         "rvprop": "user|flags|timestamp",
         "rvlimit": "max",
     }
+    with wiki_http.deadline(budget):
+        while True:
+            r = wiki_http.get(api, params=params, headers=_HEADERS, timeout=30)
+            r.raise_for_status()
+            data = r.json()
+            for page in data.get("query", {}).get("pages", {}).values():
+                yield from page.get("revisions", [])
+            if "continue" in data:
+                params.update(data["continue"])
+            else:
+                break
+
+
+def _anon_share_single(title: str, start: str, end: str, lang: str) -> Tuple[float, int, int]:
+    """Retourne (ratio, nb_anon, nb_total)."""
     total = anon = 0
-    while True:
-        r = _SESSION.get(api, params=params, timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        for page in data.get("query", {}).get("pages", {}).values():
-            for rev in page.get("revisions", []):
-                total += 1
-                if "anon" in rev:
-                    anon += 1
-        if "continue" in data:
-            params.update(data["continue"])
-        else:
-            break
+    for rev in _revisions(title, start, end, lang):
+        total += 1
+        if "anon" in rev:
+            anon += 1
     ratio = anon / total if total else 0.0
     return ratio, anon, total
 
 
+def get_anon_edit_daily(title: str, start: str, end: str, lang: str = "en",
+                        budget: float = PAGE_BUDGET) -> pd.DataFrame:
+    """
+    Comptes quotidiens `[anon, total]` (index : jours de `start` à `end`,
+    0 les jours sans révision). Lève en cas d’échec ou de budget dépassé.
+    """
+    days = pd.date_range(start, end, freq="D")
+    revs = [(rev["timestamp"][:10], "anon" in rev) for rev in _revisions(title, start, end, lang, budget)]
+    if not revs:
+        return pd.DataFrame(0, index=days, columns=["anon", "total"])
+    df = pd.DataFrame(revs, columns=["day", "anon"])
+    out = df.groupby(pd.to_datetime(df["day"]))["anon"].agg(anon="sum", total="size")
+    return out.reindex(days, fill_value=0).astype("int64")
+
+
 def get_anon_edit_share(pages: List[str], start: str, end: str, lang: str = "en") -> pd.Series:
-    """pd.Series ratio anon/total (0-1)."""
+    """pd.Series ratio anon/total (0-1) ; NaN si l’article n’a pu être compté."""
     shares = {}
     for p in pages:
-        ratio, _, _ = _anon_share_single(p, start, end, lang)
+        try:
+            with wiki_http.page_scope():
+                ratio, _, _ = _anon_share_single(p, start, end, lang)
+        except Exception as e:
+            print(f"⚠️  {p} : révisions indisponibles ({e})", file=sys.stderr)
+            ratio = float("nan")
         shares[p] = ratio
-        time.sleep(0.1)  # politesse API
-    return pd.Series(shares, name="anon_share")
+    return pd.Series(shares, name="anon_share", dtype=float)
 
 
 # ─────────────────────────── CLI rapide ─────────────────────────
@@ -3,15 +3,22 @@
 from __future__ import annotations
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from gaph_1 import fetch_pageviews
-from graph_2 import fetch_pageedits
-from wikipedia_scoring_pipeline import compute_scores
+from gaph_1 import fetch_pageviews, fetch_pageviews_peaks
+from graph_2 import fetch_pageedits, fetch_pageedits_peaks
+import jobs
+from jobs_ui import show_job
+from wikipedia_scoring_pipeline import score_metrics, MODEL
+from weights_ui import weight_sliders, normalization_choice
+from timeseries import pick_granularity
+from sensitivity_series import adhoc_panel
+from charts import line_chart
+from radar import build_radar, build_radar_grid
+
+SCORING_DEADLINE = 60        # secondes : au-delà, les pages restantes sont marquées manquantes
 
 # ── 1. Styles & Fonts ───────────────────────────────────────────
 def inject_styles():
@@ -34,57 +41,7 @@ def inject_styles():
         """, unsafe_allow_html=True
     )
 
-# ── 2. Radar Builder ────────────────────────────────────────────
-BASE_COLORS = ["#edff00", "#6dff00", "#9100ff", "#ff00ed", "#00ecff", "#e2e2e2"]
-def build_radar(df: pd.DataFrame, sensitivity: pd.Series, title: str) -> go.Figure:
-    categories = ["Heat", "Risk", "Quality (penalty)"]
-    fig = go.Figure()
-    for i, (idx, row) in enumerate(df.iterrows()):
-        color = BASE_COLORS[i % len(BASE_COLORS)]
-        q_pen = min(1, abs(row["quality"]))
-        vals = [row["heat"], row["risk"], q_pen, row["heat"]]
-        fig.add_trace(go.Scatterpolar(
-            r=vals,
-            theta=categories + [categories[0]],
-            fill='toself',
-            name=idx,
-            line=dict(color=color, width=3),
-            marker=dict(color=color, size=8),
-            opacity=0.6 + 0.1*(i%3),
-            hoverinfo='text',
-            hovertext=(
-                f"Heat: {row['heat']:.2f}<br>"
-                f"Risk: {row['risk']:.2f}<br>"
-                f"Quality: {row['quality']:.2f}"
-            )
-        ))
-    for i, (idx, score) in enumerate(sensitivity.items()):
-        fig.add_annotation(
-            x=0, y=0.9 - i*0.1, xref="paper", yref="paper",
-            text=f"{idx} – Sensitivity: {score:.2f}",
-            showarrow=False,
-            font=dict(family="Inria Sans", size=12, color="black"),
-            bgcolor="rgba(255,255,255,0.6)",
-            xanchor="left", yanchor="middle"
-        )
-    fig.update_layout(
-        title=dict(text=title, font=dict(family="Inria Sans", color="black")),
-        font=dict(family="Inria Sans", color="black"),
-        paper_bgcolor='white', plot_bgcolor='white',
-        margin=dict(l=150, r=50, t=80, b=80),
-        polar=dict(
-            radialaxis=dict(range=[0,1], dtick=0.2, gridcolor="lightgrey",
-                            gridwidth=1, tickfont=dict(family="Inria Sans", color="black")),
-            angularaxis=dict(rotation=90, direction="clockwise",
-                              tickfont=dict(family="Inria Sans", color="black"))
-        ),
-        legend=dict(font=dict(family="Inria Sans", color="black"),
-                    orientation="h", yanchor="bottom", y=-0.15,
-                    xanchor="center", x=0.5)
-    )
-    return fig
-
-# ── 3. Param Form (UI Principale) ─────────────────────────────────
+# ── 2. Param Form (UI Principale) ─────────────────────────────────
 def param_form() -> dict:
     with st.form("param_form"):
         pages_input = st.text_area(
@@ -109,7 +66,7 @@ def param_form() -> dict:
 
         graph_choice = st.selectbox(
             "Type de graphique",
-            ["Évolution pages vues", "Évolution éditions", "Sensibilité (radar)"]
+            ["Évolution pages vues", "Évolution éditions", "Sensibilité (radar)", "Tendance sensibilité"]
         )
 
         compare_mode: Optional[str] = None
@@ -136,36 +93,71 @@ def param_form() -> dict:
         "submitted": submitted
     }
 
-# ── 4. Mode Handlers ─────────────────────────────────────────────
+# ── 3. Mode Handlers ─────────────────────────────────────────────
+# Longues périodes : vue d'ensemble mensuelle + détail quotidien autour des pics
 def show_pageviews(params: dict):
-    df = fetch_pageviews(
-        params['site'], params['pages'],
-        params['start_date'].isoformat(), params['end_date'].isoformat()
-    )
-    fig = px.line(
+    start, end = params['start_date'].isoformat(), params['end_date'].isoformat()
+    granularity = pick_granularity(start, end, "overview")
+    df = fetch_pageviews(params['site'], params['pages'], start, end, granularity)
+    fig = line_chart(
         df, x="date", y="views", color="page",
-        title=f"Pageviews — {params['site']}"
+        title=f"Pageviews ({granularity}) — {params['site']}"
     )
     st.plotly_chart(fig, use_container_width=True)
 
+    if granularity == "monthly":
+        detail = fetch_pageviews_peaks(params['site'], df, start, end)
+        fig = line_chart(
+            detail, x="date", y="views", color="page", line_group="window",
+            title="Détail quotidien autour des pics"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
 def show_pageedits(params: dict):
-    df = fetch_pageedits(
-        params['site'], params['pages'],
-        params['start_date'].isoformat(), params['end_date'].isoformat()
-    )
-    fig = px.line(
+    start, end = params['start_date'].isoformat(), params['end_date'].isoformat()
+    granularity = pick_granularity(start, end, "overview")
+    df = fetch_pageedits(params['site'], params['pages'], start, end, granularity=granularity)
+    fig = line_chart(
         df, x="date", y="edits", color="page",
-        title=f"Éditions — {params['site']}"
+        title=f"Éditions ({granularity}) — {params['site']}"
     )
     st.plotly_chart(fig, use_container_width=True)
 
-def show_sensitivity(params: dict):
-    scores, detail = compute_scores(
+    if granularity == "monthly":
+        detail = fetch_pageedits_peaks(params['site'], df, start, end)
+        fig = line_chart(
+            detail, x="date", y="edits", color="page", line_group="window",
+            title="Détail quotidien autour des pics"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+def submit_sensitivity(params: dict) -> jobs.Job:
+    # calcul en arrière-plan : survit aux reruns, annulable
+    job = jobs.submit_scoring(
         params['pages'],
         params['start_date'].isoformat(),
         params['end_date'].isoformat(),
-        lang=params['site'].split(".")[0]
+        lang=params['site'].split(".")[0],
+        deadline=SCORING_DEADLINE,
+        replace=jobs.RETRY,          # soumission explicite : relance un job annulé ou en échec
     )
+    st.session_state["app1_job"] = job.id
+    st.session_state["app1_params"] = params
+    return job
+
+def show_sensitivity(params: dict, job: jobs.Job):
+    if not show_job(job, key="app1"):
+        return
+    scores, detail = job.result
+    model = weight_sliders("app1")
+    norm = normalization_choice("app1")
+    if model is not MODEL or norm != "panel":
+        # re-pondération des métriques déjà collectées, sans re-collecte
+        scores = score_metrics(detail, model=model, normalization=norm, lang=params['site'].split(".")[0])
+    if scores.missing is not None and scores.missing.any():
+        incomplete = scores.missing[scores.missing].index.tolist()
+        st.warning(f"{len(incomplete)} page(s) incomplète(s) (échec ou délai dépassé), "
+                   f"scores partiels : {', '.join(incomplete)}")
     st.subheader("Métriques brutes")
     st.dataframe(detail.round(3))
 
@@ -180,11 +172,14 @@ def show_sensitivity(params: dict):
     st.dataframe(final)
 
     if params['compare_mode'] == "Tous":
-        for p in params['pages']:
-            fig = build_radar(
-                final.loc[[p]], scores.sensitivity[[p]], title=p
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        # petits multiples : une seule figure par tranche de radars
+        figs = build_radar_grid(final, scores.sensitivity, title="Sensibilité par page")
+        if len(figs) == 1:
+            st.plotly_chart(figs[0], use_container_width=True)
+        else:
+            for tab, fig in zip(st.tabs([f"Grille {i + 1}" for i in range(len(figs))]), figs):
+                with tab:
+                    st.plotly_chart(fig, use_container_width=True)
     else:
         sel = params['compare_sel'] or params['pages'][:3]
         df_sel = final.loc[sel]
@@ -194,7 +189,37 @@ def show_sensitivity(params: dict):
         )
         st.plotly_chart(fig, use_container_width=True)
 
-# ── 5. Main App ──────────────────────────────────────────────────
+def _trend_freq(params: dict) -> str:
+    # un pas par semaine au-delà de 90 jours
+    return "W" if (params['end_date'] - params['start_date']).days > 90 else "D"
+
+def submit_trend(params: dict) -> jobs.Job:
+    pages = params['pages']
+    job = jobs.submit_series(
+        adhoc_panel(pages), pages,
+        params['start_date'].isoformat(),
+        params['end_date'].isoformat(),
+        lang=params['site'].split(".")[0],
+        freq=_trend_freq(params),
+        replace=jobs.RETRY,
+    )
+    st.session_state["app1_job"] = job.id
+    st.session_state["app1_params"] = params
+    return job
+
+def show_trend(params: dict, job: jobs.Job):
+    if not show_job(job, key="app1"):
+        return
+    df = job.result
+    if df.empty:
+        st.info("Aucun pas sur la période (la date de fin est ramenée à hier).")
+        return
+    step = "hebdomadaire" if _trend_freq(params) == "W" else "quotidienne"
+    fig = line_chart(df, x="date", y="sensitivity", color="page",
+                     title=f"Sensibilité ({step}) — {params['site']}")
+    st.plotly_chart(fig, use_container_width=True)
+
+# ── 4. Main App ──────────────────────────────────────────────────
 def run_app1():
     inject_styles()
     
@@ -205,6 +230,12 @@ def run_app1():
 
     params = param_form()
     if not params['submitted']:
+        # rerun : on réaffiche le job de sensibilité (ou de tendance) en cours / terminé
+        job = jobs.get(st.session_state.get("app1_job", ""))
+        if job is not None:
+            params = st.session_state["app1_params"]
+            show = show_trend if params['graph_choice'] == "Tendance sensibilité" else show_sensitivity
+            show(params, job)
         return
 
     if not params['pages']:
@@ -219,12 +250,16 @@ def run_app1():
         return
 
     choice = params['graph_choice']
+    if choice not in ("Sensibilité (radar)", "Tendance sensibilité"):
+        st.session_state.pop("app1_job", None)
     if choice == "Évolution pages vues":
         show_pageviews(params)
     elif choice == "Évolution éditions":
         show_pageedits(params)
+    elif choice == "Tendance sensibilité":
+        show_trend(params, submit_trend(params))
     else:
-        show_sensitivity(params)
+        show_sensitivity(params, submit_sensitivity(params))
 
 if __name__ == "__main__":
     run_app1()
@@ -3,81 +3,39 @@
 from __future__ import annotations
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from pathlib import Path
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
 import io
+from functools import partial
 
-from wikipedia_scoring_pipeline import compute_scores, HEAT_W
+from wikipedia_scoring_pipeline import compute_scores, collect_metrics, score_metrics, HEAT_W, METRICS, MODEL
 from gaph_1 import fetch_pageviews
 from graph_2 import fetch_pageedits
-
-# ── Radar builder ──────────────────────────────────────────────
-BASE_COLORS = ["#edff00", "#6dff00", "#9100ff", "#ff00ed", "#00ecff", "#e2e2e2"]
-def build_radar(df: pd.DataFrame, sensitivity: pd.Series, title: str) -> go.Figure:
-    categories = ["Heat", "Risk", "Quality (penalty)"]
-    fig = go.Figure()
-    for i, (idx, row) in enumerate(df.iterrows()):
-        color = BASE_COLORS[i % len(BASE_COLORS)]
-        q_pen = min(1, abs(row["quality"]))
-        vals = [row["heat"], row["risk"], q_pen, row["heat"]]
-        fig.add_trace(go.Scatterpolar(
-            r=vals, theta=categories + [categories[0]], fill='toself',
-            name=idx, line=dict(color=color, width=3),
-            marker=dict(color=color, size=8), opacity=0.6 + 0.1*(i%3),
-            hoverinfo='text',
-            hovertext=(f"Heat: {row['heat']:.2f}<br>"
-                       f"Risk: {row['risk']:.2f}<br>"
-                       f"Quality: {row['quality']:.2f}")
-        ))
-    for i, (idx, score) in enumerate(sensitivity.items()):
-        fig.add_annotation(
-            x=0, y=0.9 - i*0.1, xref="paper", yref="paper",
-            text=f"{idx} – Sensitivity: {score:.2f}",
-            showarrow=False,
-            font=dict(family="Inria Sans", size=12, color="black"),
-            bgcolor="rgba(255,255,255,0.6)",
-            xanchor="left", yanchor="middle"
-        )
-    fig.update_layout(
-        title=dict(text=title, font=dict(family="Inria Sans", color="black")),
-        font=dict(family="Inria Sans", color="black"),
-        paper_bgcolor='white', plot_bgcolor='white',
-        margin=dict(l=150, r=50, t=80, b=80),
-        polar=dict(
-            radialaxis=dict(range=[0,1], dtick=0.2, gridcolor="lightgrey",
-                            gridwidth=1, tickfont=dict(family="Inria Sans", color="black")),
-            angularaxis=dict(rotation=90, direction="clockwise",
-                              tickfont=dict(family="Inria Sans", color="black"))
-        ),
-        legend=dict(font=dict(family="Inria Sans", color="black"),
-                    orientation="h", yanchor="bottom", y=-0.15,
-                    xanchor="center", x=0.5)
-    )
-    return fig
+from charts import line_chart
+from radar import build_radar
+import jobs
+from jobs_ui import show_job
+from weights_ui import weight_sliders, normalization_choice
+from precompute import load_precomputed, split_frame, freshness
+import score_history
+from sensitivity_series import trend
+from registry import Registry, REGISTRY
 
 # ── Data loading ────────────────────────────────────────────────
-def load_panels(path: Path) -> pd.DataFrame:
-    if not path.exists():
-        st.error(f"`{path}` introuvable – créez un CSV avec colonnes 'panel,page'.")
+def load_panels(registry: Registry) -> list[str]:
+    registry.sync()  # panel.csv / blacklist.csv modifiés à la main
+    panels = registry.panels()
+    if not panels:
+        st.error("Aucun panel – importez un CSV 'panel,page' (`python py/registry.py import --panels …`) "
+                 "ou lancez `get_panel.py`.")
         st.stop()
-    return pd.read_csv(path)
-
-def load_blacklist(path: Path) -> pd.DataFrame:
-    if not path.exists():
-        pd.DataFrame(columns=["domain"]).to_csv(path, index=False)
-    return pd.read_csv(path)
+    return panels
 
 # ── Sidebar inputs ─────────────────────────────────────────────
 def sidebar_inputs(
-    df_panels: pd.DataFrame,
-    panel_csv: Path,
-    blacklist_csv: Path
+    registry: Registry
 ) -> tuple[str, datetime, datetime, str, str, list[str]]:
-    panels = sorted(df_panels["panel"].unique())
-    
-    
+    panels = load_panels(registry)
 
     panel_sel = st.sidebar.selectbox("Panel", panels)
     start = st.sidebar.date_input("Date début",
@@ -89,26 +47,29 @@ def sidebar_inputs(
         st.stop()
 
     lang = st.sidebar.text_input("Langue wiki", value="fr")
-    mode = st.sidebar.radio("Mode", ["Panel complet", "Sensibilité", "Évolution vues"])
+    mode = st.sidebar.radio("Mode", ["Panel complet", "Sensibilité", "Tendance sensibilité", "Évolution vues"])
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("**Blacklist**")
     new_dom = st.sidebar.text_input("Ajouter domaine", placeholder="exemple.com")
     if st.sidebar.button("Ajouter"):
-        df_bl = load_blacklist(blacklist_csv)
+        # insertion transactionnelle : pas de réécriture de la liste
         dom = new_dom.strip().lower()
-        if dom and dom not in df_bl["domain"].str.lower().tolist():
-            df_bl = pd.concat([df_bl, pd.DataFrame([{"domain": dom}])], ignore_index=True)
-            df_bl.to_csv(blacklist_csv, index=False)
+        if dom and registry.add_domain(dom, lang=lang):
             st.sidebar.success(f"Domaine '{dom}' ajouté.")
         else:
             st.sidebar.warning("Domaine invalide ou existant.")
+    old_dom = st.sidebar.selectbox("Retirer domaine", sorted(registry.blacklist()), index=None,
+                                   placeholder="domaine listé")
+    if st.sidebar.button("Retirer") and old_dom:
+        registry.remove_domain(old_dom)
+        st.sidebar.success(f"Domaine '{old_dom}' retiré.")
 
-    pages = df_panels.loc[df_panels["panel"] == panel_sel, "page"].tolist()
+    pages = registry.pages(panel_sel)
     return panel_sel, start, end, lang, mode, pages
 
 # ── Mode handlers ──────────────────────────────────────────────
-def show_panel_complete(pages: list[str], max_items: int = None):
+def show_panel_complete(panel: str, pages: list[str], lang: str, max_items: int = None):
     st.subheader("Liste complète des pages")
     df = pd.DataFrame({"page": pages})
     st.dataframe(df.head(max_items) if max_items else df)
@@ -117,30 +78,114 @@ def show_panel_complete(pages: list[str], max_items: int = None):
     st.download_button("Télécharger CSV", buf.getvalue(),
                        file_name="py/panel.csv", mime="text/csv")
 
-def show_sensitivity(pages: list[str], start: str, end: str, lang: str, max_items: int = 10):
-    # pré-classement Heat
-    from pageviews import get_pageview_spikes
-    from edit import get_edit_spikes
-    from taille_talk import get_talk_activity
-    from protection import protection_rating
-
-    with st.spinner("Pré-classement Heat…"):
-        heat_raw = pd.DataFrame({
-            "pageview_spike": get_pageview_spikes(pages, start, end, lang),
-            "edit_spike":      get_edit_spikes(pages, start, end, lang),
-            "talk_intensity":  get_talk_activity(pages),
-            "protection_level":protection_rating(pages, lang)["Score"].astype(float)
-        })
-        heat_norm = heat_raw.divide(heat_raw.max().replace(0,1))
-        heat_score = (heat_norm * pd.Series(HEAT_W)).sum(axis=1)
-
-    top = heat_score.nlargest(max_items).index.tolist()
-    with st.spinner("Compute_scores TOP…"):
-        scores, detail = compute_scores(top, start, end, lang)
-
-    # override heat
-    detail["heat"] = heat_score[top].values
-    scores.heat[:] = heat_score[top].values
+    # dernier run de l’historique (score_history), s’il existe
+    last = score_history.latest(panel, lang, normalization="panel")
+    if last is None:
+        return
+    frame, meta = last
+    st.subheader("Derniers scores")
+    st.caption(score_history.freshness(meta))
+    st.dataframe(frame.round(3))
+    c1, c2 = st.columns(2)
+    pq_buf = io.BytesIO()
+    frame.to_parquet(pq_buf)
+    c1.download_button("Télécharger Parquet", pq_buf.getvalue(),
+                       file_name=f"scores_{meta['run_id']}.parquet", mime="application/octet-stream")
+    c2.download_button("Télécharger CSV (scores)", frame.to_csv(),
+                       file_name=f"scores_{meta['run_id']}.csv", mime="text/csv")
+
+# Live et pré-calcul notent le TOP de la même façon : TOP = plus forte Heat
+# (modèle par défaut, normalisée sur tout le panel, comme dans precompute),
+# puis `score_metrics` sur le TOP avec les maxima du panel pour les métriques
+# de Heat et ceux du TOP pour les autres.
+
+def _score_top(detail: pd.DataFrame, heat_max: pd.Series, model=MODEL, norm: str = "panel",
+               lang: str = "fr"):
+    max_vals = detail.max()
+    max_vals[heat_max.index] = heat_max
+    return score_metrics(detail, max_vals=max_vals, model=model, normalization=norm, lang=lang)
+
+def _panel_sensitivity(panel: str, pages: list[str], start: str, end: str, lang: str,
+                       max_items: int, job: jobs.Job):
+    # pré-classement Heat sur tout le panel, puis scoring complet du TOP
+    def prerank(metric, values, done, total):
+        job.report(f"pré-classement · {metric}", values, done, total)
+
+    heat_raw = collect_metrics(pages, start, end, lang, metrics=list(HEAT_W),
+                               on_chunk=prerank, cancel=job.cancel_event)
+    heat = score_metrics(heat_raw.reindex(columns=METRICS)).heat
+
+    top = heat.nlargest(max_items).index.tolist()
+    _, detail = compute_scores(top, start, end, lang,
+                               on_chunk=job.report, cancel=job.cancel_event)
+    heat_max = heat_raw.max()
+    try:
+        score_history.append(panel, lang, start, end, detail, _score_top(detail, heat_max, lang=lang))
+    except Exception as e:
+        print(f"⚠️  historique non écrit ({e})")
+    return top, detail, heat_max
+
+def _precomputed_sensitivity(frame: pd.DataFrame, pages: list[str], max_items: int):
+    # un run live de l’historique ne contient que son TOP : maxima du TOP à défaut
+    rows = frame[frame.index.isin(pages)]
+    top = rows["heat"].nlargest(max_items).index.tolist()
+    _, detail = split_frame(frame, top)
+    return top, detail, rows[list(HEAT_W)].max()
+
+def _session_job(name: str, view: tuple) -> jobs.Job | None:
+    # job lancé par l’utilisateur pour cette vue (comme `app1_job`)
+    stored = st.session_state.get(name)
+    return jobs.get(stored[1]) if stored and stored[0] == view else None
+
+def _start_job(name: str, view: tuple, job: jobs.Job):
+    st.session_state[name] = (view, job.id)
+    st.rerun()
+
+def show_sensitivity(panel: str, pages: list[str], start: str, end: str, lang: str, max_items: int = 10):
+    # pré-calcul nocturne (precompute.py), sinon dernier run de l’historique
+    # couvrant le TOP demandé, sinon calcul live lancé par l’utilisateur
+    view = (panel, start, end, lang, max_items)
+
+    def submit(replace):
+        return jobs.submit(
+            ("panel-sensitivity", tuple(pages), start, end, lang, max_items),
+            partial(_panel_sensitivity, panel, pages, start, end, lang, max_items),
+            label=f"{len(pages)} pages, {start} → {end}", replace=replace,
+        )
+
+    job = _session_job("app2_job", view)
+    pre, caption = load_precomputed(panel, lang, start, end), freshness
+    if pre is None:
+        pre, caption = score_history.latest(panel, lang, start, end, normalization="panel"), score_history.freshness
+        if pre is not None and pre[0].index.isin(pages).sum() < min(max_items, len(pages)):
+            pre = None
+    if pre is not None and job is None:
+        frame, meta = pre
+        c1, c2 = st.columns([4, 1])
+        c1.caption(caption(meta))
+        if c2.button("Recalculer en direct"):
+            _start_job("app2_job", view, submit(jobs.RECOMPUTE))
+        top, detail, heat_max = _precomputed_sensitivity(frame, pages, max_items)
+    else:
+        # job en arrière-plan, retrouvé par son id à chaque rerun ; jamais relancé implicitement
+        if job is None or job.status in jobs.RETRY:
+            label = "Lancer le calcul" if job is None else "Relancer le calcul"
+            if job is not None:
+                show_job(job, key="app2")
+            if st.button(label, key="app2_start"):
+                _start_job("app2_job", view, submit(jobs.RETRY))
+            return
+        if not show_job(job, key="app2"):
+            return
+        top, detail, heat_max = job.result
+
+    # re-pondération des métriques déjà collectées, sans re-collecte
+    scores = _score_top(detail, heat_max, weight_sliders("app2"), normalization_choice("app2"), lang)
+    detail = detail.assign(heat=scores.heat)
+    if scores.missing is not None and scores.missing.any():
+        incomplete = scores.missing[scores.missing].index.tolist()
+        st.warning(f"{len(incomplete)} page(s) incomplète(s) (échec ou délai dépassé), "
+                   f"scores partiels : {', '.join(incomplete)}")
 
     st.subheader("Métriques brutes")
     st.dataframe(detail.round(3))
@@ -163,13 +208,40 @@ def show_sensitivity(pages: list[str], start: str, end: str, lang: str, max_item
     dfv = fetch_pageviews(f"{lang}.wikipedia.org", [focus], start, end)
     dfe = fetch_pageedits(f"{lang}.wikipedia.org", [focus], start, end)
     with c1:
-        st.plotly_chart(px.line(dfv, x="date", y="views", title=f"Vues – {focus}"), use_container_width=True)
+        st.plotly_chart(line_chart(dfv, x="date", y="views", title=f"Vues – {focus}"), use_container_width=True)
     with c2:
-        st.plotly_chart(px.line(dfe, x="date", y="edits", title=f"Éditions – {focus}"), use_container_width=True)
+        st.plotly_chart(line_chart(dfe, x="date", y="edits", title=f"Éditions – {focus}"), use_container_width=True)
+
+def show_trend(panel: str, pages: list[str], start: str, end: str, lang: str, max_items: int = 10):
+    # une série par pas (sensitivity_series) : seuls les pas manquants sont calculés
+    c1, c2 = st.columns(2)
+    freq = c1.radio("Pas", ["D", "W"], horizontal=True, key="app2_freq",
+                    format_func={"D": "Quotidien", "W": "Hebdomadaire"}.get)
+    window = c2.number_input("Fenêtre (jours)", min_value=7, max_value=365, value=30, key="app2_window")
+    view = (panel, start, end, lang, int(window), freq)
+    job = _session_job("app2_trend_job", view)
+    if job is None or job.status in jobs.RETRY:
+        if job is not None:
+            show_job(job, key="app2_trend")
+        if st.button("Calculer la série" if job is None else "Relancer le calcul", key="app2_trend_start"):
+            _start_job("app2_trend_job", view,
+                       jobs.submit_series(panel, pages, start, end, lang, int(window), freq, replace=jobs.RETRY))
+        return
+    if not show_job(job, key="app2_trend"):
+        return
+    df = job.result
+    if df.empty:
+        st.info("Aucun pas sur la période (la date de fin est ramenée à hier ; "
+                "en hebdomadaire, un pas par dimanche).")
+        return
+    top = trend(df, max_items)
+    st.subheader("Sensibilité – TOP au dernier pas")
+    st.plotly_chart(line_chart(top, x="date", y="sensitivity", color="page"), use_container_width=True)
+    st.dataframe(top.pivot(index="date", columns="page", values="sensitivity").round(3).iloc[::-1])
 
 def show_evolution(pages: list[str], start: str, end: str, lang: str, max_items: int = 10):
     with st.spinner("Chargement vues…"):
-        df_all = fetch_pageviews(f"{lang}.wikipedia.org", pages, start, end)
+        df_all = fetch_pageviews(f"{lang}.wikipedia.org", pages, start, end, granularity="auto")
     grp = next((c for c in ("article","page","title") if c in df_all.columns), None)
     if grp is None:
         st.error("Colonne article manquante")
@@ -177,7 +249,7 @@ def show_evolution(pages: list[str], start: str, end: str, lang: str, max_items:
     top = df_all.groupby(grp)["views"].sum().nlargest(max_items).index.tolist()
     df_top = df_all[df_all[grp].isin(top)]
     st.subheader("Évolution des vues – TOP")
-    st.plotly_chart(px.line(df_top, x="date", y="views", color=grp), use_container_width=True)
+    st.plotly_chart(line_chart(df_top, x="date", y="views", color=grp), use_container_width=True)
 
 # ── Main app ───────────────────────────────────────────────────
 def run_app2():
@@ -188,19 +260,17 @@ def run_app2():
       .stButton>button:hover{background:#d4e800!important;}
     </style>""", unsafe_allow_html=True)
 
-    panel_sel, start_dt, end_dt, lang, mode, pages = sidebar_inputs(
-        df_panels=load_panels(Path("py/panel.csv")),
-        panel_csv=Path("py/panel.csv"),
-        blacklist_csv=Path("py/blacklist.csv")
-    )
+    panel_sel, start_dt, end_dt, lang, mode, pages = sidebar_inputs(REGISTRY)
 
     st.title(f"Panel « {panel_sel} » – {mode}")
     start, end = start_dt.isoformat(), end_dt.isoformat()
 
     if mode == "Panel complet":
-        show_panel_complete(pages)
+        show_panel_complete(panel_sel, pages, lang)
     elif mode == "Sensibilité":
-        show_sensitivity(pages, start, end, lang)
+        show_sensitivity(panel_sel, pages, start, end, lang)
+    elif mode == "Tendance sensibilité":
+        show_trend(panel_sel, pages, start, end, lang)
     else:
         show_evolution(pages, start, end, lang)
 
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# bench_startup.py
+"""
+Banc de démarrage : temps d’import à froid et rendu de la page d’accueil.
+
+Chaque cible est mesurée dans un interpréteur neuf (`REPEAT` fois, médiane) :
+
+    landing                    rendu de `main_app.py` (AppTest) sans explorateur
+    wikipedia_scoring_pipeline import du pipeline seul
+    charts, radar              modules de graphiques
+    app_1, app_2               explorateurs complets (référence)
+
+Le banc échoue (code de sortie 1) si :
+  • une cible importe un module lourd qu’elle doit laisser paresseux
+    (`LAZY`) – vérification indépendante de la machine ;
+  • une cible dépasse son budget absolu (`BUDGETS`, secondes) ;
+  • avec `--baseline`, une cible est plus lente que la référence de plus de
+    `TOLERANCE` (référence enregistrée sur la même machine par `--save`).
+
+Usage :
+    python py/bench_startup.py
+    python py/bench_startup.py --save py/cache/startup.json
+    python py/bench_startup.py --baseline py/cache/startup.json
+"""
+
+from __future__ import annotations
+from typing import Dict, List
+from pathlib import Path
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+REPEAT = 5
+TOLERANCE = 0.25             # +25 % sur la médiane
+PY_DIR = Path(__file__).resolve().parent
+ROOT = PY_DIR.parent
+
+COLLECTORS = ("pageviews", "edit", "taille_talk", "protection", "ref",
+              "readability", "ano_edit", "blacklist_metric")
+PLOTLY = ("plotly.express", "plotly.graph_objects")
+
+# cible → modules qui ne doivent pas être chargés
+LAZY: Dict[str, tuple] = {
+    "landing": ("app_1", "app_2", "wikipedia_scoring_pipeline", "pandas", *PLOTLY),
+    "wikipedia_scoring_pipeline": (*COLLECTORS, *PLOTLY),
+    "charts": PLOTLY,
+    "radar": PLOTLY,
+    "app_1": (),
+    "app_2": (),
+}
+BUDGETS = {"landing": 1.0, "wikipedia_scoring_pipeline": 1.5, "charts": 1.0, "radar": 1.0}
+
+_IMPORT = """
+import json, sys, time
+sys.path.insert(0, {py!r})
+t = time.perf_counter()
+import {target}
+print(json.dumps({{"seconds": time.perf_counter() - t, "modules": sorted(sys.modules)}}))
+"""
+
+# AppTest importe lui-même plotly : seuls les modules chargés par le rendu comptent
+_LANDING = """
+import json, sys, time
+sys.path.insert(0, {py!r})
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+t = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=30).run()
+seconds = time.perf_counter() - t
+assert not at.exception, [e.value for e in at.exception]
+print(json.dumps({{"seconds": seconds, "modules": sorted(set(sys.modules) - before)}}))
+"""
+
+
+def _once(target: str) -> dict:
+    if target == "landing":
+        code = _LANDING.format(py=str(PY_DIR), app=str(PY_DIR / "main_app.py"))
+    else:
+        code = _IMPORT.format(py=str(PY_DIR), target=target)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                         text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(targets: List[str], repeat: int = REPEAT) -> Dict[str, dict]:
+    res = {}
+    for t in targets:
+        runs = [_once(t) for _ in range(repeat)]
+        leaked = sorted(m for m in LAZY.get(t, ()) if m in runs[-1]["modules"])
+        res[t] = {"seconds": statistics.median(r["seconds"] for r in runs), "leaked": leaked}
+    return res
+
+
+def check(res: Dict[str, dict], baseline: Dict[str, dict] | None = None) -> List[str]:
+    errors = []
+    for t, r in res.items():
+        if r["leaked"]:
+            errors.append(f"{t} : import non paresseux de {', '.join(r['leaked'])}")
+        if t in BUDGETS and r["seconds"] > BUDGETS[t]:
+            errors.append(f"{t} : {r['seconds']:.2f} s > budget {BUDGETS[t]:.2f} s")
+        if baseline and t in baseline:
+            ref = baseline[t]["seconds"]
+            if r["seconds"] > ref * (1 + TOLERANCE):
+                errors.append(f"{t} : {r['seconds']:.2f} s > référence {ref:.2f} s (+{TOLERANCE:.0%})")
+    return errors
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Banc de démarrage des dashboards")
+    ap.add_argument("targets", nargs="*", default=list(LAZY))
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--baseline", help="JSON de référence (même machine)")
+    ap.add_argument("--save", help="Enregistre les mesures comme référence")
+    ns = ap.parse_args()
+
+    res = measure(ns.targets, ns.repeat)
+    for t, r in res.items():
+        print(f"{t:<28} {r['seconds'] * 1000:8.0f} ms")
+    if ns.save:
+        Path(ns.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(ns.save).write_text(json.dumps(res, indent=1))
+    baseline = json.loads(Path(ns.baseline).read_text()) if ns.baseline else None
+    errors = check(res, baseline)
+    for e in errors:
+        print(f"❌ {e}")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
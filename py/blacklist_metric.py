@@ -4,27 +4,45 @@ Calcule la part de références provenant d’un **domaine blacklisté**.
 
 Fonction exposée
 ----------------
-get_blacklist_share(pages, blacklist_csv="blacklist.csv", lang="fr") -> pd.Series
+get_blacklist_share(pages, blacklist_csv=None, lang="fr", source="wikitext") -> pd.Series
 
-* `blacklist.csv` doit contenir **une colonne `domain`** (ex.: `breitbart.com`).
+* `blacklist_csv=None` : domaines du registre (`registry`) ; sinon un CSV
+  avec **une colonne `domain`** (ex.: `breitbart.com`) ou un .txt.
 * Pour chaque page Wikipédia :
-    1. Récupère le wikitext.
+    1. Récupère le wikitext (`page_cache`, partagé avec `ref`).
     2. Extrait toutes les URL dans les balises `<ref>`.
     3. Prend le nom de domaine (`urllib.parse.urlparse(url).hostname`).
     4. Ratio = domaines black‑listés / total domaines.
 * Retourne un `Series` 0‑1 (`0` si pas de référence ou pas de domaine présent).
+
+Source `extlinks` : les URL viennent de `prop=extlinks` (métadonnées, lots de
+`EXTLINKS_BATCH` titres avec continuation) au lieu du wikitext. Écarts
+connus avec la source `wikitext` (`--compare` pour les mesurer) :
+
+* extlinks est dédupliqué par page, le wikitext compte chaque occurrence ;
+* extlinks inclut les liens produits par les modèles (`{{Lien web}}`, …) et
+  exclut ceux en commentaire ou `<nowiki>` ;
+* extlinks reflète le dernier rendu de la page (file d’attente des liens).
 """
 
 from __future__ import annotations
-import pandas as pd, re, requests, time, pathlib
-from typing import List
+import pandas as pd, re, pathlib, sys
+import page_cache
+import wiki_http
+from typing import Dict, List, Optional
 from urllib.parse import urlparse
 
-UA = {"User-Agent": "BlacklistMetric/1.1 (opsci)"}
 URL_REGEX = re.compile(r"https?://[^\s<>\"]+")
+API_TEMPLATE = "https://{lang}.wikipedia.org/w/api.php"
+HEADERS = {"User-Agent": "BlacklistMetric/1.2 (opsci)"}
+EXTLINKS_BATCH = 50
+SOURCES = ("wikitext", "extlinks")
 
 
-def _load_blacklist(path: str | pathlib.Path) -> set[str]:
+def _load_blacklist(path: Optional[str | pathlib.Path]) -> set[str]:
+    if path is None:
+        from registry import REGISTRY
+        return REGISTRY.blacklist()
     p = pathlib.Path(path)
     if not p.exists():
         raise FileNotFoundError(f"Blacklist introuvable : {p}")
@@ -38,43 +56,92 @@ def _load_blacklist(path: str | pathlib.Path) -> set[str]:
     return set(l.strip().lower() for l in p.read_text().splitlines() if l.strip())
 
 
-def _wikitext(title: str, lang: str) -> str:
-    api = f"https://{lang}.wikipedia.org/w/api.php"
-    params = {
-        "action": "query", "prop": "revisions", "rvprop": "content", "rvslots": "main",
-        "titles": title, "format": "json", "formatversion": 2
-    }
-    r = requests.get(api, params=params, headers=UA, timeout=20)
-    r.raise_for_status()
-    pg = r.json()["query"]["pages"][0]
-    return pg.get("revisions", [{}])[0].get("slots", {}).get("main", {}).get("content", "")
+def _ratio(urls: List[str], bl_domains: set[str]) -> float:
+    if not urls:
+        return 0.0
+    domains = [urlparse(u).hostname or "" for u in urls]
+    bad = sum(1 for d in domains if any(bd in d for bd in bl_domains))
+    return bad / len(domains)
+
+
+def _extlinks(pages: List[str], lang: str) -> Dict[str, Optional[List[str]]]:
+    """{titre: URL externes} par lots `prop=extlinks` ; None si le lot a échoué."""
+    out: Dict[str, Optional[List[str]]] = {}
+    for k in range(0, len(pages), EXTLINKS_BATCH):
+        batch = pages[k:k + EXTLINKS_BATCH]
+        params = {"action": "query", "format": "json", "formatversion": 2, "redirects": 1,
+                  "prop": "extlinks", "ellimit": "max", "titles": "|".join(batch)}
+        links: Dict[str, List[str]] = {}
+        resolved: Dict[str, str] = {}
+        try:
+            with wiki_http.page_scope():
+                while True:
+                    r = wiki_http.get(API_TEMPLATE.format(lang=lang), headers=HEADERS,
+                                      params=params, timeout=20)
+                    r.raise_for_status()
+                    data = r.json()
+                    q = data.get("query", {})
+                    resolved = resolved or page_cache._resolve(q, batch)
+                    for pg in q.get("pages", []):
+                        links.setdefault(pg["title"], []).extend(
+                            e.get("url", e.get("*", "")) for e in pg.get("extlinks", []))
+                    if "continue" not in data:
+                        break
+                    params.update(data["continue"])
+        except Exception as e:
+            print(f"⚠️  extlinks indisponibles pour {len(batch)} page(s) ({e})", file=sys.stderr)
+            out.update({t: None for t in batch})
+            continue
+        out.update({t: links.get(resolved[t], []) for t in batch})
+    return out
+
 
+def _urls(pages: List[str], lang: str, source: str) -> Dict[str, Optional[List[str]]]:
+    if source == "extlinks":
+        return _extlinks(pages, lang)
+    if source != "wikitext":
+        raise ValueError(f"source inconnue : {source}")
+    texts = page_cache.wikitexts(pages, lang)
+    return {p: None if texts.get(p) is None else URL_REGEX.findall(texts[p]) for p in pages}
 
-def get_blacklist_share(pages: List[str], blacklist_csv="py/blacklist.csv", lang="fr") -> pd.Series:
+
+def get_blacklist_share(pages: List[str], blacklist_csv=None, lang="fr",
+                        source: str = "wikitext") -> pd.Series:
     bl_domains = _load_blacklist(blacklist_csv)
-    ratios = {}
-    for p in pages:
-        text = _wikitext(p, lang)
-        urls = URL_REGEX.findall(text)
-        if not urls:
-            ratios[p] = 0.0
-        else:
-            domains = [urlparse(u).hostname or "" for u in urls]
-            bad = sum(1 for d in domains if any(bd in d for bd in bl_domains))
-            ratios[p] = bad / len(domains)
-        time.sleep(0.1)
-    return pd.Series(ratios, name="blacklist_share")
+    urls = _urls(pages, lang, source)
+    ratios = {p: float("nan") if urls.get(p) is None else _ratio(urls[p], bl_domains) for p in pages}
+    return pd.Series(ratios, name="blacklist_share", dtype=float)
+
+
+def compare_sources(pages: List[str], blacklist_csv=None, lang="fr") -> pd.DataFrame:
+    """Les deux sources côte à côte, avec l’écart et le nombre d’URL de chacune."""
+    bl_domains = _load_blacklist(blacklist_csv)
+    rows = {}
+    for src in SOURCES:
+        for p, u in _urls(pages, lang, src).items():
+            row = rows.setdefault(p, {})
+            row[src] = float("nan") if u is None else _ratio(u, bl_domains)
+            row[f"n_{src}"] = float("nan") if u is None else len(u)
+    df = pd.DataFrame.from_dict(rows, orient="index")
+    df["diff"] = df["extlinks"] - df["wikitext"]
+    return df
+
 # ───────────────────────────  CLI test ─────────────────────────
 if __name__ == "__main__":
     import argparse, json
     ap = argparse.ArgumentParser(description="Ratio de références blacklistées par article")
     ap.add_argument("pages", nargs="+", help="Titres d’articles")
-    ap.add_argument("--blacklist", default="py/blacklist.csv", help="Chemin vers blacklist.csv")
+    ap.add_argument("--blacklist", help="CSV/txt de domaines (défaut : registre)")
     ap.add_argument("--lang", default="fr", help="Code langue wiki")
     ap.add_argument("--json", action="store_true", help="Affiche le résultat en JSON")
+    ap.add_argument("--source", choices=SOURCES, default="wikitext", help="Origine des URL")
+    ap.add_argument("--compare", action="store_true", help="Compare les deux sources")
     ns = ap.parse_args()
 
-    res = get_blacklist_share(ns.pages, ns.blacklist, ns.lang)
+    if ns.compare:
+        print(compare_sources(ns.pages, ns.blacklist, ns.lang).round(3).to_markdown())
+        raise SystemExit
+    res = get_blacklist_share(ns.pages, ns.blacklist, ns.lang, ns.source)
     if ns.json:
         print(json.dumps(res.to_dict(), ensure_ascii=False, indent=2))
     else:
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# blacklist_reverse.py
+"""
+Balayage inverse de la blacklist : qui pointe vers les domaines listés ?
+
+Au lieu de télécharger le wikitext de chaque article, on interroge l’API
+dans l’autre sens : `list=exturlusage` donne, pour un domaine, toutes les
+pages du wiki qui le citent (sous-domaines compris, `*.domaine`). Les
+domaines sont interrogés en parallèle, chacun avec sa continuation.
+
+Le résultat est un index page → liens blacklistés pour tout le wiki,
+persisté en SQLite (`py/cache/blacklist_links.sqlite`, non versionné) ;
+il répond ensuite à l’exposition de n’importe quel panel sans toucher au
+contenu des articles. Les domaines balayés depuis moins de `MAX_AGE` ne
+sont pas ré-interrogés.
+
+Le nombre total de domaines d’une page n’apparaît pas dans cet index :
+pour la part (`blacklist_share`), voir `blacklist_metric`.
+
+Usage :
+    python py/blacklist_reverse.py --lang fr                 # balayage du wiki
+    python py/blacklist_reverse.py --lang fr --pages "Paris" "Lyon"
+"""
+
+from __future__ import annotations
+from typing import Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import sqlite3
+import threading
+import pandas as pd
+
+import wiki_http
+from blacklist_metric import _load_blacklist
+
+API_TEMPLATE = "https://{lang}.wikipedia.org/w/api.php"
+HEADERS = {"User-Agent": "BlacklistReverse/1.0 (opsci)"}
+DB_PATH = Path("py/cache/blacklist_links.sqlite")
+MAX_AGE = timedelta(days=1)
+WORKERS = 8
+
+# ─────────────────────────── API MediaWiki ─────────────────────
+
+def _usage(lang: str, domain: str) -> List[Tuple[str, str]]:
+    """[(page, url)] des articles (ns 0) liant `domain` ou un de ses sous-domaines."""
+    out: List[Tuple[str, str]] = []
+    for query in (domain, f"*.{domain}"):
+        params = {
+            "action": "query", "format": "json", "formatversion": 2,
+            "list": "exturlusage", "euquery": query, "eunamespace": 0,
+            "euprop": "title|url", "eulimit": "max",
+        }
+        while True:
+            r = wiki_http.get(API_TEMPLATE.format(lang=lang), headers=HEADERS, params=params, timeout=30)
+            r.raise_for_status()
+            data = r.json()
+            out += [(u["title"], u["url"]) for u in data.get("query", {}).get("exturlusage", [])]
+            if "continue" not in data:
+                break
+            params.update(data["continue"])
+    return list(dict.fromkeys(out))
+
+# ─────────────────────────── index ─────────────────────────────
+
+class ReverseIndex:
+    """Table (wiki, page, domaine, url) + date de balayage de chaque domaine."""
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS links (
+                    lang TEXT, page TEXT, domain TEXT, url TEXT,
+                    PRIMARY KEY (lang, page, domain, url));
+                CREATE INDEX IF NOT EXISTS links_page ON links (lang, page);
+                CREATE TABLE IF NOT EXISTS scanned (
+                    lang TEXT, domain TEXT, scanned_at TEXT, PRIMARY KEY (lang, domain));
+            """)
+        return self._db
+
+    def _store(self, lang: str, domain: str, rows: List[Tuple[str, str]]) -> None:
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM links WHERE lang=? AND domain=?", (lang, domain))
+            db.executemany("INSERT OR IGNORE INTO links VALUES (?, ?, ?, ?)",
+                           [(lang, page, domain, url) for page, url in rows])
+            db.execute("INSERT OR REPLACE INTO scanned VALUES (?, ?, ?)", (lang, domain, now))
+            db.commit()
+
+    def _prune(self, lang: str, domains: List[str]) -> int:
+        """Oublie les domaines sortis de la blacklist ; renvoie le nombre de liens supprimés."""
+        with self._lock:
+            db = self._conn()
+            known = {d for (d,) in db.execute(
+                "SELECT domain FROM scanned WHERE lang=? UNION SELECT domain FROM links WHERE lang=?",
+                (lang, lang))}
+            gone = known - set(domains)
+            n = 0
+            for d in gone:
+                n += db.execute("DELETE FROM links WHERE lang=? AND domain=?", (lang, d)).rowcount
+                db.execute("DELETE FROM scanned WHERE lang=? AND domain=?", (lang, d))
+            db.commit()
+        return n
+
+    def _due(self, lang: str, domains: List[str], max_age: timedelta) -> List[str]:
+        limit = (datetime.utcnow() - max_age).isoformat(timespec="seconds")
+        with self._lock:
+            fresh = {d for (d,) in self._conn().execute(
+                "SELECT domain FROM scanned WHERE lang=? AND scanned_at >= ?", (lang, limit))}
+        return [d for d in domains if d not in fresh]
+
+    def scan(self, lang: str, domains: Iterable[str], max_age: timedelta = MAX_AGE) -> int:
+        """
+        Interroge `exturlusage` pour chaque domaine périmé ; renvoie le nombre
+        de domaines balayés. Un domaine en échec garde ses anciens liens ; les
+        liens des domaines qui ne sont plus dans `domains` sont supprimés.
+        """
+        domains = sorted(set(domains))
+        self._prune(lang, domains)
+        due = self._due(lang, domains, max_age)
+
+        def one(domain: str) -> Optional[List[Tuple[str, str]]]:
+            try:
+                return _usage(lang, domain)
+            except Exception as e:
+                print(f"⚠️  {domain} : balayage impossible ({e})")
+                return None
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            for domain, rows in zip(due, pool.map(one, due)):
+                if rows is not None:
+                    self._store(lang, domain, rows)
+                    done += 1
+        return done
+
+    def links(self, pages: List[str], lang: str = "fr") -> pd.DataFrame:
+        """Liens blacklistés des pages données (colonnes page, domain, url)."""
+        rows: List[tuple] = []
+        with self._lock:
+            db = self._conn()
+            for k in range(0, len(pages), 500):
+                part = pages[k:k + 500]
+                rows += db.execute(
+                    f"SELECT page, domain, url FROM links WHERE lang=? AND page IN "
+                    f"({','.join('?' * len(part))})", [lang, *part]).fetchall()
+        return pd.DataFrame(rows, columns=["page", "domain", "url"])
+
+    def exposure(self, pages: List[str], lang: str = "fr") -> pd.DataFrame:
+        """
+        Par page : nombre de liens et de domaines blacklistés (0 si aucun).
+        Ne dit rien des pages absentes du wiki : l’index ne voit que les liens.
+        """
+        df = self.links(pages, lang)
+        agg = df.groupby("page").agg(blacklisted_links=("url", "size"),
+                                     blacklisted_domains=("domain", "nunique"))
+        return agg.reindex(pd.Index(pages, name="page"), fill_value=0)
+
+
+INDEX = ReverseIndex()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Balayage inverse de la blacklist (exturlusage)")
+    ap.add_argument("--lang", default="fr")
+    ap.add_argument("--blacklist", help="CSV/txt de domaines (défaut : registre)")
+    ap.add_argument("--max-age-hours", type=float, default=MAX_AGE.total_seconds() / 3600)
+    ap.add_argument("--pages", nargs="*", help="Exposition de ces pages (après balayage)")
+    ap.add_argument("--top", type=int, default=20, help="Pages les plus exposées à afficher")
+    ns = ap.parse_args()
+
+    domains = _load_blacklist(ns.blacklist)
+    n = INDEX.scan(ns.lang, domains, timedelta(hours=ns.max_age_hours))
+    print(f"✅ {n}/{len(domains)} domaine(s) balayé(s) sur {ns.lang}.wikipedia")
+    if ns.pages:
+        print(INDEX.exposure(ns.pages, ns.lang).to_markdown())
+        return
+    with INDEX._lock:
+        top = pd.read_sql_query(
+            "SELECT page, COUNT(*) AS blacklisted_links, COUNT(DISTINCT domain) AS blacklisted_domains "
+            "FROM links WHERE lang=? GROUP BY page ORDER BY blacklisted_links DESC LIMIT ?",
+            INDEX._conn(), params=(ns.lang, ns.top))
+    print(top.to_markdown(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# category_graph.py
+"""
+Graphe persistant des catégories pour la constitution des panels.
+
+Deux types d’arêtes sont stockés, avec la date de parcours de chaque
+catégorie :
+
+    catégorie → sous-catégorie      (ns 14)
+    catégorie → article             (ns 0)
+
+`refresh` descend l’arbre depuis une racine jusqu’à une profondeur donnée
+et ne re-parcourt (`list=categorymembers`) que les catégories absentes,
+plus vieilles que `TTL` ou signalées par le flux des modifications
+(`change_feed`, événements `categorize`). Un niveau est parcouru en
+parallèle.
+
+`members` répond ensuite localement (requête SQL récursive, quelques
+millisecondes) pour n’importe quelle racine et profondeur ; des panels qui
+partagent des sous-arbres ne les parcourent qu’une fois.
+
+Stockage : SQLite `py/cache/categories.sqlite` (non versionné).
+
+Usage :
+    python py/category_graph.py "Personnalité politique française" --depth 2
+"""
+
+from __future__ import annotations
+from typing import Iterable, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import wiki_http
+
+API_TEMPLATE = "https://{lang}.wikipedia.org/w/api.php"
+HEADERS = {"User-Agent": "CategoryGraph/1.0 (opsci)"}
+DB_PATH = Path("py/cache/categories.sqlite")
+TTL = timedelta(days=7)
+WORKERS = 8
+# préfixe de l’espace de noms Catégorie (14), canonique et localisés courants
+CATEGORY_PREFIXES = ("Category", "Catégorie", "Kategorie", "Categoría", "Categoria")
+_PREFIX = re.compile(r"^\s*(?:%s)\s*:" % "|".join(CATEGORY_PREFIXES), re.I)
+
+stats = {"crawled": 0, "fresh": 0, "requests": 0}
+
+
+def _name(title: str) -> str:
+    """
+    `Catégorie:Foo_bar` / `Foo_bar` → `Foo bar` (nom sans préfixe). Seul un
+    préfixe de catégorie connu est retiré : `Star Wars: Episode I` reste entier.
+    """
+    return _PREFIX.sub("", title, count=1).replace("_", " ").strip()
+
+# ─────────────────────────── API MediaWiki ─────────────────────
+
+def _crawl(lang: str, cat: str) -> Tuple[List[str], List[str]]:
+    """(sous-catégories, articles) directs de `cat`."""
+    params = {
+        "action": "query", "format": "json", "formatversion": 2,
+        "list": "categorymembers", "cmtitle": f"Category:{cat}",
+        "cmnamespace": "0|14", "cmprop": "title|ns", "cmlimit": "max",
+    }
+    subcats, pages = [], []
+    while True:
+        r = wiki_http.get(API_TEMPLATE.format(lang=lang), headers=HEADERS, params=params, timeout=30)
+        r.raise_for_status()
+        stats["requests"] += 1
+        data = r.json()
+        for m in data.get("query", {}).get("categorymembers", []):
+            if m["ns"] == 14:
+                # titre de l’API : toujours préfixé par l’espace de noms, quelle que soit la langue
+                subcats.append(m["title"].split(":", 1)[1].replace("_", " ").strip())
+            elif m["ns"] == 0:
+                pages.append(m["title"])
+        if "continue" not in data:
+            return subcats, pages
+        params.update(data["continue"])
+
+# ─────────────────────────── graphe ────────────────────────────
+
+class CategoryGraph:
+    """Arêtes catégorie → membres par wiki, avec dates de parcours."""
+
+    def __init__(self, path: Path = DB_PATH, ttl: timedelta = TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS categories (
+                    lang TEXT, name TEXT, crawled_at TEXT, stale INTEGER DEFAULT 0,
+                    PRIMARY KEY (lang, name));
+                CREATE TABLE IF NOT EXISTS edges (
+                    lang TEXT, parent TEXT, child TEXT, ns INTEGER,
+                    PRIMARY KEY (lang, parent, ns, child));
+            """)
+        return self._db
+
+    # ─── écriture ───
+
+    def _store(self, lang: str, cat: str, subcats: List[str], pages: List[str]) -> None:
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM edges WHERE lang=? AND parent=?", (lang, cat))
+            db.executemany("INSERT OR IGNORE INTO edges VALUES (?, ?, ?, ?)",
+                           [(lang, cat, c, 14) for c in subcats] + [(lang, cat, p, 0) for p in pages])
+            db.execute("INSERT OR REPLACE INTO categories VALUES (?, ?, ?, 0)", (lang, cat, now))
+            db.commit()
+
+    def flag(self, lang: str, categories: Iterable[str]) -> int:
+        """Marque des catégories à re-parcourir ; renvoie le nombre de catégories connues."""
+        names = [(lang, _name(c)) for c in categories]
+        with self._lock:
+            db = self._conn()
+            n = db.executemany("UPDATE categories SET stale=1 WHERE lang=? AND name=?", names).rowcount
+            db.commit()
+        return n
+
+    # ─── lecture ───
+
+    def _select(self, sql: str, lang: str, names: List[str]) -> List[tuple]:
+        """`sql` avec un `IN ({})` sur `names`, par tranches de 500."""
+        rows: List[tuple] = []
+        with self._lock:
+            db = self._conn()
+            for k in range(0, len(names), 500):
+                part = names[k:k + 500]
+                rows += db.execute(sql.format(",".join("?" * len(part))), [lang, *part]).fetchall()
+        return rows
+
+    def _due(self, lang: str, cats: List[str]) -> List[str]:
+        limit = (datetime.utcnow() - self.ttl).isoformat(timespec="seconds")
+        state = {n: (at, stale) for n, at, stale in self._select(
+            "SELECT name, crawled_at, stale FROM categories WHERE lang=? AND name IN ({})", lang, cats)}
+        return [c for c in cats if c not in state or state[c][1] or state[c][0] < limit]
+
+    def _subcats(self, lang: str, cats: List[str]) -> List[str]:
+        rows = self._select("SELECT DISTINCT child FROM edges WHERE lang=? AND ns=14 AND parent IN ({})",
+                            lang, cats)
+        return [c for (c,) in rows]
+
+    def refresh(self, root: str, depth: int, lang: str = "fr") -> int:
+        """
+        Met à jour le sous-arbre `root` jusqu’à `depth` (0 = racine seule) ;
+        renvoie le nombre de catégories re-parcourues. Une catégorie en échec
+        garde ses anciennes arêtes.
+        """
+        seen: Set[str] = set()
+        level = [_name(root)]
+        crawled = 0
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            for d in range(depth + 1):
+                level = [c for c in dict.fromkeys(level) if c not in seen]
+                if not level:
+                    break
+                seen.update(level)
+                due = self._due(lang, level)
+                for cat, res in zip(due, pool.map(lambda c: _try_crawl(lang, c), due)):
+                    if res is not None:
+                        self._store(lang, cat, *res)
+                        crawled += 1
+                stats["crawled"] += len(due)
+                stats["fresh"] += len(level) - len(due)
+                if d < depth:
+                    level = self._subcats(lang, level)
+        return crawled
+
+    def members(self, root: str, depth: int, lang: str = "fr") -> List[str]:
+        """Articles de `root` et de ses sous-catégories jusqu’à `depth`, depuis le cache seul."""
+        with self._lock:
+            rows = self._conn().execute("""
+                WITH RECURSIVE cats(name, d) AS (
+                    SELECT ?, 0
+                    UNION
+                    SELECT e.child, c.d + 1 FROM edges e JOIN cats c ON e.parent = c.name
+                    WHERE e.lang = ? AND e.ns = 14 AND c.d < ?)
+                SELECT DISTINCT e.child FROM edges e
+                WHERE e.lang = ? AND e.ns = 0 AND e.parent IN (SELECT name FROM cats)
+                ORDER BY e.child""", (_name(root), lang, depth, lang)).fetchall()
+        return [t for (t,) in rows]
+
+    def panel(self, root: str, depth: int, lang: str = "fr") -> List[str]:
+        """`refresh` puis `members`."""
+        self.refresh(root, depth, lang)
+        return self.members(root, depth, lang)
+
+
+def _try_crawl(lang: str, cat: str) -> Optional[Tuple[List[str], List[str]]]:
+    try:
+        return _crawl(lang, cat)
+    except Exception as e:
+        print(f"⚠️  catégorie « {cat} » non parcourue ({e})", file=sys.stderr)
+        return None
+
+
+GRAPH = CategoryGraph()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Membres d’une catégorie (graphe persistant)")
+    ap.add_argument("category", help="Nom de la catégorie, sans préfixe")
+    ap.add_argument("--depth", type=int, default=1)
+    ap.add_argument("--lang", default="fr")
+    ap.add_argument("--ttl-days", type=float, default=TTL.days)
+    ns = ap.parse_args()
+
+    GRAPH.ttl = timedelta(days=ns.ttl_days)
+    t0 = time.monotonic()
+    n = GRAPH.refresh(ns.category, ns.depth, ns.lang)
+    t1 = time.monotonic()
+    pages = GRAPH.members(ns.category, ns.depth, ns.lang)
+    t2 = time.monotonic()
+    print(f"✅ {len(pages)} articles – {n} catégorie(s) re-parcourue(s) en {t1 - t0:.1f} s, "
+          f"lecture locale {1000 * (t2 - t1):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
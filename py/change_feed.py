@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# change_feed.py
+"""
+Invalidation des caches pilotée par le flux des modifications.
+
+Plutôt qu’une durée de vie fixe (données périmées ou re-téléchargements
+inutiles), on lit ce qui a réellement changé sur le wiki :
+
+  • polling de l’API MediaWiki : `list=recentchanges` (éditions, créations,
+    suppressions/renommages, catégorisations) et `list=logevents`
+    (`letype=protect`), avec continuation, depuis le dernier curseur ;
+  • ou rejeu d’un enregistrement EventStreams (`recentchange`) au format
+    JSONL – pratique pour les tests avec un flux local.
+
+`Invalidator` ne garde que les changements touchant les pages suivies (pages
+des panels et leurs discussions), les regroupe par wiki et par type puis
+appelle, par lots, les gestionnaires enregistrés pour ce type :
+
+    "edit"        wikitext (`page_cache`), séries d’éditions (`timeseries`)
+    "protect"     protections (`protection`)
+    "categorize"  graphe des catégories (`category_graph`, non filtrés)
+
+Les caches mémoire (`timeseries`) ne sont invalidés que dans le processus
+qui suit le flux (`start_thread`, option `--follow-changes` du service de
+scoring). Après une synchronisation réussie, `page_cache` sait que le flux
+couvre les pages suivies : celles qu’il n’a pas invalidées sont servies sans
+revalidation, les autres restent revalidées.
+
+Usage :
+    python py/change_feed.py --once                  # une passe (cron)
+    python py/change_feed.py --follow --interval 60  # suivi continu
+    python py/change_feed.py --replay events.jsonl   # rejeu d’un flux enregistré
+"""
+
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import page_cache
+import timeseries
+import wiki_http
+from taille_talk import _talk_title
+
+API_TEMPLATE = "https://{lang}.wikipedia.org/w/api.php"
+HEADERS = {"User-Agent": "ChangeFeed/1.0 (opsci)"}
+KINDS = ("edit", "protect", "categorize")
+BATCH = 500                          # titres par appel de gestionnaire
+OVERLAP = timedelta(seconds=60)      # recouvrement entre deux polls (réplication)
+RC_RETENTION = timedelta(days=30)    # au-delà, recentchanges a oublié le trou
+STATE_PATH = Path("py/cache/change_feed.json")
+
+
+@dataclass(frozen=True)
+class Change:
+    lang: str
+    title: str
+    kind: str                        # "edit" | "protect" | "categorize"
+    timestamp: str                   # ISO UTC, sans fuseau
+
+
+def _iso(ts) -> str:
+    """Horodatage MediaWiki (`…Z`) ou Unix → ISO UTC naïf, à la seconde."""
+    if isinstance(ts, (int, float)):
+        d = datetime.fromtimestamp(ts, tz=timezone.utc)
+    else:
+        d = datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+    return d.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def _rc_kind(rc_type: str, log_type: Optional[str]) -> Optional[str]:
+    if rc_type in ("edit", "new"):
+        return "edit"
+    if rc_type == "categorize":
+        return "categorize"
+    if rc_type == "log" and log_type in ("delete", "move", "merge"):
+        return "edit"
+    return None                      # protect : lu dans logevents
+
+# ─────────────────────────── sources ───────────────────────────
+
+def _pages(lang: str, params: dict, key: str) -> Iterator[dict]:
+    params = {"action": "query", "format": "json", "formatversion": 2, **params}
+    while True:
+        r = wiki_http.get(API_TEMPLATE.format(lang=lang), headers=HEADERS, params=params, timeout=30)
+        r.raise_for_status()
+        data = r.json()
+        yield from data.get("query", {}).get(key, [])
+        if "continue" not in data:
+            return
+        params.update(data["continue"])
+
+
+def poll(lang: str, since: str) -> List[Change]:
+    """Changements de `lang` depuis `since` (ISO UTC), dans l’ordre chronologique."""
+    start = f"{since}Z"
+    out: List[Change] = []
+    for rc in _pages(lang, {
+        "list": "recentchanges", "rcstart": start, "rcdir": "newer", "rclimit": "max",
+        "rctype": "edit|new|log|categorize", "rcprop": "title|timestamp|loginfo",
+    }, "recentchanges"):
+        kind = _rc_kind(rc.get("type", ""), rc.get("logtype"))
+        if kind:
+            out.append(Change(lang, rc["title"], kind, _iso(rc["timestamp"])))
+    for le in _pages(lang, {
+        "list": "logevents", "letype": "protect", "lestart": start, "ledir": "newer",
+        "lelimit": "max", "leprop": "title|timestamp",
+    }, "logevents"):
+        out.append(Change(lang, le["title"], "protect", _iso(le["timestamp"])))
+    return sorted(out, key=lambda c: c.timestamp)
+
+
+def from_event(ev: dict) -> Optional[Change]:
+    """Événement EventStreams `recentchange` → `Change` (None si hors Wikipédia)."""
+    host = ev.get("server_name") or ev.get("meta", {}).get("domain", "")
+    if not host.endswith(".wikipedia.org") or "title" not in ev:
+        return None
+    if ev.get("type") == "log" and ev.get("log_type") == "protect":
+        kind = "protect"
+    else:
+        kind = _rc_kind(ev.get("type", ""), ev.get("log_type"))
+    if kind is None:
+        return None
+    return Change(host.split(".")[0], ev["title"], kind, _iso(ev.get("timestamp", 0)))
+
+
+def replay(path: Path) -> Iterator[Change]:
+    """Rejoue un enregistrement JSONL (lignes brutes ou `data: {…}` du flux SSE)."""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line.startswith("data:"):
+                line = line[5:].strip()
+            if not line.startswith("{"):
+                continue
+            ch = from_event(json.loads(line))
+            if ch is not None:
+                yield ch
+
+# ─────────────────────────── invalidation ──────────────────────
+
+Handler = Callable[[str, List[str], str], int]   # (lang, titres, depuis) → nb invalidés
+HANDLERS: Dict[str, List[Handler]] = {k: [] for k in KINDS}
+UNFILTERED = {"categorize"}          # concerne des catégories, pas les pages suivies
+
+
+def register(kind: str) -> Callable[[Handler], Handler]:
+    if kind not in KINDS:
+        raise ValueError(f"type de changement inconnu : {kind}")
+
+    def deco(fn: Handler) -> Handler:
+        HANDLERS[kind].append(fn)
+        return fn
+    return deco
+
+
+@register("edit")
+def _drop_wikitext(lang: str, titles: List[str], since: str) -> int:
+    return page_cache.STORE.invalidate(lang, titles)
+
+
+@register("edit")
+def _drop_edit_series(lang: str, titles: List[str], since: str) -> int:
+    return timeseries.invalidate(f"{lang}.wikipedia", titles, since)
+
+
+@register("protect")
+def _drop_protection(lang: str, titles: List[str], since: str) -> int:
+    import protection
+    return protection.STORE.invalidate(lang, titles)
+
+
+@register("categorize")
+def _flag_categories(lang: str, titles: List[str], since: str) -> int:
+    import category_graph          # import local : seulement si le flux en parle
+    return category_graph.GRAPH.flag(lang, titles)
+
+
+class Invalidator:
+    """Filtre les changements sur les pages suivies et invalide par lots."""
+
+    def __init__(self, batch: int = BATCH):
+        self.batch = batch
+        self.tracked: Dict[str, Set[str]] = defaultdict(set)
+        self.stats = {"seen": 0, "relevant": 0, "invalidated": 0, "calls": 0}
+
+    def track(self, lang: str, pages: Iterable[str]) -> None:
+        """Suit ces pages et leurs pages de discussion."""
+        for p in pages:
+            self.tracked[lang].update((p, _talk_title(p, lang)))
+
+    def apply(self, changes: Iterable[Change]) -> Dict[str, int]:
+        """Applique les changements ; renvoie le nombre d’entrées invalidées par type."""
+        # (lang, type) → {titre: plus ancien changement}
+        groups: Dict[Tuple[str, str], Dict[str, str]] = defaultdict(dict)
+        for ch in changes:
+            self.stats["seen"] += 1
+            if ch.kind not in UNFILTERED and ch.title not in self.tracked.get(ch.lang, ()):
+                continue
+            self.stats["relevant"] += 1
+            first = groups[ch.lang, ch.kind]
+            first[ch.title] = min(first.get(ch.title, ch.timestamp), ch.timestamp)
+
+        done = {k: 0 for k in KINDS}
+        for (lang, kind), first in groups.items():
+            titles = sorted(first, key=first.get)
+            for k in range(0, len(titles), self.batch):
+                part = titles[k:k + self.batch]
+                since = first[part[0]]
+                for fn in HANDLERS[kind]:
+                    done[kind] += fn(lang, part, since)
+                    self.stats["calls"] += 1
+        self.stats["invalidated"] += sum(done.values())
+        return done
+
+# ─────────────────────────── synchronisation ───────────────────
+
+def _load_state(path: Path) -> dict:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def _save_state(path: Path, state: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=1))
+    os.replace(tmp, path)
+
+
+def sync(inv: Invalidator, langs: Iterable[str], state_path: Path = STATE_PATH) -> Dict[str, int]:
+    """
+    Une passe de polling par wiki depuis le curseur sauvegardé. Un premier
+    passage (ou un trou plus long que `RC_RETENTION`) ouvre une nouvelle
+    fenêtre de suivi : rien de ce qui précède n’est garanti par le flux.
+    """
+    state = _load_state(state_path)
+    total = {k: 0 for k in KINDS}
+    for lang in langs:
+        now = _now()
+        st = state.get(lang)
+        if st is None or datetime.fromisoformat(now) - datetime.fromisoformat(st["cursor"]) > RC_RETENTION:
+            st = {"since": now, "cursor": now}
+        start = (datetime.fromisoformat(st["cursor"]) - OVERLAP).isoformat(timespec="seconds")
+        try:
+            done = inv.apply(poll(lang, start))
+        except Exception as e:
+            print(f"⚠️  flux {lang} indisponible ({e})", file=sys.stderr)
+            continue
+        for k, n in done.items():
+            total[k] += n
+        st["cursor"] = now
+        state[lang] = st
+        _save_state(state_path, state)
+        page_cache.STORE.watch(lang, inv.tracked.get(lang, ()))
+        page_cache.STORE.mark_synced(lang, st["since"], now)
+    return total
+
+
+def start_thread(inv: Invalidator, langs: List[str], interval: float = 60.0,
+                 state_path: Path = STATE_PATH) -> threading.Thread:
+    """
+    Suivi en tâche de fond dans le processus courant : nécessaire pour les
+    caches mémoire (`timeseries`), `page_cache` étant partagé via SQLite.
+    """
+    def loop():
+        while True:
+            sync(inv, langs, state_path)
+            time.sleep(interval)
+    t = threading.Thread(target=loop, name="change-feed", daemon=True)
+    t.start()
+    return t
+
+
+def _panel_pages(panels: Optional[List[str]] = None) -> List[str]:
+    """Pages des panels du registre (tous par défaut)."""
+    from registry import REGISTRY
+    return list(dict.fromkeys(p for name in panels or REGISTRY.panels() for p in REGISTRY.pages(name)))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Invalidation des caches par le flux des modifications")
+    ap.add_argument("--panels", nargs="*", help="Panels suivis (défaut : tous ceux du registre)")
+    ap.add_argument("--lang", nargs="+", default=["fr"])
+    ap.add_argument("--state", default=str(STATE_PATH))
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--once", action="store_true", help="Une seule passe (défaut, pour cron)")
+    mode.add_argument("--follow", action="store_true", help="Boucle de polling")
+    mode.add_argument("--replay", metavar="JSONL", help="Rejoue un enregistrement EventStreams")
+    ap.add_argument("--interval", type=float, default=60.0, help="Secondes entre deux polls")
+    ns = ap.parse_args()
+
+    inv = Invalidator()
+    pages = _panel_pages(ns.panels)
+    for lang in ns.lang:
+        inv.track(lang, pages)
+
+    if ns.replay:
+        done = inv.apply(replay(Path(ns.replay)))
+        print(f"✅ {inv.stats['relevant']}/{inv.stats['seen']} changements pertinents : {done}")
+        return
+    while True:
+        done = sync(inv, ns.lang, Path(ns.state))
+        print(f"🔄 {_now()} : {done}")
+        if not ns.follow:
+            return
+        time.sleep(ns.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# charts.py
+"""
+Graphiques de séries temporelles à volume borné.
+
+Avant de construire la figure Plotly, chaque série est réduite par LTTB
+(Largest-Triangle-Three-Buckets) : on garde au plus `PIXEL_BUDGET` points par
+tracé, choisis pour préserver la forme (pics compris). Le budget par tracé
+baisse quand le nombre de tracés augmente, pour que le total envoyé au
+navigateur reste de l’ordre de `MAX_TOTAL_POINTS`.
+
+Au-delà de `WEBGL_AFTER_POINTS` points ou `WEBGL_AFTER_TRACES` tracés, la
+figure passe en rendu WebGL (`scattergl`).
+
+Fonctions exposées :
+    lttb(x, y, n_out) -> np.ndarray (indices gardés)
+    downsample(df, x, y, group=None, max_points=PIXEL_BUDGET) -> pd.DataFrame
+    line_chart(df, x, y, color=None, title=None, **px_kwargs) -> go.Figure
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:                # plotly n’est importé qu’au premier graphique
+    import plotly.graph_objects as go
+
+PIXEL_BUDGET = 1_000          # points max par tracé (~ largeur utile en px)
+MAX_TOTAL_POINTS = 20_000     # budget global réparti entre les tracés
+MIN_POINTS_PER_TRACE = 50     # plancher par tracé
+WEBGL_AFTER_POINTS = 5_000    # bascule WebGL au-delà de ce nombre de points…
+WEBGL_AFTER_TRACES = 20       # … ou de ce nombre de tracés
+
+# ─────────────────────────── LTTB ──────────────────────────────
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices des `n_out` points retenus par LTTB (premier et dernier inclus)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)  # n_out-2 seaux internes
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def _as_float(col: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col.astype("int64").to_numpy(dtype="float64")
+    return pd.to_numeric(col, errors="coerce").to_numpy(dtype="float64")
+
+
+def downsample(
+    df: pd.DataFrame, x: str, y: str, group: Optional[str] = None,
+    max_points: int = PIXEL_BUDGET,
+) -> pd.DataFrame:
+    """Réduit chaque tracé (`group`) à `max_points` points par LTTB."""
+    if df.empty:
+        return df
+    if group is None:
+        df = df.sort_values(x)
+        idx = lttb(_as_float(df[x]), _as_float(df[y]), max_points)
+        return df.iloc[idx]
+    parts = [downsample(g, x, y, None, max_points) for _, g in df.groupby(group, sort=False)]
+    return pd.concat(parts, ignore_index=True)
+
+# ─────────────────────────── figure ────────────────────────────
+
+def line_chart(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    color: Optional[str] = None,
+    title: Optional[str] = None,
+    line_group: Optional[str] = None,
+    pixel_budget: int = PIXEL_BUDGET,
+    max_total_points: int = MAX_TOTAL_POINTS,
+    webgl_after_points: int = WEBGL_AFTER_POINTS,
+    webgl_after_traces: int = WEBGL_AFTER_TRACES,
+    **px_kwargs,
+) -> go.Figure:
+    """`px.line` précédé du sous-échantillonnage LTTB et du choix SVG/WebGL."""
+    import plotly.express as px
+    group = line_group or color
+    n_traces = df[group].nunique() if group and not df.empty else 1
+    budget = min(pixel_budget, max(MIN_POINTS_PER_TRACE, max_total_points // max(n_traces, 1)))
+    small = downsample(df, x, y, group, budget)
+    webgl = len(small) > webgl_after_points or n_traces > webgl_after_traces
+    return px.line(
+        small, x=x, y=y, color=color, line_group=line_group, title=title,
+        render_mode="webgl" if webgl else "svg", **px_kwargs,
+    )
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# compact_metrics.py
+"""
+Représentation compacte des métriques brutes pour les gros panels.
+
+  • index de pages catégoriel : chaque titre est stocké une fois, les lignes
+    ne portent qu’un code int32 ;
+  • une seule matrice float32 (pages × métriques), sans copie par colonne ;
+  • normalisation et agrégation sur place (`ScoringModel.evaluate(inplace=True)`) ;
+    si l’ordre des colonnes diffère de celui du modèle, elles sont d’abord
+    rangées sur place (`reorder_`), une fois, par blocs de lignes.
+
+`frame()` et `scores_frame()` exposent les données comme DataFrames pandas
+*sans copie* (vues sur les matrices) : le reste du code garde son API.
+
+Ordre de grandeur pour 1 M de pages et 8 métriques : 32 Mo de métriques,
+16 Mo de scores, 4 Mo de codes, plus les titres eux-mêmes.
+
+Usage hors ligne :
+    python py/compact_metrics.py metrics.parquet --out scores.parquet [--norm percentile --lang fr]
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence
+from pathlib import Path
+import argparse
+import numpy as np
+import pandas as pd
+
+from scoring_model import GROUPS, ScoringModel
+
+DTYPE = np.float32
+READ_BATCH = 65_536         # lignes par lot de lecture parquet
+
+
+class CompactMetrics:
+    """Métriques (pages × colonnes) en float32, pages internées en catégories."""
+
+    def __init__(self, pages: pd.Categorical, columns: Sequence[str], values: np.ndarray):
+        if values.shape != (len(pages), len(columns)):
+            raise ValueError(f"forme {values.shape} ≠ ({len(pages)}, {len(columns)})")
+        self.pages = pages
+        self.columns = list(columns)
+        self.values = values
+        self.scores: Optional[np.ndarray] = None
+
+    # ─────────────────────────── construction ──────────────────
+
+    @classmethod
+    def from_columns(cls, pages: Sequence[str], columns: Dict[str, Sequence[float]]) -> "CompactMetrics":
+        values = np.empty((len(pages), len(columns)), dtype=DTYPE)
+        for j, col in enumerate(columns.values()):
+            values[:, j] = col                  # conversion float32 colonne par colonne
+        return cls(pd.Categorical(pages), list(columns), values)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Optional[List[str]] = None) -> "CompactMetrics":
+        cols = columns or list(df.columns)
+        return cls.from_columns(df.index, {c: df[c].to_numpy() for c in cols})
+
+    @classmethod
+    def read_parquet(cls, path: Path, columns: List[str], page_col: str = "page") -> "CompactMetrics":
+        """
+        Lit un parquet (une colonne de pages + métriques) directement dans la
+        matrice float32, par lots : jamais de table complète en mémoire.
+        """
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path, read_dictionary=[page_col])
+        values = np.empty((pf.metadata.num_rows, len(columns)), dtype=DTYPE)
+        k = 0
+        for batch in pf.iter_batches(batch_size=READ_BATCH, columns=columns):
+            for j, c in enumerate(columns):
+                values[k:k + batch.num_rows, j] = batch.column(c).to_numpy(zero_copy_only=False)
+            k += batch.num_rows
+
+        pages = pf.read(columns=[page_col]).column(page_col).combine_chunks()
+        # titres gardés dans le buffer Arrow : pas d’objet Python par titre
+        cats = pd.Categorical.from_codes(
+            pages.indices.to_numpy(zero_copy_only=False).astype(np.int32),
+            pd.Index(pd.array(pages.dictionary, dtype="string[pyarrow]")),
+        )
+        return cls(cats, columns, values)
+
+    # ─────────────────────────── vues pandas ───────────────────
+
+    @property
+    def index(self) -> pd.CategoricalIndex:
+        return pd.CategoricalIndex(self.pages, name="page")
+
+    def frame(self) -> pd.DataFrame:
+        """Vue DataFrame (sans copie) des métriques – normalisées après `score`."""
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns, copy=False)
+
+    def scores_frame(self) -> pd.DataFrame:
+        if self.scores is None:
+            raise RuntimeError("score() n’a pas encore été appelé")
+        return pd.DataFrame(self.scores, index=self.index,
+                            columns=[*GROUPS, "sensitivity"], copy=False)
+
+    def nbytes(self) -> int:
+        n = self.values.nbytes + self.pages.codes.nbytes
+        return n + (self.scores.nbytes if self.scores is not None else 0)
+
+    # ─────────────────────────── scoring ───────────────────────
+
+    def reorder_(self, names: Sequence[str]) -> None:
+        """
+        Range sur place les colonnes `names` en tête, dans cet ordre (les
+        autres ensuite), par blocs de `READ_BATCH` lignes : la copie
+        temporaire ne dépasse pas un bloc.
+        """
+        order = [self.columns.index(n) for n in names]
+        order += [j for j in range(len(self.columns)) if j not in order]
+        if order == list(range(len(self.columns))):
+            return
+        for a in range(0, len(self.values), READ_BATCH):
+            block = self.values[a:a + READ_BATCH]
+            block[:] = block[:, order]
+        self.columns = [self.columns[j] for j in order]
+
+    def to_percentiles_(self, lang: str, columns: List[str]) -> List[str]:
+        """Remplace sur place les colonnes par leur rang percentile de référence."""
+        from reference_dist import STORE, MIN_COUNT
+        done = []
+        for m in columns:
+            s = STORE.sketch(lang, m)
+            if s is None or s.count < MIN_COUNT or m not in self.columns:
+                continue
+            j = self.columns.index(m)
+            self.values[:, j] = s.rank(self.values[:, j])
+            done.append(m)
+        return done
+
+    def score(self, model: Optional[ScoringModel] = None, normalization: str = "panel",
+              lang: str = "fr") -> pd.DataFrame:
+        """
+        Normalise les métriques *sur place* puis agrège ; renvoie la vue
+        `scores_frame()`. Les colonnes hors modèle sont ignorées.
+        """
+        if model is None:
+            from wikipedia_scoring_pipeline import MODEL as model
+        names = model.metric_names
+        max_vals = None
+        if normalization == "percentile":
+            by_max = [s.name for s in model.specs if s.norm == "max"]
+            ranked = set(self.to_percentiles_(lang, by_max))
+            max_vals = np.array([1.0 if n in ranked else np.nan for n in names])
+        elif normalization != "panel":
+            raise ValueError(f"normalisation inconnue : {normalization}")
+
+        self.reorder_(names)
+        X = self.values[:, :len(names)]          # vue : aucune copie
+        if max_vals is not None:
+            panel_max = np.fmax.reduce(X, axis=0) if len(X) else np.zeros(len(names))
+            max_vals = np.where(np.isnan(max_vals), panel_max, max_vals)
+        self.scores = model.evaluate(X, max_vals, inplace=True)
+        return self.scores_frame()
+
+
+def main():
+    from wikipedia_scoring_pipeline import MODEL
+    ap = argparse.ArgumentParser(description="Scoring compact d’un panel hors ligne (parquet)")
+    ap.add_argument("metrics", help="Parquet : colonne 'page' + métriques brutes")
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--norm", choices=["panel", "percentile"], default="panel")
+    ap.add_argument("--lang", default="fr")
+    ns = ap.parse_args()
+
+    # colonnes lues directement dans l’ordre du modèle : `score` n’a rien à ranger
+    cm = CompactMetrics.read_parquet(Path(ns.metrics), MODEL.metric_names)
+    scores = cm.score(normalization=ns.norm, lang=ns.lang)
+    scores.reset_index().to_parquet(ns.out)
+    print(f"✅ {len(scores)} pages scorées ({cm.nbytes() / 1e6:.0f} Mo) → {ns.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,11 @@ Fonctionnalités principales
   `metrics/edits/per-page`.
 * **Détection de pic d’éditions** (spike) : identifie le jour où l’activité
   atteint son maximum et calcule un score de surprise.
-* **Convenience helper** `fetch_edit_pages` pour récupérer directement un
+* **Convenience helper** `fetch_edit_pages` pour récupérer directement un
   DataFrame multi‑pages (pour graphiques Plotly, par exemple).
 
+Les séries passent par le service partagé `timeseries` (cache par processus).
+
 API appelée :
 https://wikimedia.org/api/rest_v1/metrics/edits/per-page/<site>/<page>/<editor_type>/daily/<start>/<end>
 
@@ -19,63 +21,47 @@ Le module ne s’occupe PAS (volontairement) des scores de revert‑risk.
 """
 
 from __future__ import annotations
-from typing import List, Dict
+from typing import List, Dict, Optional
 import pandas as pd
-import requests, time
+import timeseries
+import wiki_http
 from datetime import datetime, timedelta
 import argparse
-
-UA = "EditTrendBot/2.0 (opsci)"
-_SESSION = requests.Session()
-_SESSION.headers.update({"User-Agent": UA, "Accept": "application/json"})
+import sys
 
 # ─────────────────────────── helpers ────────────────────────────
 
-def _date_fmt(date: str | datetime) -> str:
-    """YYYYMMDD pour l’API REST"""
-    if isinstance(date, datetime):
-        return date.strftime("%Y%m%d")
-    return date.replace("-", "")
-
-
-def _call_edit_api(site: str, page: str, start: str, end: str, editor_type: str) -> pd.Series:
-    encoded = requests.utils.quote(page.replace(" ", "_"), safe="")
-    url = (
-        f"https://wikimedia.org/api/rest_v1/metrics/edits/per-page/"
-        f"{site}/{encoded}/{editor_type}/daily/{_date_fmt(start)}/{_date_fmt(end)}"
-    )
+def _call_edit_api(site: str, page: str, start: str, end: str, editor_type: str) -> Optional[pd.Series]:
+    """Série quotidienne d’éditions ; None si l’API échoue."""
     try:
-        r = _SESSION.get(url, timeout=30)
-        r.raise_for_status()
-        items = r.json().get("items", [])
-        if not items or not items[0].get("results"):
-            return pd.Series(name=page)
-        results = items[0]["results"]
-        key = "count" if "count" in results[0] else "edits"
-        data = {
-            pd.to_datetime(r["timestamp"], utc=True): r.get(key, 0)
-            for r in results
-        }
-        return pd.Series(data, name=page).sort_index()
-    except Exception:
-        return pd.Series(name=page)
+        return timeseries.get_series(site, page, "edits", start, end, agent=editor_type)
+    except Exception as e:
+        print(f"⚠️  {page} : éditions indisponibles ({e})", file=sys.stderr)
+        return None
 
 # ─────────────────────────── API publiques ─────────────────────
 
 def get_edit_timeseries(
     pages: List[str], start: str, end: str, lang: str = "en", editor_type: str = "user"
 ) -> Dict[str, pd.Series]:
-    """Dict {page: Series(utc, edits)}"""
+    """Dict {page: Series(date, edits)} (Series vide si échec)"""
     site = f"{lang}.wikipedia.org"
-    return {p: _call_edit_api(site, p, start, end, editor_type) for p in pages}
+    return {p: s if (s := _call_edit_api(site, p, start, end, editor_type)) is not None else pd.Series(name=p)
+            for p in pages}
 
 
 def get_edit_spike_detail(
     pages: List[str], start: str, end: str, lang: str = "en", editor_type: str = "user"
 ) -> pd.DataFrame:
-    """DataFrame `[edit_spike, peak_day_edits, peak_edits]`"""
+    """DataFrame `[edit_spike, peak_day_edits, peak_edits]` (edit_spike NaN si l’API échoue)"""
     rows: Dict[str, Dict[str, object]] = {}
-    for p, serie in get_edit_timeseries(pages, start, end, lang, editor_type).items():
+    site = f"{lang}.wikipedia.org"
+    for p in pages:
+        with wiki_http.page_scope():
+            serie = _call_edit_api(site, p, start, end, editor_type)
+        if serie is None:
+            rows[p] = {"edit_spike": float("nan"), "peak_day_edits": None, "peak_edits": None}
+            continue
         if serie.empty:
             rows[p] = {"edit_spike": 0.0, "peak_day_edits": None, "peak_edits": 0}
             continue
@@ -100,11 +86,10 @@ def fetch_edit_pages(site: str, pages: List[str], start: str, end: str, editor_t
     dfs = []
     for p in pages:
         serie = _call_edit_api(site, p, start, end, editor_type)
-        if not serie.empty:
+        if serie is not None and not serie.empty:
             df = serie.rename("edits").reset_index().rename(columns={"index": "date"})
             df["page"] = p
             dfs.append(df)
-        time.sleep(0.1)  # politesse API
     return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(columns=["date", "edits", "page"])
 
 # ─────────────────────────── CLI & démo ─────────────────────────
@@ -1,36 +1,37 @@
 # graph_1.py
-import requests
 import pandas as pd
-from datetime import datetime
-import time
 
-# User-Agent pour l'API Wikimedia
-UA = "PageviewsDemo/1.0 (https://github.com/aureliusLF; alefichoux@gmail.com)"
-session = requests.Session()
-session.headers.update({"User-Agent": UA})
+import timeseries
 
-# Fonction d'appel API pour time series de pageviews
-def pageviews_timeseries(site: str, page: str, start: str, end: str) -> pd.DataFrame:
-    start_ts = datetime.strptime(start, "%Y-%m-%d").strftime("%Y%m%d00")
-    end_ts = datetime.strptime(end, "%Y-%m-%d").strftime("%Y%m%d00")
-    url = (
-        f"https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article/"
-        f"{site}/all-access/user/{page}/daily/{start_ts}/{end_ts}"
-    )
-    r = session.get(url, timeout=30)
-    r.raise_for_status()
-    items = r.json().get("items", [])
+# Fonction d'appel API pour time series de pageviews (via le service partagé)
+def pageviews_timeseries(site: str, page: str, start: str, end: str, granularity: str = "daily") -> pd.DataFrame:
+    serie = timeseries.get_series(site, page, "pageviews", start, end, granularity=granularity)
     df = pd.DataFrame({
-        "date": pd.to_datetime([it["timestamp"] for it in items], format="%Y%m%d00"),
-        "views": [it["views"] for it in items],
+        "date": serie.index,
+        "views": serie.values,
         "page": page
     })
     return df
 
 # Fonction pour plusieurs pages
-def fetch_pageviews(site: str, pages: list[str], start: str, end: str) -> pd.DataFrame:
+# granularity : "daily", "monthly" ou "auto" (choisi selon la durée, cf. timeseries.pick_granularity)
+def fetch_pageviews(site: str, pages: list[str], start: str, end: str, granularity: str = "daily") -> pd.DataFrame:
+    if granularity == "auto":
+        granularity = timeseries.pick_granularity(start, end, "overview")
     dfs = []
     for p in pages:
-        dfs.append(pageviews_timeseries(site, p, start, end))
-        time.sleep(0.1)
+        dfs.append(pageviews_timeseries(site, p, start, end, granularity))
     return pd.concat(dfs, ignore_index=True)
+
+# Détail quotidien autour des pics d'une vue mensuelle (une fenêtre = un tracé)
+def fetch_pageviews_peaks(site: str, monthly: pd.DataFrame, start: str, end: str,
+                          top: int = 1, radius_days: int = 15) -> pd.DataFrame:
+    dfs = []
+    for p, grp in monthly.groupby("page"):
+        serie = grp.set_index("date")["views"]
+        for i, (a, b) in enumerate(timeseries.peak_windows(serie, top, radius_days)):
+            a, b = max(a, pd.Timestamp(start)), min(b, pd.Timestamp(end))
+            df = pageviews_timeseries(site, p, a, b)
+            df["window"] = f"{p} #{i + 1}"
+            dfs.append(df)
+    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(columns=["date", "views", "page", "window"])
@@ -2,33 +2,20 @@
 # panel_politique_recursive.py
 
 from __future__ import annotations
-from typing import List, Tuple, Set
-import requests
+from typing import List, Tuple
+from contextlib import nullcontext
 import pandas as pd
 from datetime import datetime, timedelta
 import argparse
 
-API_ROOT = "https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article"
-UA = {"User-Agent": "PageviewSpike/1.3 (opsci)"}
-WIKI_API = "https://fr.wikipedia.org/w/api.php"
-
-def _date_fmt(date: str | datetime) -> str:
-    if isinstance(date, datetime):
-        return date.strftime("%Y%m%d")
-    return date.replace("-", "")
+import profiling
+import timeseries
+from category_graph import GRAPH
+from registry import REGISTRY
 
 def _fetch_series(title: str, start: str, end: str, lang: str) -> pd.Series:
-    title_enc = requests.utils.quote(title.replace(" ", "_"), safe="")
-    url = (
-        f"{API_ROOT}/{lang}.wikipedia/all-access/user/"
-        f"{title_enc}/daily/{_date_fmt(start)}/{_date_fmt(end)}"
-    )
     try:
-        r = requests.get(url, headers=UA, timeout=20)
-        r.raise_for_status()
-        items = r.json().get("items", [])
-        data = {pd.to_datetime(i["timestamp"][:8], format="%Y%m%d"): i["views"] for i in items}
-        return pd.Series(data, name=title)
+        return timeseries.get_series(f"{lang}.wikipedia", title, "pageviews", start, end)
     except Exception:
         return pd.Series(name=title)
 
@@ -40,44 +27,11 @@ def get_category_members_recursive(
     """
     Récupère tous les titres d'articles (namespace 0) dans la catégorie root_cat
     et ses sous-catégories jusqu'à max_depth (0 = uniquement root).
+
+    Passe par le graphe persistant (`category_graph`) : seules les catégories
+    périmées ou signalées sont re-parcourues.
     """
-    visited_cats: Set[str] = set()
-    pages: Set[str] = set()
-
-    def recurse(cat: str, depth: int):
-        if depth > max_depth or cat in visited_cats:
-            return
-        visited_cats.add(cat)
-
-        params = {
-            "action": "query",
-            "list": "categorymembers",
-            "cmtitle": f"Category:{cat}",
-            "cmlimit": "500",
-            "format": "json",
-        }
-
-        while True:
-            resp = requests.get(WIKI_API, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-
-            for member in data["query"]["categorymembers"]:
-                ns = member["ns"]
-                title = member["title"]
-                if ns == 0:
-                    pages.add(title)
-                elif ns == 14:  # sous-catégorie
-                    subcat = title.split(":", 1)[1]
-                    recurse(subcat, depth + 1)
-
-            if "continue" in data:
-                params.update(data["continue"])
-            else:
-                break
-
-    recurse(root_cat, 0)
-    return list(pages)
+    return GRAPH.panel(root_cat, max_depth, lang)
 
 def compute_total_views(
     pages: List[str],
@@ -94,7 +48,7 @@ def compute_total_views(
 
 def main():
     ap = argparse.ArgumentParser(
-        description="Génère panel.csv des 100 pages les plus vues d'une catégorie et de ses sous-catégories"
+        description="Enregistre dans le registre le panel des 100 pages les plus vues d'une catégorie et de ses sous-catégories"
     )
     ap.add_argument(
         "--days", type=int, default=5,
@@ -113,21 +67,36 @@ def main():
         help="Profondeur de recherche dans les sous-catégories (défaut=1)"
     )
     ap.add_argument(
-        "--output", default="panel.csv",
-        help="Nom du fichier CSV de sortie (défaut=panel.csv)"
+        "--ttl-days", type=float, default=GRAPH.ttl.days,
+        help="Âge au-delà duquel une catégorie est re-parcourue (défaut=7)"
+    )
+    ap.add_argument(
+        "--output",
+        help="Exporte aussi le panel dans ce fichier CSV (format panel.csv)"
+    )
+    ap.add_argument(
+        "--profile", nargs="?", const=str(profiling.PROFILE_ROOT), metavar="DOSSIER",
+        help="Profil CPU (piles repliées) et mémoire du run, écrit dans DOSSIER"
     )
     ns = ap.parse_args()
+    GRAPH.ttl = timedelta(days=ns.ttl_days)
+    with profiling.session(ns.profile, "get_panel") if ns.profile else nullcontext():
+        _run(ns)
+
 
+def _run(ns: argparse.Namespace) -> None:
     today = datetime.utcnow().date()
     start = (today - timedelta(days=ns.days)).isoformat()
     end = today.isoformat()
 
     print(f"🔍 Exploration de la catégorie « {ns.category} » jusqu'à une profondeur de {ns.depth}…")
-    pages = get_category_members_recursive(ns.category, ns.depth, ns.lang)
+    with profiling.stage("categories"):
+        pages = get_category_members_recursive(ns.category, ns.depth, ns.lang)
     print(f"→ {len(pages)} articles trouvés au total.")
 
     print(f"📊 Calcul des vues sur {ns.days} jours ({start} → {end})…")
-    views = compute_total_views(pages, start, end, ns.lang)
+    with profiling.stage("pageviews"):
+        views = compute_total_views(pages, start, end, ns.lang)
 
     df = (
         pd.DataFrame(views, columns=["page", "TotalViews"])
@@ -136,12 +105,14 @@ def main():
         .reset_index(drop=True)
     )
 
-    # Ajout de la colonne 'panel'
-    df["panel"] = ns.category
-    
-  
-    df.to_csv(ns.output, index=False)
-    print(f"✅ {ns.output} généré avec la colonne 'panel'.")
+    # nouvelle version du panel dans le registre (les autres panels ne sont pas touchés)
+    version = REGISTRY.save_panel(ns.category, df["page"].tolist(), df["TotalViews"].tolist(),
+                                  lang=ns.lang, source="get_panel")
+    print(f"✅ Panel « {ns.category} » enregistré (version {version}, {len(df)} pages).")
+    if ns.output:
+        df["panel"] = ns.category
+        df.to_csv(ns.output, index=False)
+        print(f"✅ {ns.output} généré avec la colonne 'panel'.")
 
 if __name__ == "__main__":
     main()
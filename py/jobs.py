@@ -0,0 +1,188 @@
+# jobs.py
+"""
+Jobs de scoring en arrière-plan.
+
+Les dashboards Streamlit ré-exécutent leur script à chaque interaction : un
+calcul lancé dans le script est bloquant et perdu au moindre clic. Ici, le
+calcul est soumis à un pool de threads au niveau du module ; comme les
+modules importés survivent aux reruns, le job aussi. L’UI se contente de
+relire sa progression (pages faites par métrique) et ses tables partielles.
+
+  • `submit_scoring(pages, start, end, lang)` : `compute_scores` en tâche de fond ;
+  • `submit(key, fn)` : tâche générique, `fn(job)` rapporte via `job.report` ;
+  • une même clé renvoie le job existant, même terminé (pas de double
+    calcul, pas de relance implicite) ; `replace` liste les statuts
+    terminaux à relancer, pour une action explicite de l’utilisateur ;
+  • `job.cancel()` interrompt la collecte à la tranche suivante ;
+  • avec `WIKI_PROFILE` défini, chaque job est profilé (`profiling`).
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+import threading
+import uuid
+import pandas as pd
+
+MAX_WORKERS = 2          # jobs simultanés par processus
+MAX_JOBS_KEPT = 32       # jobs terminés gardés en mémoire (LRU)
+
+PENDING, RUNNING, DONE, CANCELLED, FAILED = "pending", "running", "done", "cancelled", "error"
+RETRY = (CANCELLED, FAILED)              # relancer un job interrompu
+RECOMPUTE = (DONE, CANCELLED, FAILED)    # recalculer même un résultat existant
+
+# ─────────────────────────── job ───────────────────────────────
+
+@dataclass
+class Job:
+    key: Hashable
+    label: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    submitted_at: datetime = field(default_factory=datetime.utcnow)
+    status: str = PENDING
+    result: Any = None
+    error: Optional[str] = None
+    # étape (ex. métrique) → (pages faites, pages total)
+    progress: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    # étape → {page: valeur}
+    partial: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _future: Optional[Future] = field(default=None, repr=False)
+
+    # — rapport depuis le thread de calcul —
+    def report(self, stage: str, values: pd.Series, done: int, total: int) -> None:
+        """Callback compatible `compute_scores(on_chunk=…)`."""
+        with self._lock:
+            self.progress[stage] = (done, total)
+            self.partial.setdefault(stage, {}).update(values.to_dict())
+
+    @property
+    def cancel_event(self) -> threading.Event:
+        return self._cancel
+
+    # — lecture depuis l’UI —
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, CANCELLED, FAILED)
+
+    def fraction(self) -> float:
+        with self._lock:
+            if not self.progress:
+                return 0.0
+            done = sum(d for d, _ in self.progress.values())
+            total = sum(t for _, t in self.progress.values())
+        return done / total if total else 0.0
+
+    def progress_frame(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [{"étape": k, "faites": d, "total": t} for k, (d, t) in self.progress.items()]
+        return pd.DataFrame(rows, columns=["étape", "faites", "total"])
+
+    def partial_frame(self) -> pd.DataFrame:
+        with self._lock:
+            data = {k: dict(v) for k, v in self.partial.items()}
+        return pd.DataFrame(data)
+
+# ─────────────────────────── registre ──────────────────────────
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="scoring-job")
+_JOBS: "OrderedDict[str, Job]" = OrderedDict()
+_BY_KEY: Dict[Hashable, str] = {}
+_LOCK = threading.Lock()
+
+
+def _run(job: Job, fn: Callable[[Job], Any]) -> None:
+    from wikipedia_scoring_pipeline import ScoringCancelled
+    import profiling
+    job.status = RUNNING
+    try:
+        with profiling.from_env(job.label):      # WIKI_PROFILE=dossier
+            job.result = fn(job)
+        job.status = DONE
+    except ScoringCancelled:
+        job.status = CANCELLED
+    except Exception as e:  # l’erreur est affichée par l’UI
+        job.error = f"{type(e).__name__}: {e}"
+        job.status = FAILED
+
+
+def _evict() -> None:
+    finished = [jid for jid, j in _JOBS.items() if j.finished]
+    while len(_JOBS) > MAX_JOBS_KEPT and finished:
+        jid = finished.pop(0)
+        job = _JOBS.pop(jid)
+        if _BY_KEY.get(job.key) == jid:
+            del _BY_KEY[job.key]
+
+
+def submit(key: Hashable, fn: Callable[[Job], Any], label: str = "",
+           replace: Tuple[str, ...] = ()) -> Job:
+    """
+    Soumet `fn(job)` au pool. Si un job de même clé existe, il est renvoyé
+    tel quel, quel que soit son statut, sauf si ce statut figure dans
+    `replace` (ex. `RETRY`, `RECOMPUTE`) : un nouveau job le remplace. Un job
+    en cours n’est jamais remplacé.
+    """
+    with _LOCK:
+        jid = _BY_KEY.get(key)
+        if jid is not None and _JOBS[jid].status not in replace:
+            _JOBS.move_to_end(jid)
+            return _JOBS[jid]
+        job = Job(key=key, label=label or str(key))
+        _JOBS[job.id] = job
+        _BY_KEY[key] = job.id
+        _evict()
+    job._future = _EXECUTOR.submit(_run, job, fn)
+    return job
+
+
+def submit_scoring(pages: List[str], start: str, end: str, lang: str = "fr",
+                   deadline: Optional[float] = None, replace: Tuple[str, ...] = ()) -> Job:
+    """
+    `compute_scores` en arrière-plan ; `job.result` = (ScoringResult, métriques brutes).
+    `deadline` : budget du run en secondes (pages hors délai marquées manquantes).
+    """
+    from wikipedia_scoring_pipeline import compute_scores
+    key = ("scores", tuple(pages), start, end, lang, deadline)
+
+    def fn(job: Job):
+        return compute_scores(pages, start, end, lang, on_chunk=job.report,
+                              cancel=job.cancel_event, deadline=deadline)
+
+    return submit(key, fn, label=f"{len(pages)} pages {start}→{end} ({lang})", replace=replace)
+
+
+def submit_series(panel: str, pages: List[str], start: str, end: str, lang: str = "fr",
+                  window: int = 30, freq: str = "D", replace: Tuple[str, ...] = ()) -> Job:
+    """`sensitivity_series.series` en arrière-plan ; `job.result` = série longue."""
+    from sensitivity_series import series
+    key = ("series", panel, tuple(pages), start, end, lang, window, freq)
+
+    def fn(job: Job):
+        return series(panel, pages, start, end, lang, window, freq,
+                      on_chunk=job.report, cancel=job.cancel_event)
+
+    return submit(key, fn, label=f"série {len(pages)} pages {start}→{end} ({lang})", replace=replace)
+
+
+def get(job_id: str) -> Optional[Job]:
+    with _LOCK:
+        return _JOBS.get(job_id)
+
+
+def cancel(job_id: str) -> None:
+    job = get(job_id)
+    if job is not None:
+        job.cancel()
+
+
+def list_jobs() -> List[Job]:
+    with _LOCK:
+        return list(_JOBS.values())
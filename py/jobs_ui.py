@@ -0,0 +1,44 @@
+# jobs_ui.py
+"""
+Affichage Streamlit d’un job de scoring (`jobs.Job`) : barre de progression,
+avancement par métrique, table partielle et bouton d’annulation.
+
+La zone de suivi est un fragment rafraîchi toutes les `POLL_SECONDS` : seul
+le fragment est ré-exécuté, pas tout le script. Quand le job se termine, un
+rerun complet affiche les résultats.
+"""
+
+from __future__ import annotations
+import streamlit as st
+
+import jobs
+
+POLL_SECONDS = 1.0
+
+
+def show_job(job: jobs.Job, key: str) -> bool:
+    """Renvoie True quand `job.result` est disponible."""
+    if job.status == jobs.DONE:
+        return True
+    if job.status == jobs.FAILED:
+        st.error(f"Le calcul a échoué : {job.error}")
+        return False
+    if job.status == jobs.CANCELLED:
+        st.warning("Calcul annulé.")
+        return False
+
+    @st.fragment(run_every=POLL_SECONDS)
+    def _progress():
+        if job.finished:
+            st.rerun()
+        st.progress(job.fraction(), text=f"Calcul en cours – {job.label}")
+        st.dataframe(job.progress_frame(), hide_index=True)
+        partial = job.partial_frame()
+        if not partial.empty:
+            st.caption("Résultats partiels")
+            st.dataframe(partial.round(3))
+        if st.button("Annuler", key=f"{key}_cancel"):
+            job.cancel()
+
+    _progress()
+    return False
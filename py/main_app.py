@@ -4,9 +4,8 @@ from pathlib import Path
 from datetime import datetime
 import streamlit.components.v1 as components
 
-# Vos deux apps factorisées
-from app_1 import run_app1 as micro_explorer
-from app_2 import run_app2 as macro_explorer
+# Les deux explorateurs (pandas, plotly, pipeline de scoring) ne sont importés
+# qu’à leur première ouverture : la page d’accueil ne charge que Streamlit.
 
 # ── 1. set_page_config must be first ────────────────────────────
 st.set_page_config(page_title="Dashboard OPSCI", layout="wide")
@@ -134,8 +133,10 @@ if st.session_state.page in ["micro", "macro"]:
 st.markdown('<div class="content main">', unsafe_allow_html=True)
 
 if st.session_state.page == "micro":
+    from app_1 import run_app1 as micro_explorer
     micro_explorer()
 elif st.session_state.page == "macro":
+    from app_2 import run_app2 as macro_explorer
     macro_explorer()
 else:
     # Ce bloc s'exécute si st.session_state.page est None (état initial)
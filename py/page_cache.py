@@ -0,0 +1,323 @@
+# page_cache.py
+"""
+Cache persistant du wikitext des pages, revalidé par métadonnées.
+
+Chaque entrée garde, avec le wikitext, ses validateurs MediaWiki
+(`lastrevid`, `touched`). Une revisite ne télécharge pas le texte :
+
+  1. un appel `prop=info` groupé (`BATCH` titres) donne la révision
+     courante de chaque page – quelques centaines d’octets par page ;
+  2. seules les pages dont `lastrevid` a changé (ou absentes du cache) sont
+     re-téléchargées, elles aussi par lots (`prop=revisions`, contenu).
+
+Le wikitext est partagé par `ref` (citation gap), `blacklist_metric` et
+`taille_talk` (pages de discussion) : un même article n’est téléchargé
+qu’une fois pour toutes les métriques, et plus du tout tant qu’il ne change
+pas.
+
+Si un suivi des modifications (`change_feed`) tourne pour le wiki, les
+entrées qu’il n’a pas invalidées sont servies sans même l’appel `prop=info`,
+tant que le flux est à jour (`FEED_MAX_LAG`), que la page fait partie des
+pages qu’il surveille (`watch`) et qu’il la couvrait déjà à la date de
+téléchargement de l’entrée. Les autres pages (pages ad hoc, nouveaux panels)
+sont toujours revalidées.
+
+Stockage : SQLite `py/cache/pages.sqlite` (non versionné).
+
+Fonction exposée :
+    wikitexts(titles, lang="fr") -> dict {titre: wikitext | None (échec)}
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+from pathlib import Path
+import sqlite3
+import sys
+import threading
+import wiki_http
+
+API_TEMPLATE = "https://{lang}.wikipedia.org/w/api.php"
+HEADERS = {"User-Agent": "PageCache/1.0 (opsci)"}
+BATCH = 50                   # titres par requête (limite API hors bot)
+DB_PATH = Path("py/cache/pages.sqlite")
+FEED_MAX_LAG = timedelta(minutes=15)   # au-delà, le flux n’est plus une garantie
+
+stats = {"validated": 0, "trusted": 0, "hits": 0, "fetched": 0, "bytes_info": 0, "bytes_content": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _count(**kw: int) -> None:
+    with _STATS_LOCK:
+        for k, v in kw.items():
+            stats[k] += v
+
+# ─────────────────────────── stockage ──────────────────────────
+
+class PageStore:
+    """Table (lang, titre) → (lastrevid, touched, wikitext)."""
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS pages (
+                lang TEXT, title TEXT, lastrevid INTEGER, touched TEXT,
+                content TEXT, fetched_at TEXT, PRIMARY KEY (lang, title))""")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS feed (
+                lang TEXT PRIMARY KEY, since TEXT, synced_at TEXT)""")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS watched (
+                lang TEXT, title TEXT, since TEXT, PRIMARY KEY (lang, title))""")
+        return self._db
+
+    def get(self, lang: str, titles: List[str]) -> Dict[str, Tuple[int, str, str]]:
+        """{titre: (lastrevid, wikitext, fetched_at)} pour les titres en cache."""
+        out: Dict[str, Tuple[int, str, str]] = {}
+        with self._lock:
+            db = self._conn()
+            for k in range(0, len(titles), 500):
+                part = titles[k:k + 500]
+                rows = db.execute(
+                    f"SELECT title, lastrevid, content, fetched_at FROM pages WHERE lang=? AND title IN "
+                    f"({','.join('?' * len(part))})", [lang, *part])
+                out.update({t: (rev, txt, at) for t, rev, txt, at in rows})
+        return out
+
+    def put(self, lang: str, rows: Iterable[Tuple[str, int, str, str]]) -> None:
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        with self._lock:
+            db = self._conn()
+            db.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                [(lang, t, rev, touched, txt, now) for t, rev, touched, txt in rows])
+            db.commit()
+
+    def touch(self, lang: str, titles: List[str]) -> None:
+        """Marque ces entrées comme validées à l’instant."""
+        if not titles:
+            return
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        with self._lock:
+            db = self._conn()
+            db.executemany("UPDATE pages SET fetched_at=? WHERE lang=? AND title=?",
+                           [(now, lang, t) for t in titles])
+            db.commit()
+
+    def invalidate(self, lang: str, titles: Iterable[str]) -> int:
+        """Oublie les pages données ; renvoie le nombre d’entrées supprimées."""
+        titles = list(titles)
+        with self._lock:
+            db = self._conn()
+            n = 0
+            for k in range(0, len(titles), 500):
+                part = titles[k:k + 500]
+                n += db.execute(
+                    f"DELETE FROM pages WHERE lang=? AND title IN ({','.join('?' * len(part))})",
+                    [lang, *part]).rowcount
+            db.commit()
+        return n
+
+    # ─── suivi des modifications (change_feed) ───
+
+    def mark_synced(self, lang: str, since: str, synced_at: str) -> None:
+        """
+        Le flux de `lang` a été suivi sans interruption de `since` à
+        `synced_at` (horodatages ISO UTC) et ses invalidations appliquées.
+        """
+        with self._lock:
+            db = self._conn()
+            db.execute("INSERT OR REPLACE INTO feed VALUES (?, ?, ?)", (lang, since, synced_at))
+            db.commit()
+
+    def watch(self, lang: str, titles: Iterable[str]) -> None:
+        """
+        Remplace l’ensemble des pages de `lang` surveillées par le flux. Une
+        page nouvellement suivie ne l’est qu’à partir de maintenant ; une
+        page qui n’est plus suivie perd sa garantie.
+        """
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        titles = set(titles)
+        with self._lock:
+            db = self._conn()
+            known = {t for (t,) in db.execute("SELECT title FROM watched WHERE lang=?", (lang,))}
+            db.executemany("DELETE FROM watched WHERE lang=? AND title=?",
+                           [(lang, t) for t in known - titles])
+            db.executemany("INSERT INTO watched VALUES (?, ?, ?)",
+                           [(lang, t, now) for t in titles - known])
+            db.commit()
+
+    def watched(self, lang: str, titles: List[str]) -> Dict[str, str]:
+        """{titre: début de surveillance} pour les titres suivis par le flux."""
+        out: Dict[str, str] = {}
+        with self._lock:
+            db = self._conn()
+            for k in range(0, len(titles), 500):
+                part = titles[k:k + 500]
+                rows = db.execute(
+                    f"SELECT title, since FROM watched WHERE lang=? AND title IN "
+                    f"({','.join('?' * len(part))})", [lang, *part])
+                out.update(dict(rows))
+        return out
+
+    def feed_window(self, lang: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT since, synced_at FROM feed WHERE lang=?", (lang,)).fetchone()
+        return tuple(row) if row else None
+
+
+STORE = PageStore()
+
+# ─────────────────────────── API MediaWiki ─────────────────────
+
+def _query(lang: str, params: dict, stat: str) -> dict:
+    """
+    Réponse `query` complète : suit `continue` (un lot de contenus peut être
+    tronqué par la limite de taille de réponse) et fusionne les pages.
+    """
+    params = {"action": "query", "format": "json", "formatversion": 2, "redirects": 1, **params}
+    merged: dict = {}
+    pages: Dict[str, dict] = {}
+    while True:
+        r = wiki_http.get(API_TEMPLATE.format(lang=lang), headers=HEADERS, timeout=20, params=params)
+        r.raise_for_status()
+        _count(**{stat: len(r.content)})
+        data = r.json()
+        q = data.get("query", {})
+        for key in ("normalized", "redirects"):
+            merged.setdefault(key, []).extend(q.get(key, []))
+        for p in q.get("pages", []):
+            cur = pages.setdefault(p["title"], {})
+            revs = cur.get("revisions", []) + p.get("revisions", [])
+            cur.update(p)
+            if revs:
+                cur["revisions"] = revs
+        if "continue" not in data:
+            break
+        params.update(data["continue"])
+    merged["pages"] = list(pages.values())
+    return merged
+
+
+def _resolve(query: dict, titles: List[str]) -> Dict[str, str]:
+    """Titre demandé → titre final (normalisation puis redirection)."""
+    norm = {n["from"]: n["to"] for n in query.get("normalized", [])}
+    redir = {n["from"]: n["to"] for n in query.get("redirects", [])}
+    out = {}
+    for t in titles:
+        u = norm.get(t, t)
+        out[t] = redir.get(u, u)
+    return out
+
+
+def _info(titles: List[str], lang: str) -> Dict[str, Tuple[int, str]]:
+    """{titre demandé: (lastrevid, touched)} ; lastrevid 0 si la page n’existe pas."""
+    q = _query(lang, {"prop": "info", "titles": "|".join(titles)}, "bytes_info")
+    pages = {p["title"]: p for p in q.get("pages", [])}
+    out = {}
+    for t, final in _resolve(q, titles).items():
+        p = pages.get(final, {"missing": True})
+        out[t] = (0, "") if p.get("missing") else (int(p.get("lastrevid", 0)), p.get("touched", ""))
+    return out
+
+
+def _contents(titles: List[str], lang: str) -> Dict[str, Tuple[int, str]]:
+    """
+    {titre demandé: (revid, wikitext)} pour des pages existantes ; les pages
+    revenues sans révision (supprimées entre-temps, réponse incomplète) sont
+    absentes du résultat.
+    """
+    q = _query(lang, {"prop": "revisions", "rvprop": "ids|content", "rvslots": "main",
+                      "titles": "|".join(titles)}, "bytes_content")
+    pages = {p["title"]: p for p in q.get("pages", [])}
+    out = {}
+    for t, final in _resolve(q, titles).items():
+        revs = pages.get(final, {}).get("revisions")
+        if not revs:
+            continue
+        main = revs[0].get("slots", {}).get("main", {})
+        text = main.get("content", main.get("*"))
+        if text is None or not revs[0].get("revid"):
+            continue
+        out[t] = (int(revs[0]["revid"]), text)
+    return out
+
+# ─────────────────────────── API publique ──────────────────────
+
+def wikitexts(titles: List[str], lang: str = "fr",
+              store: Optional[PageStore] = None) -> Dict[str, Optional[str]]:
+    """
+    Wikitext courant de chaque titre ("" si la page n’existe pas, None si
+    l’API a échoué ou que l’échéance est passée). Chaque lot est traité
+    sous `wiki_http.page_scope()`.
+    """
+    store = store or STORE
+    titles = list(dict.fromkeys(titles))
+    out: Dict[str, Optional[str]] = {}
+    for k in range(0, len(titles), BATCH):
+        batch = titles[k:k + BATCH]
+        try:
+            with wiki_http.page_scope():
+                out.update(_revalidate(batch, lang, store))
+        except Exception as e:
+            print(f"⚠️  wikitext indisponible pour {len(batch)} page(s) ({e})", file=sys.stderr)
+            out.update({t: None for t in batch})
+    return out
+
+
+def _trusted_since(lang: str, store: PageStore) -> Optional[str]:
+    """Début de la fenêtre couverte par un flux à jour, sinon None."""
+    win = store.feed_window(lang)
+    if win is None:
+        return None
+    since, synced_at = win
+    lag = datetime.utcnow() - datetime.fromisoformat(synced_at)
+    return since if lag <= FEED_MAX_LAG else None
+
+
+def _revalidate(batch: List[str], lang: str, store: PageStore) -> Dict[str, Optional[str]]:
+    cached = store.get(lang, batch)
+    out: Dict[str, Optional[str]] = {}
+    since = _trusted_since(lang, store)
+    if since is not None:
+        # téléchargées sous la surveillance du flux et jamais invalidées : valides
+        watched = store.watched(lang, list(cached))
+        out = {t: txt for t, (_, txt, at) in cached.items()
+               if t in watched and at >= max(since, watched[t])}
+        _count(trusted=len(out), hits=len(out))
+        batch = [t for t in batch if t not in out]
+        if not batch:
+            return out
+    current = _info(batch, lang)
+    _count(validated=len(batch))
+    stale = []
+    for t in batch:
+        rev, _ = current[t]
+        if rev == 0:
+            out[t] = ""                                  # page inexistante
+        elif t in cached and cached[t][0] == rev:
+            out[t] = cached[t][1]
+        else:
+            stale.append(t)
+    _count(hits=len(batch) - len(stale))
+    # revalidées maintenant : le flux en répond désormais, si la page est surveillée
+    store.touch(lang, [t for t in batch if t in cached and t not in stale and current[t][0]])
+    if stale:
+        fresh = _contents(stale, lang)
+        _count(fetched=len(stale))
+        rows = []
+        for t in stale:
+            if t not in fresh:
+                out[t] = None                            # jamais mis en cache
+                continue
+            rev, txt = fresh[t]
+            out[t] = txt
+            rows.append((t, rev, current[t][1], txt))
+        store.put(lang, rows)
+    return out
@@ -11,49 +11,39 @@
 #                       médiane), etc.  
 # Plus le score est élevé, plus l’écart entre le jour de pic et le trafic « normal »  
 # est important.
+#
+# Mode « peaks » (`get_pageview_spike_peaks`) : même formule, mais contre une
+# médiane glissante → renvoie chaque pic (date + magnitude) sur les longues
+# périodes, cf. spikes.py.
 
 spike = (mx - med) / (med + 1)
 """
 from __future__ import annotations
-from typing import List, Dict
+from typing import List, Dict, Optional
 import pandas as pd
-import requests
+import timeseries
+import wiki_http
+import spikes
 from datetime import datetime, timedelta
 import argparse
-
-API_ROOT = "https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article"
-UA = {"User-Agent": "PageviewSpike/1.3 (opsci)"}
+import sys
 
 # ─────────────────────────── helpers ────────────────────────────
 
-def _date_fmt(date: str | datetime) -> str:
-    """YYYYMMDD pour l’API REST."""
-    if isinstance(date, datetime):
-        return date.strftime("%Y%m%d")
-    return date.replace("-", "")
-
-
-def _fetch_series(title: str, start: str, end: str, lang: str) -> pd.Series:
-    """Série quotidienne de pages vues (index : datetime, valeur : int)."""
-    title_enc = requests.utils.quote(title.replace(" ", "_"), safe="")
-    url = (
-        f"{API_ROOT}/{lang}.wikipedia/all-access/user/"
-        f"{title_enc}/daily/{_date_fmt(start)}/{_date_fmt(end)}"
-    )
+def _fetch_series(title: str, start: str, end: str, lang: str) -> Optional[pd.Series]:
+    """Série quotidienne de pages vues (index : datetime, valeur : int) ; None si l’API échoue."""
     try:
-        r = requests.get(url, headers=UA, timeout=20)
-        r.raise_for_status()
-        items = r.json().get("items", [])
-        data = {pd.to_datetime(i["timestamp"][:8]): i["views"] for i in items}
-        return pd.Series(data, name=title).sort_index()
-    except Exception:
-        return pd.Series(name=title)
+        return timeseries.get_series(f"{lang}.wikipedia", title, "pageviews", start, end)
+    except Exception as e:
+        print(f"⚠️  {title} : pages vues indisponibles ({e})", file=sys.stderr)
+        return None
 
 # ─────────────────────────── API publiques ─────────────────────
 
 def get_pageviews_timeseries(pages: List[str], start: str, end: str, lang: str = "en") -> Dict[str, pd.Series]:
-    """Renvoie un dict {title: Series} pour debug ou graphiques."""
-    return {p: _fetch_series(p, start, end, lang) for p in pages}
+    """Renvoie un dict {title: Series} pour debug ou graphiques (Series vide si échec)."""
+    return {p: s if (s := _fetch_series(p, start, end, lang)) is not None else pd.Series(name=p)
+            for p in pages}
 
 
 def get_pageview_spikes(pages: List[str], start: str, end: str, lang: str = "en") -> pd.Series:
@@ -64,9 +54,14 @@ def get_pageview_spikes(pages: List[str], start: str, end: str, lang: str = "en"
 def get_pageview_spike_detail(
     pages: List[str], start: str, end: str, lang: str = "en"
 ) -> pd.DataFrame:
-    """DataFrame `[spike, peak_day, peak_views]` par article."""
+    """DataFrame `[spike, peak_day, peak_views]` par article (spike NaN si l’API échoue)."""
     rows: Dict[str, Dict[str, object]] = {}
-    for title, serie in get_pageviews_timeseries(pages, start, end, lang).items():
+    for title in pages:
+        with wiki_http.page_scope():
+            serie = _fetch_series(title, start, end, lang)
+        if serie is None:
+            rows[title] = {"spike": float("nan"), "peak_day": None, "peak_views": None}
+            continue
         if serie.empty:
             rows[title] = {"spike": 0.0, "peak_day": None, "peak_views": 0}
             continue
@@ -83,6 +78,18 @@ def get_pageview_spike_detail(
 
     return pd.DataFrame.from_dict(rows, orient="index")
 
+
+def get_pageview_spike_peaks(
+    pages: List[str], start: str, end: str, lang: str = "en",
+    window: int = 28, threshold: float = 1.0, min_gap: int = 7,
+) -> pd.DataFrame:
+    """
+    Mode multi-pics : DataFrame long `[page, peak_day, peak_views, baseline, spike]`,
+    un pic par ligne (médiane glissante sur `window` jours, voir `spikes.py`).
+    """
+    frame = spikes.to_frame(get_pageviews_timeseries(pages, start, end, lang))
+    return spikes.detect_peaks(frame, window=window, threshold=threshold, min_gap=min_gap)
+
 # ───────────────────────────  CLI ──────────────────────────────
 if __name__ == "__main__":
     ap = argparse.ArgumentParser(description="Spike score + date + vues max des pages Wikipédia.")
@@ -90,11 +97,18 @@ if __name__ == "__main__":
     ap.add_argument("--start", help="YYYY-MM-DD (défaut = aujourd’hui -30j)")
     ap.add_argument("--end",   help="YYYY-MM-DD (défaut = aujourd’hui)")
     ap.add_argument("--lang",  default="en", help="Code langue (en, fr, …)")
+    ap.add_argument("--mode", choices=["spike", "peaks"], default="spike",
+                    help="spike = pic unique sur la fenêtre, peaks = tous les pics (fenêtre glissante)")
+    ap.add_argument("--window", type=int, default=28, help="Fenêtre de la médiane glissante (jours)")
+    ap.add_argument("--threshold", type=float, default=1.0, help="Seuil de magnitude d’un pic")
     ns = ap.parse_args()
 
     today = datetime.utcnow().date()
     end   = ns.end or today.isoformat()
     start = ns.start or (today - timedelta(days=30)).isoformat()
 
-    df = get_pageview_spike_detail(ns.pages, start, end, ns.lang)
+    if ns.mode == "peaks":
+        df = get_pageview_spike_peaks(ns.pages, start, end, ns.lang, ns.window, ns.threshold)
+    else:
+        df = get_pageview_spike_detail(ns.pages, start, end, ns.lang)
     print(df.to_markdown())
\ No newline at end of file
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# precompute.py
+"""
+Pré-calcul planifié des scores de chaque panel du registre (`registry`).
+
+Pour chaque panel et chaque fenêtre standard (7 j / 30 j / 365 j se
+terminant aujourd’hui), calcule `compute_scores` sur toutes les pages et
+matérialise le résultat :
+
+    py/precomputed/<panel>/<fenêtre>.parquet   métriques brutes + scores
+    py/precomputed/<panel>/<fenêtre>.json      métadonnées (date de calcul, période, langue)
+
+Chaque passe est aussi ajoutée à l’historique Parquet (`score_history`).
+
+`app_2` charge ces résultats instantanément s’ils existent et sont récents,
+et affiche leur fraîcheur ; sinon il retombe sur le calcul live.
+
+Usage :
+    python py/precompute.py --once                 # une passe (cron)
+    python py/precompute.py --once --panel-csv nouveaux.csv   # importe d’abord un CSV
+    python py/precompute.py --daemon --at 02:30    # boucle, une passe par nuit
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import json
+import re
+import time
+import pandas as pd
+
+from wikipedia_scoring_pipeline import compute_scores, ScoringResult
+from registry import REGISTRY
+import score_history
+
+WINDOWS: Dict[str, int] = {"7d": 7, "30d": 30, "365d": 365}
+OUT_DIR = Path("py/precomputed")
+MAX_AGE = timedelta(days=2)       # au-delà, un résultat n’est plus proposé
+
+SCORE_COLS = ["heat", "quality", "risk", "sensitivity"]
+
+# ─────────────────────────── stockage ──────────────────────────
+
+def _slug(panel: str) -> str:
+    return re.sub(r"[^\w-]+", "_", panel).strip("_")
+
+
+def _paths(panel: str, window: str, out_dir: Path) -> Tuple[Path, Path]:
+    base = out_dir / _slug(panel)
+    return base / f"{window}.parquet", base / f"{window}.json"
+
+
+def window_name(days: int) -> Optional[str]:
+    return next((w for w, d in WINDOWS.items() if d == days), None)
+
+
+def precompute_panel(panel: str, pages: List[str], lang: str, window: str,
+                     end: Optional[datetime] = None, out_dir: Path = OUT_DIR) -> Path:
+    """Calcule et écrit les scores d’un panel pour une fenêtre standard."""
+    end_d = (end or datetime.utcnow()).date()
+    start_d = end_d - timedelta(days=WINDOWS[window])
+    scores, metrics = compute_scores(pages, start_d.isoformat(), end_d.isoformat(), lang)
+    frame = metrics.copy()
+    for c in SCORE_COLS:
+        frame[c] = getattr(scores, c)
+
+    data_path, meta_path = _paths(panel, window, out_dir)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    frame.to_parquet(data_path)
+    meta_path.write_text(json.dumps({
+        "panel": panel, "window": window, "lang": lang,
+        "start": start_d.isoformat(), "end": end_d.isoformat(),
+        "pages": len(pages), "computed_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }, ensure_ascii=False, indent=2))
+    score_history.append(panel, lang, start_d.isoformat(), end_d.isoformat(), metrics, scores)
+    return data_path
+
+
+def load_precomputed(panel: str, lang: str, start: str, end: str,
+                     out_dir: Path = OUT_DIR) -> Optional[Tuple[pd.DataFrame, dict]]:
+    """
+    (frame, métadonnées) si un pré-calcul couvre la même durée, la même
+    langue, et se termine à moins de `MAX_AGE` de `end` (avant ou après :
+    une fenêtre passée de même durée ne correspond pas) ; sinon None.
+    """
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    window = window_name(days)
+    if window is None:
+        return None
+    data_path, meta_path = _paths(panel, window, out_dir)
+    if not (data_path.exists() and meta_path.exists()):
+        return None
+    meta = json.loads(meta_path.read_text())
+    if meta.get("lang") != lang:
+        return None
+    if abs(pd.Timestamp(end) - pd.Timestamp(meta["end"])) > MAX_AGE:
+        return None
+    return pd.read_parquet(data_path), meta
+
+
+def split_frame(frame: pd.DataFrame, pages: List[str]) -> Tuple[ScoringResult, pd.DataFrame]:
+    """frame stocké → (ScoringResult, métriques brutes) pour `pages`."""
+    sub = frame.loc[pages]
+    raw = sub.drop(columns=SCORE_COLS)
+    scores = ScoringResult(*(sub[c] for c in SCORE_COLS), missing=raw.isna().any(axis=1))
+    return scores, raw
+
+
+def freshness(meta: dict) -> str:
+    age = datetime.utcnow() - datetime.fromisoformat(meta["computed_at"])
+    hours = int(age.total_seconds() // 3600)
+    when = f"il y a {hours} h" if hours < 48 else f"il y a {hours // 24} j"
+    return f"Pré-calculé le {meta['computed_at']} UTC ({when}) – période {meta['start']} → {meta['end']}"
+
+# ─────────────────────────── passes ────────────────────────────
+
+def run_once(lang: str, windows: List[str], panels: Optional[List[str]] = None,
+             out_dir: Path = OUT_DIR) -> None:
+    REGISTRY.sync()
+    for panel in panels or REGISTRY.panels():
+        pages = REGISTRY.pages(panel)
+        if not pages:
+            print(f"⚠️  {panel} : panel inconnu ou vide")
+            continue
+        for w in windows:
+            t0 = time.monotonic()
+            try:
+                path = precompute_panel(panel, pages, lang, w, out_dir=out_dir)
+                print(f"✅ {panel} [{w}] → {path} ({time.monotonic() - t0:.0f} s)")
+            except Exception as e:
+                print(f"⚠️  {panel} [{w}] : échec ({e})")
+
+
+def _next_run(at: str) -> datetime:
+    hh, mm = map(int, at.split(":"))
+    now = datetime.now()
+    nxt = now.replace(hour=hh, minute=mm, second=0, microsecond=0)
+    return nxt if nxt > now else nxt + timedelta(days=1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pré-calcul des scores de tous les panels")
+    ap.add_argument("--panel-csv", help="Importe ce CSV (format panel.csv) dans le registre avant la passe")
+    ap.add_argument("--lang", default="fr")
+    ap.add_argument("--windows", nargs="+", default=list(WINDOWS), choices=list(WINDOWS))
+    ap.add_argument("--panels", nargs="*", help="Restreindre à ces panels")
+    ap.add_argument("--out", default=str(OUT_DIR))
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--once", action="store_true", help="Une seule passe (défaut, pour cron)")
+    mode.add_argument("--daemon", action="store_true", help="Boucle : une passe par jour")
+    ap.add_argument("--at", default="02:30", help="Heure locale de la passe quotidienne (HH:MM)")
+    ns = ap.parse_args()
+
+    if ns.panel_csv:
+        REGISTRY.import_panels_csv(Path(ns.panel_csv), ns.lang)
+    args = (ns.lang, ns.windows, ns.panels, Path(ns.out))
+    if not ns.daemon:
+        run_once(*args)
+        return
+    while True:
+        nxt = _next_run(ns.at)
+        print(f"⏳ Prochaine passe : {nxt:%Y-%m-%d %H:%M}")
+        time.sleep(max(0.0, (nxt - datetime.now()).total_seconds()))
+        run_once(*args)
+
+
+if __name__ == "__main__":
+    main()
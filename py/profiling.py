@@ -0,0 +1,237 @@
+# profiling.py
+"""
+Profilage optionnel d’un run de scoring (CPU et mémoire).
+
+Activation :
+  • CLI : `--profile [DOSSIER]` (`wikipedia_scoring_pipeline`, `get_panel`) ;
+  • dashboards : variable d’environnement `WIKI_PROFILE=DOSSIER` (ou `1`
+    pour `PROFILE_ROOT`), un run par job de scoring (`jobs`).
+
+Pendant une session, le code instrumenté découpe le run en étapes
+(`stage("collect:pageview_spike")`, `stage("normalize")`, …) ; hors session,
+`stage` ne coûte rien.
+
+  • CPU : un thread échantillonne toutes les `INTERVAL` secondes la pile des
+    threads qui sont dans une étape (temps mural : l’attente réseau compte).
+    Sortie `cpu.folded` au format « piles repliées » (une ligne
+    `étape;f1;f2 n`), lisible par flamegraph.pl, speedscope ou inferno ;
+  • mémoire : instantanés `tracemalloc` à l’entrée et à la sortie des
+    étapes (au plus `SNAPSHOTS_PER_STAGE` par nom d’étape, un instantané
+    coûte cher), différences cumulées par ligne de code. Sortie
+    `alloc_top.txt` (top `TOP` par étape) ;
+  • `summary.json` : durée, échantillons et pic mémoire par étape.
+
+Une étape appartient à la session du contexte qui l’ouvre (`ContextVar`) :
+deux jobs profilés en même temps écrivent chacun leur profil, sans mélanger
+leurs étapes. `tracemalloc` est partagé par le processus : il est arrêté
+quand la dernière session se termine, et les différences mémoire de
+sessions ou d’étapes concurrentes sont alors approximatives.
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterator, List, Optional
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+
+INTERVAL = 0.005             # secondes entre deux échantillons
+TOP = 25                     # lignes par étape dans alloc_top.txt
+SNAPSHOTS_PER_STAGE = 5
+TRACE_DEPTH = 1              # cadres par allocation : la ligne suffit (coût des instantanés)
+PROFILE_ROOT = Path("py/profiles")
+ENV = "WIKI_PROFILE"
+
+
+class Profiler:
+    """Une session de profilage, écrite dans `run_dir` à l’arrêt."""
+
+    def __init__(self, run_dir: Path, interval: float = INTERVAL, top: int = TOP):
+        self.run_dir = Path(run_dir)
+        self.interval = interval
+        self.top = top
+        self.folded: Counter = Counter()
+        self.wall: Dict[str, float] = defaultdict(float)
+        self.samples: Counter = Counter()
+        self.peak: Dict[str, int] = defaultdict(int)
+        self.alloc: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        self._snaps: Counter = Counter()
+        self._stages: Dict[int, List[str]] = {}          # thread → pile d’étapes
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ─────────────────────────── cycle de vie ─────────────────
+
+    def start(self) -> None:
+        _trace_acquire()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Path:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        _trace_release()
+        self._write()
+        return self.run_dir
+
+    # ─────────────────────────── étapes ───────────────────────
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tid = threading.get_ident()
+        with self._lock:
+            self._stages.setdefault(tid, []).append(name)
+            snap = self._snaps[name] < SNAPSHOTS_PER_STAGE and tracemalloc.is_tracing()
+            if snap:
+                self._snaps[name] += 1
+        before = tracemalloc.take_snapshot() if snap else None
+        if snap:
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            snap = snap and tracemalloc.is_tracing()     # arrêté entre-temps par une autre session
+            diff = tracemalloc.take_snapshot().compare_to(before, "lineno") if snap else []
+            peak = tracemalloc.get_traced_memory()[1] if snap else 0
+            with self._lock:
+                self._stages[tid].pop()
+                if not self._stages[tid]:
+                    del self._stages[tid]
+                self.wall[name] += dt
+                self.peak[name] = max(self.peak[name], peak)
+                for d in diff:
+                    if d.size_diff:
+                        acc = self.alloc[name][str(d.traceback[0])]
+                        acc[0] += d.size_diff
+                        acc[1] += d.count_diff
+
+    # ─────────────────────────── échantillonnage ──────────────
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                active = {tid: list(st) for tid, st in self._stages.items() if tid != me}
+            for tid, stages in active.items():
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join([*stages, *reversed(stack)])
+                self.folded[re.sub(r"\s+", " ", key)] += 1
+                self.samples[stages[-1]] += 1
+
+    # ─────────────────────────── sorties ──────────────────────
+
+    def _write(self) -> None:
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.run_dir / "cpu.folded", "w", encoding="utf-8") as fh:
+            for stack, n in self.folded.most_common():
+                fh.write(f"{stack} {n}\n")
+        with open(self.run_dir / "alloc_top.txt", "w", encoding="utf-8") as fh:
+            for name in sorted(self.alloc, key=lambda s: -self.wall[s]):
+                rows = sorted(self.alloc[name].items(), key=lambda kv: -abs(kv[1][0]))[:self.top]
+                fh.write(f"## {name} – pic {self.peak[name] / 1e6:.1f} Mo\n")
+                for where, (size, count) in rows:
+                    fh.write(f"{size / 1024:+12.1f} Kio {count:+8d} blocs  {where}\n")
+                fh.write("\n")
+        summary = {
+            name: {"wall_s": round(self.wall[name], 3), "samples": self.samples[name],
+                   "peak_mb": round(self.peak[name] / 1e6, 2)}
+            for name in sorted(self.wall, key=lambda s: -self.wall[s])
+        }
+        (self.run_dir / "summary.json").write_text(json.dumps(summary, indent=1, ensure_ascii=False))
+
+# ─────────────────────────── API module ────────────────────────
+
+_CURRENT: ContextVar[Optional[Profiler]] = ContextVar("profiler", default=None)
+_TRACE_LOCK = threading.Lock()
+_TRACE_USERS = 0             # sessions en cours utilisant tracemalloc
+_TRACE_OWNED = False         # tracemalloc démarré par ce module (sinon, on n’y touche pas)
+
+
+def _trace_acquire() -> None:
+    global _TRACE_USERS, _TRACE_OWNED
+    with _TRACE_LOCK:
+        if _TRACE_USERS == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_DEPTH)
+            _TRACE_OWNED = True
+        _TRACE_USERS += 1
+
+
+def _trace_release() -> None:
+    global _TRACE_USERS, _TRACE_OWNED
+    with _TRACE_LOCK:
+        _TRACE_USERS -= 1
+        if _TRACE_USERS == 0 and _TRACE_OWNED:
+            tracemalloc.stop()
+            _TRACE_OWNED = False
+
+
+def stage(name: str):
+    """Délimite une étape de la session du contexte courant ; sans session, ne fait rien."""
+    p = _CURRENT.get()
+    return p.stage(name) if p is not None else nullcontext()
+
+
+def _run_dir(root: Path, label: str) -> Path:
+    """Dossier réservé (créé) pour la session : deux jobs lancés dans la même seconde ne partagent rien."""
+    slug = re.sub(r"[^\w-]+", "-", label).strip("-")[:40] or "run"
+    base = Path(root) / f"{datetime.now():%Y%m%d-%H%M%S}-{slug}"
+    base.parent.mkdir(parents=True, exist_ok=True)
+    for k in range(1, 1000):
+        path = base if k == 1 else base.with_name(f"{base.name}-{k}")
+        try:
+            path.mkdir()
+            return path
+        except FileExistsError:
+            continue
+    raise FileExistsError(base)
+
+
+@contextmanager
+def session(root: Path | str = PROFILE_ROOT, label: str = "run") -> Iterator[Optional[Profiler]]:
+    """
+    Profile le bloc (étape racine `label`) et écrit les sorties dans
+    `root/<date>-<label>/`. Les sessions de contextes différents (un job par
+    thread) sont indépendantes ; une session imbriquée dans une autre ne
+    fait rien (renvoie None).
+    """
+    if _CURRENT.get() is not None:
+        yield None
+        return
+    p = Profiler(_run_dir(Path(root), label))
+    token = _CURRENT.set(p)
+    p.start()
+    try:
+        with p.stage(label):
+            yield p
+    finally:
+        _CURRENT.reset(token)
+        out = p.stop()
+        print(f"📈 Profil écrit dans {out}", file=sys.stderr)
+
+
+def from_env(label: str = "run"):
+    """`session` si `WIKI_PROFILE` est défini (`1` → `PROFILE_ROOT`), sinon rien."""
+    val = os.environ.get(ENV, "").strip()
+    if not val or val == "0":
+        return nullcontext()
+    return session(PROFILE_ROOT if val == "1" else Path(val), label)
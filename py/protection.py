@@ -6,12 +6,25 @@ Usage  :
     python protection_rating.py <code_langue> "Titre 1" ["Titre 2" ...]
 Exemple:
     python protection.py fr "Emmanuel Macron" "Paris"
+
+Les protections sont gardées en cache (SQLite `py/cache/protection.sqlite`)
+jusqu’au plus tôt de leur date d’expiration et de `TTL` ; les entrées
+périmées sont rafraîchies par lots de `BATCH` titres
+(`prop=info&inprop=protection`). Un run à chaud ne fait aucune requête.
 """
 
 from __future__ import annotations
-import requests, sys, time, pandas as pd
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from pathlib import Path
+import json, sqlite3, sys, threading, pandas as pd
+import page_cache
+import wiki_http
 
 HEADERS = {"User-Agent": "ProtectionRating/1.2 (example@example.com)"}
+BATCH = 50                            # titres par requête prop=info
+TTL = timedelta(days=1)               # au plus ; une protection expirant avant fait foi
+DB_PATH = Path("py/cache/protection.sqlite")
 
 LEVEL_SCORE = {
     "": 0,
@@ -28,44 +41,144 @@ LABEL = {0: "libre", 1: "semi", 2: "extended", 3: "spécialisé", 4: "plein"}
 def _score(level: str) -> int:
     return LEVEL_SCORE.get(level, 2)
 
-def _fetch_edit_protection(title: str, lang: str) -> tuple[str, int]:
+# ─────────────────────────── cache ─────────────────────────────
+
+class ProtectionStore:
+    """
+    Protections d’édition par (wiki, titre), valables jusqu’au plus tôt de
+    leur `expiry` et de `TTL` ; supprimées par le flux des modifications
+    (`change_feed`, événements `protect`).
+    """
+
+    def __init__(self, path: Path = DB_PATH, ttl: timedelta = TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS protection (
+                lang TEXT, title TEXT, entries TEXT, valid_until TEXT,
+                PRIMARY KEY (lang, title))""")
+        return self._db
+
+    def get(self, lang: str, titles: List[str]) -> Dict[str, List[dict]]:
+        """Entrées encore valables ; les titres absents sont à rafraîchir."""
+        now = _now()
+        out: Dict[str, List[dict]] = {}
+        with self._lock:
+            db = self._conn()
+            for k in range(0, len(titles), 500):
+                part = titles[k:k + 500]
+                rows = db.execute(
+                    f"SELECT title, entries FROM protection WHERE lang=? AND valid_until > ? "
+                    f"AND title IN ({','.join('?' * len(part))})", [lang, now, *part])
+                out.update({t: json.loads(e) for t, e in rows})
+        return out
+
+    def put(self, lang: str, found: Dict[str, List[dict]]) -> None:
+        ttl_end = (datetime.utcnow() + self.ttl).isoformat(timespec="seconds")
+        rows = []
+        for title, entries in found.items():
+            expiries = [_expiry(p["expiry"]) for p in entries if p.get("expiry", "infinity") != "infinity"]
+            rows.append((lang, title, json.dumps(entries), min([ttl_end, *expiries])))
+        with self._lock:
+            db = self._conn()
+            db.executemany("INSERT OR REPLACE INTO protection VALUES (?, ?, ?, ?)", rows)
+            db.commit()
+
+    def invalidate(self, lang: str, titles: List[str]) -> int:
+        with self._lock:
+            db = self._conn()
+            n = db.executemany("DELETE FROM protection WHERE lang=? AND title=?",
+                               [(lang, t) for t in titles]).rowcount
+            db.commit()
+        return n
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def _expiry(ts: str) -> str:
+    """`2025-05-01T00:00:00Z` → ISO UTC naïf, comparable à `_now()`."""
+    return ts.rstrip("Z")
+
+
+STORE = ProtectionStore()
+
+# ─────────────────────────── API MediaWiki ─────────────────────
+
+def _fetch_protections(titles: List[str], lang: str) -> Dict[str, List[dict]]:
+    """{titre demandé: protections d’édition} pour un lot de `BATCH` titres."""
     api = f"https://{lang}.wikipedia.org/w/api.php"
     params = {
         "action": "query",
-        "titles": title,
+        "titles": "|".join(titles),
         "prop": "info",
         "inprop": "protection",
+        "redirects": 1,
         "format": "json",
         "formatversion": "2",
     }
-    r = requests.get(api, headers=HEADERS, params=params, timeout=20)
+    r = wiki_http.get(api, headers=HEADERS, params=params, timeout=20)
     r.raise_for_status()
-    pdata = r.json()["query"]["pages"][0]
-
+    q = r.json()["query"]
+    pages = {p["title"]: p for p in q.get("pages", [])}
     # ──> ne garder **que** les protections portant sur l'édition :
-    prot_edit = [p for p in pdata.get("protection", []) if p["type"] == "edit"]
+    return {
+        t: [p for p in pages.get(final, {}).get("protection", []) if p["type"] == "edit"]
+        for t, final in page_cache._resolve(q, titles).items()
+    }
 
+
+def _describe(prot_edit: List[dict]) -> tuple[str, int]:
     if not prot_edit:
         return "aucune protection (edit)", 0
-
     desc = ", ".join(f"{p['type']}:{p['level']}" for p in prot_edit)
     max_score = max(_score(p["level"]) for p in prot_edit)
     return desc, max_score
 
+
+def protections(pages: List[str], lang: str = "fr",
+                store: Optional[ProtectionStore] = None) -> Dict[str, Optional[List[dict]]]:
+    """Protections d’édition de chaque page (None si l’API a échoué)."""
+    store = store or STORE
+    pages = list(dict.fromkeys(pages))
+    out: Dict[str, Optional[List[dict]]] = dict(store.get(lang, pages))
+    stale = [p for p in pages if p not in out]
+    for k in range(0, len(stale), BATCH):
+        batch = stale[k:k + BATCH]
+        try:
+            with wiki_http.page_scope():
+                found = _fetch_protections(batch, lang)
+        except Exception as e:
+            print(f"⚠️  protection indisponible pour {len(batch)} page(s) ({e})", file=sys.stderr)
+            out.update({t: None for t in batch})
+            continue
+        store.put(lang, found)
+        out.update(found)
+    return out
+
+
 def protection_rating(pages: list[str], lang: str = "fr") -> pd.DataFrame:
+    prot = protections(pages, lang)
     rows = []
     for pg in pages:
-        try:
-            desc, score = _fetch_edit_protection(pg, lang)
-        except Exception as e:
-            desc, score = f"erreur ({e})", -1
+        if prot.get(pg) is None:
+            desc, score = "erreur", float("nan")        # manquant, pas « libre »
+        else:
+            desc, score = _describe(prot[pg])
         rows.append(
             {"Page": pg,
              "Protection (edit)": desc,
              "Score": score,
              "Sévérité": LABEL.get(score, "?")}
         )
-        time.sleep(0.3)
     return pd.DataFrame(rows).set_index("Page")
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+# radar.py
+"""
+Diagrammes de Kiviat (radar) Heat / Risk / Quality partagés par les
+explorateurs (`app_1`, `app_2`) et `plot_kiviat.py`.
+
+  • `build_radar` : toutes les pages superposées dans un seul radar
+    (mode « Comparer », radar TOP) ;
+  • `build_radar_grid` : petits multiples, un radar par page, dans UNE
+    figure par tranche de `RADAR_MAX_PER_FIGURE` pages (mode « Tous »).
+
+Les specs de figure sont mises en cache par empreinte des scores : relancer
+l’affichage des mêmes scores ne reconstruit pas les figures.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Optional, Sequence
+from collections import OrderedDict
+import hashlib
+import math
+import threading
+import pandas as pd
+
+if TYPE_CHECKING:                # plotly n’est importé qu’à la première figure
+    import plotly.graph_objects as go
+
+BASE_COLORS = ["#edff00", "#6dff00", "#9100ff", "#ff00ed", "#00ecff", "#e2e2e2"]
+CATEGORIES = ["Heat", "Risk", "Quality (penalty)"]
+FONT = dict(family="Inria Sans", color="black")
+
+RADAR_MAX_PER_FIGURE = 36     # radars max par figure en mode grille
+RADAR_GRID_COLS = 4
+RADAR_ROW_HEIGHT = 260        # px par ligne de la grille
+SPEC_CACHE_SIZE = 256
+
+# ─────────────────────────── cache des specs ────────────────────
+
+_SPECS: "OrderedDict[str, dict]" = OrderedDict()
+_SPECS_LOCK = threading.Lock()
+
+
+def _score_hash(df: pd.DataFrame, sensitivity: pd.Series, *extra) -> str:
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(df[["heat", "quality", "risk"]].round(6), index=True).values.tobytes())
+    h.update(pd.util.hash_pandas_object(sensitivity.round(6), index=True).values.tobytes())
+    h.update(repr(extra).encode())
+    return h.hexdigest()
+
+
+def _cached(key: str, build) -> go.Figure:
+    import plotly.graph_objects as go
+    with _SPECS_LOCK:
+        spec = _SPECS.get(key)
+        if spec is not None:
+            _SPECS.move_to_end(key)
+    if spec is None:
+        spec = build().to_dict()
+        with _SPECS_LOCK:
+            _SPECS[key] = spec
+            while len(_SPECS) > SPEC_CACHE_SIZE:
+                _SPECS.popitem(last=False)
+    return go.Figure(spec)
+
+# ─────────────────────────── helpers ────────────────────────────
+
+def _trace(idx, row, color: str, opacity: float, showlegend: bool = True) -> go.Scatterpolar:
+    import plotly.graph_objects as go
+    q_pen = min(1, abs(row["quality"]))
+    vals = [row["heat"], row["risk"], q_pen, row["heat"]]
+    return go.Scatterpolar(
+        r=vals, theta=CATEGORIES + [CATEGORIES[0]], fill='toself',
+        name=idx, line=dict(color=color, width=3),
+        marker=dict(color=color, size=8), opacity=opacity,
+        hoverinfo='text', showlegend=showlegend,
+        hovertext=(f"Heat: {row['heat']:.2f}<br>"
+                   f"Risk: {row['risk']:.2f}<br>"
+                   f"Quality: {row['quality']:.2f}")
+    )
+
+
+def _polar_axes(template: Optional[str] = None) -> dict:
+    if template is not None:                 # police et couleurs laissées au template
+        return dict(
+            radialaxis=dict(range=[0, 1], showticklabels=True, dtick=0.2, gridcolor="lightgrey",
+                            gridwidth=1, tickfont=dict(size=12)),
+            angularaxis=dict(rotation=90, direction="clockwise"),
+        )
+    return dict(
+        radialaxis=dict(range=[0, 1], dtick=0.2, gridcolor="lightgrey",
+                        gridwidth=1, tickfont=FONT),
+        angularaxis=dict(rotation=90, direction="clockwise", tickfont=FONT),
+    )
+
+# ─────────────────────────── API publique ──────────────────────
+
+def build_radar(df: pd.DataFrame, sensitivity: pd.Series, title: str,
+                colors: Sequence[str] = BASE_COLORS, template: Optional[str] = None,
+                colored_notes: bool = False) -> go.Figure:
+    """
+    Un radar, une trace par page (df indexé par page : heat, quality, risk).
+    `template` (ex. "plotly_white") remplace le style des explorateurs
+    (police Inria, fond blanc) ; `colored_notes` donne à chaque annotation
+    de sensibilité la couleur de la trace de sa page (`plot_kiviat.py`).
+    """
+    def build() -> go.Figure:
+        import plotly.graph_objects as go
+        fig = go.Figure()
+        for i, (idx, row) in enumerate(df.iterrows()):
+            fig.add_trace(_trace(idx, row, colors[i % len(colors)], 0.6 + 0.1*(i%3)))
+        for i, (idx, score) in enumerate(sensitivity.items()):
+            fig.add_annotation(
+                x=0, y=0.9 - i*0.1, xref="paper", yref="paper",
+                text=f"{idx} – Sensitivity: {score:.2f}",
+                showarrow=False,
+                font=dict(size=12, color=colors[i % len(colors)]) if colored_notes else dict(FONT, size=12),
+                bgcolor="rgba(255,255,255,0.6)",
+                xanchor="left", yanchor="middle",
+                opacity=0.8 if colored_notes else 1.0,
+            )
+        legend = dict(orientation="h", yanchor="bottom", y=-0.15, xanchor="center", x=0.5)
+        if template is not None:
+            fig.update_layout(template=template, title=title,
+                              margin=dict(l=150, r=50, t=80, b=80),
+                              polar=_polar_axes(template), legend=legend)
+            return fig
+        fig.update_layout(
+            title=dict(text=title, font=FONT),
+            font=FONT,
+            paper_bgcolor='white', plot_bgcolor='white',
+            margin=dict(l=150, r=50, t=80, b=80),
+            polar=_polar_axes(),
+            legend=dict(legend, font=FONT),
+        )
+        return fig
+    key = _score_hash(df, sensitivity, "single", title, tuple(colors), template, colored_notes)
+    return _cached(key, build)
+
+
+def build_radar_grid(df: pd.DataFrame, sensitivity: pd.Series, title: str = "",
+                     cols: int = RADAR_GRID_COLS,
+                     max_per_figure: int = RADAR_MAX_PER_FIGURE,
+                     colors: Sequence[str] = BASE_COLORS) -> List[go.Figure]:
+    """
+    Petits multiples : un radar par page, regroupés en figures d’au plus
+    `max_per_figure` radars. 100 pages → 3 figures au lieu de 100.
+    """
+    figs = []
+    for k in range(0, len(df), max_per_figure):
+        chunk, sens = df.iloc[k:k + max_per_figure], sensitivity.reindex(df.index[k:k + max_per_figure])
+        page_title = title if len(df) <= max_per_figure else f"{title} ({k + 1}–{k + len(chunk)})"
+
+        def build(chunk=chunk, sens=sens, page_title=page_title) -> go.Figure:
+            from plotly.subplots import make_subplots
+            n_cols = min(cols, len(chunk))
+            n_rows = math.ceil(len(chunk) / n_cols)
+            fig = make_subplots(
+                rows=n_rows, cols=n_cols,
+                specs=[[{"type": "polar"}] * n_cols for _ in range(n_rows)],
+                subplot_titles=[f"{p} – S: {sens.get(p, float('nan')):.2f}" for p in chunk.index],
+                vertical_spacing=0.6 / n_rows, horizontal_spacing=0.08,
+            )
+            fig.add_traces(
+                [_trace(idx, row, colors[i % len(colors)], 0.7, showlegend=False)
+                 for i, (idx, row) in enumerate(chunk.iterrows())],
+                rows=[i // n_cols + 1 for i in range(len(chunk))],
+                cols=[i % n_cols + 1 for i in range(len(chunk))],
+            )
+            fig.update_polars(**_polar_axes())
+            fig.update_annotations(font=dict(FONT, size=11))
+            fig.update_layout(
+                title=dict(text=page_title, font=FONT), font=FONT,
+                paper_bgcolor='white', plot_bgcolor='white',
+                height=RADAR_ROW_HEIGHT * n_rows + 80,
+                margin=dict(l=40, r=40, t=80, b=40),
+            )
+            return fig
+        figs.append(_cached(_score_hash(chunk, sens, "grid", page_title, cols, tuple(colors)), build))
+    return figs
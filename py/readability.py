@@ -9,19 +9,24 @@ du titre de page. Ce module :
        avec payload `{"rev_id": rev_id, "lang": lang}`.
     3. Renvoie un score 0‑1 (float) par page dans un `pd.Series`.
 
-Fonction exposée :
-    get_readability_score(pages: list[str], lang: str = "en") -> pd.Series
+Chaque appel est borné par `TIMEOUT` ; une page en échec vaut NaN
+(manquante) sans interrompre les autres.
+
+Fonctions exposées :
+    get_readability_scores(pages: list[str], lang: str = "fr") -> pd.Series
+    get_readability_score(pages: list[str], lang: str = "fr") -> str   (message, 1re page)
 """
 
 from __future__ import annotations
 from typing import List
 import pandas as pd  # Required for returning results as a Series
-import requests
+import wiki_http
 import json
 import sys
 
 # --- 1. User Parameters ---
 lang = "fr"
+TIMEOUT = 15                 # secondes par appel (révision, puis inférence)
 
 def _latest_rev_id(title: str, lang: str = "fr", verbose: bool = True) -> int | None:
     page_api_url = f'https://{lang}.wikipedia.org/w/api.php'
@@ -33,7 +38,7 @@ def _latest_rev_id(title: str, lang: str = "fr", verbose: bool = True) -> int |
         'rvprop': 'ids',
         'rvlimit': 1
     }
-    resp = requests.get(page_api_url, params=params)
+    resp = wiki_http.get(page_api_url, params=params, timeout=TIMEOUT)
     resp.raise_for_status()
     data = resp.json()
 
@@ -45,28 +50,42 @@ def _latest_rev_id(title: str, lang: str = "fr", verbose: bool = True) -> int |
 
     rev_id = page['revisions'][0]['revid']
     if verbose:
-        print(f"Dernier rev_id pour « {title} » : {rev_id}")
+        print(f"Dernier rev_id pour « {title} » : {rev_id}", file=sys.stderr)
     return rev_id
 
-def get_readability_score(pages: List[str], lang: str = "fr"):
+def _predict(page: str, lang: str) -> float:
     inference_url = 'https://api.wikimedia.org/service/lw/inference/v1/models/readability:predict'
     headers = {
         'Content-Type': 'application/json',
         'User-Agent': 'TalkPageSizeBot/1.0 (mailto:alefichoux@gmail.com)',
     }
+    rev_id = _latest_rev_id(page, lang, verbose=False)  # Set verbose to False
+    payload = {
+        "rev_id": rev_id,
+        "lang": lang
+    }
+    response = wiki_http.post(inference_url, headers=headers, data=json.dumps(payload),
+                              timeout=TIMEOUT, wiki=wiki_http.wiki_host(lang))
+    response.raise_for_status()
+    full = response.json()
+    output = full.get("output", {})
+    score = output.get("score")
+    return float("nan") if score is None else float(score)
+
+def get_readability_scores(pages: List[str], lang: str = "fr") -> pd.Series:
+    """Score 0‑1 par page ; NaN si la page n’a pu être évaluée."""
     scores = {}
     for page in pages:
-        rev_id = _latest_rev_id(page, lang, verbose=False)  # Set verbose to False
-        payload = {
-            "rev_id": rev_id,
-            "lang": lang
-        }
-        response = requests.post(inference_url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        full = response.json()
-        output = full.get("output", {})
-        scores[page] = output.get("score")
-    score_series = pd.Series(scores)
+        try:
+            with wiki_http.page_scope():
+                scores[page] = _predict(page, lang)
+        except Exception as e:
+            print(f"⚠️  {page} : lisibilité indisponible ({e})", file=sys.stderr)
+            scores[page] = float("nan")
+    return pd.Series(scores, name="readability", dtype=float)
+
+def get_readability_score(pages: List[str], lang: str = "fr"):
+    score_series = get_readability_scores(pages, lang)
     return f"Le score de lisibilité est de : {score_series.iloc[0]}"
 
 def main():
@@ -6,67 +6,62 @@ Citation gap = `nb_pas_sourcés / nb_total_references`
   • `nb_pas_sourcés` = occurrences des templates "Citation needed" ou "{{cn}}"
   • `nb_total_references` = nombre de balises `<ref` dans le wikitext.
 
-Fonction exposée :
-    get_citation_gap(pages: list[str]) -> pandas.Series
+Fonction exposée :
+    get_citation_gap(pages: list[str], lang: str = "fr") -> pandas.Series
 
 Retour : Série indexée par titre d’article (float : 0 = tout sourcé, 1 = aucune ref).
 
-Exemple :
+Le wikitext vient de `page_cache` (revalidé par `lastrevid`, partagé avec
+`blacklist_metric`) : une page inchangée n’est pas re-téléchargée.
+
+Exemple :
     >>> get_citation_gap(["Transgender_rights", "Gender-affirming_care"])
 """
 
 from __future__ import annotations
 from typing import List
 import pandas as pd
-import requests
+import page_cache
 import re
+import sys
 
-API = "https://fr.wikipedia.org/w/api.php"
-HEADERS = {"User-Agent": "CitationGapBot/1.0 (contact: opsci)"}
 
-_PATTERN_CIT_NEEDED = re.compile(r'refnec', re.I)
+# modèles « référence nécessaire » selon la langue (fr par défaut)
+_PATTERN_CIT_NEEDED = {
+    "fr": re.compile(r'refnec', re.I),
+    "en": re.compile(r"\{\{\s*(citation needed|cn|fact)\s*[|}]", re.I),
+    "de": re.compile(r"\{\{\s*belege fehlen", re.I),
+}
 _PATTERN_REF = re.compile(r"<ref[ >]", re.I)
 
 
-def _fetch_wikitext(title: str) -> str:
-    params = {
-        "action": "query",
-        "format": "json",
-        "prop": "revisions",
-        "titles": title,
-        "rvslots": "main",
-        "rvprop": "content",
-        "redirects": 1,
-    }
-    try:
-        r = requests.get(API, params=params, headers=HEADERS, timeout=15)
-        r.raise_for_status()
-        data = r.json()
-        page = next(iter(data["query"]["pages"].values()))
-        if "revisions" not in page:
-            return
-        return page["revisions"][0]["slots"]["main"].get("*", "")
-    except Exception:
-        return ""
-
-
-def _citation_gap_from_text(wikitext: str) -> float:
+def _cit_needed_pattern(lang: str) -> re.Pattern:
+    return _PATTERN_CIT_NEEDED.get(lang, _PATTERN_CIT_NEEDED["fr"])
+
+
+def _citation_gap_from_text(wikitext: str, lang: str = "fr") -> float:
     refs = len(_PATTERN_REF.findall(wikitext))
-    needs = len(_PATTERN_CIT_NEEDED.findall(wikitext))
+    needs = len(_cit_needed_pattern(lang).findall(wikitext))
     if refs == 0:
         return 1.0  # aucun ref → gap maximal
     
     return min(1.0, needs / refs) 
 
-def get_citation_gap(pages: List[str]):
-    """Renvoie le ratio CitationNeeded / refs par page (0 - 1)."""
+def get_citation_gap(pages: List[str], lang: str = "fr"):
+    """Renvoie le ratio CitationNeeded / refs par page (0 - 1) ; NaN si la page n’a pu être lue."""
+    texts = page_cache.wikitexts(pages, lang)
     data = {}
     for p in pages:
-        wikitext = _fetch_wikitext(p)
-        citation_gap = _citation_gap_from_text(wikitext)
+        wikitext = texts.get(p)
+        if wikitext is None:
+            data[p] = float("nan")
+            continue
+        citation_gap = _citation_gap_from_text(wikitext, lang)
         refs = len(_PATTERN_REF.findall(wikitext))
-        needs = len(_PATTERN_CIT_NEEDED.findall(wikitext))
-        print(f"Sur la page {p}, il y a {needs} citations needed pour {refs} citations au total.")
+        needs = len(_cit_needed_pattern(lang).findall(wikitext))
+        # stderr : stdout peut porter un flux JSONL (iter_scores)
+        print(f"Sur la page {p}, il y a {needs} citations needed pour {refs} citations au total.",
+              file=sys.stderr)
         data[p] = citation_gap
     return pd.Series(data, name="citation_gap")
 
@@ -0,0 +1,218 @@
+# reference_dist.py
+"""
+Distributions de référence par wiki et par métrique.
+
+Chaque couple (wiki, métrique) garde une esquisse de quantiles à erreur
+relative bornée (type DDSketch) : les valeurs sont rangées dans des seaux
+logarithmiques de raison γ = (1+α)/(1−α), donc tout quantile est restitué à
+±α près en relatif. Deux esquisses se fusionnent en additionnant leurs
+compteurs. Chaque run de `compute_scores` alimente les observations ; une
+page ne compte qu’une fois par fenêtre (sa dernière valeur), quel que soit
+le nombre de runs qui l’ont re-scorée.
+
+Le mode de normalisation « percentile » remplace alors le max du panel par
+le rang de la valeur dans la distribution de référence : le score d’une page
+ne dépend plus des autres pages du lot, les runs deviennent comparables et
+une nouvelle page se score seule.
+
+Stockage : SQLite `py/reference/reference.sqlite` (non versionné).
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from pathlib import Path
+import math
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+ALPHA = 0.01                 # précision relative des quantiles
+MAX_BINS = 2048              # au-delà, les seaux les plus bas sont fusionnés
+MIN_VALUE = 1e-9             # valeurs ≤ MIN_VALUE (0, négatifs) : seau zéro
+MIN_COUNT = 100              # observations minimales avant d’utiliser une esquisse
+DB_PATH = Path("py/reference/reference.sqlite")
+
+# ─────────────────────────── esquisse ──────────────────────────
+
+class QuantileSketch:
+    """Esquisse de quantiles fusionnable, à erreur relative `alpha`."""
+
+    def __init__(self, alpha: float = ALPHA, bins: Optional[Dict[int, int]] = None, zero: int = 0):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = dict(bins or {})
+        self.zero = zero
+
+    @property
+    def count(self) -> int:
+        return self.zero + sum(self.bins.values())
+
+    def _keys(self, values: np.ndarray) -> np.ndarray:
+        return np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+
+    def add(self, values: Iterable[float]) -> None:
+        v = np.asarray(list(values) if not isinstance(values, np.ndarray) else values, dtype=float)
+        v = v[~np.isnan(v)]
+        pos = v[v > MIN_VALUE]
+        self.zero += int(len(v) - len(pos))
+        if len(pos):
+            keys, counts = np.unique(self._keys(pos), return_counts=True)
+            for k, c in zip(keys.tolist(), counts.tolist()):
+                self.bins[k] = self.bins.get(k, 0) + c
+        self._collapse()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.alpha != self.alpha:
+            raise ValueError("esquisses de précisions différentes")
+        for k, c in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + c
+        self.zero += other.zero
+        self._collapse()
+
+    def _collapse(self) -> None:
+        if len(self.bins) <= MAX_BINS:
+            return
+        keys = sorted(self.bins)
+        floor = keys[len(keys) - MAX_BINS]
+        for k in keys[:len(keys) - MAX_BINS]:
+            self.bins[floor] += self.bins.pop(k)
+
+    def _cumulative(self) -> Tuple[np.ndarray, np.ndarray]:
+        keys = np.array(sorted(self.bins), dtype=np.int64)
+        cum = np.cumsum([self.bins[k] for k in keys.tolist()], dtype=float) + self.zero
+        return keys, cum
+
+    def quantile(self, q: float) -> float:
+        n = self.count
+        if n == 0:
+            return float("nan")
+        rank = q * (n - 1)
+        if rank < self.zero:
+            return 0.0
+        keys, cum = self._cumulative()
+        k = keys[np.searchsorted(cum, rank, side="right")]
+        return float(2 * self.gamma ** k / (self.gamma + 1))
+
+    def rank(self, values: np.ndarray) -> np.ndarray:
+        """Rang percentile (0–1) de chaque valeur : part des observations ≤ valeur."""
+        v = np.asarray(values, dtype=float)
+        n = self.count
+        out = np.full(v.shape, np.nan)
+        if n == 0:
+            return out
+        keys, cum = self._cumulative()
+        ok = ~np.isnan(v)
+        pos = ok & (v > MIN_VALUE)
+        out[ok & ~pos] = self.zero / n
+        if pos.any():
+            idx = np.searchsorted(keys, self._keys(v[pos]), side="right")
+            out[pos] = np.concatenate([[self.zero], cum])[idx] / n
+        return out
+
+    def to_dict(self) -> dict:
+        return {"alpha": self.alpha, "zero": self.zero,
+                "bins": {str(k): c for k, c in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "QuantileSketch":
+        return cls(d["alpha"], {int(k): c for k, c in d["bins"].items()}, d["zero"])
+
+# ─────────────────────────── stockage ──────────────────────────
+
+class ReferenceStore:
+    """
+    Dernière valeur brute observée par (wiki, page, fenêtre, métrique), en
+    SQLite. Un run qui re-score une page remplace ses valeurs au lieu de les
+    ajouter : un panel re-scoré dix fois ne pèse pas dix fois dans la
+    distribution. Une valeur manquante (NaN) garde la précédente.
+
+    Les esquisses par (wiki, métrique) sont dérivées de la table et
+    reconstruites quand elle a changé (`PRAGMA data_version` voit aussi les
+    écritures des autres processus : app, service, précalcul).
+    """
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._sketches: Dict[str, Dict[str, QuantileSketch]] = {}
+        self._version: Optional[int] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS observations (
+                lang TEXT, page TEXT, window INTEGER, metric TEXT, value REAL, updated TEXT,
+                PRIMARY KEY (lang, page, window, metric))""")
+        return self._db
+
+    def _load(self, lang: str) -> Dict[str, QuantileSketch]:
+        db = self._conn()
+        version = db.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._version:
+            self._sketches, self._version = {}, version
+        if lang not in self._sketches:
+            rows = db.execute("SELECT metric, value FROM observations WHERE lang=?", (lang,)).fetchall()
+            values: Dict[str, List[float]] = {}
+            for m, v in rows:
+                values.setdefault(m, []).append(v)
+            per = self._sketches[lang] = {}
+            for m, vs in values.items():
+                per[m] = QuantileSketch()
+                per[m].add(np.asarray(vs, dtype=float))
+        return self._sketches[lang]
+
+    def _put(self, rows: List[Tuple[str, str, int, str, float, str]]) -> None:
+        # la valeur la plus récente gagne (fusion de fichiers d’autres machines comprise)
+        db = self._conn()
+        db.executemany(
+            "INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (lang, page, window, metric) DO UPDATE SET "
+            "value=excluded.value, updated=excluded.updated WHERE excluded.updated >= updated", rows)
+        db.commit()
+        self._sketches = {}                  # data_version ne compte pas nos propres écritures
+
+    def sketch(self, lang: str, metric: str) -> Optional[QuantileSketch]:
+        with self._lock:
+            return self._load(lang).get(metric)
+
+    def update(self, lang: str, metrics: pd.DataFrame, window: int = 0) -> None:
+        """Enregistre les valeurs brutes d’un run (fenêtre de `window` jours) pour `lang`."""
+        now = datetime.utcnow().isoformat(timespec="seconds")
+        rows = [(lang, str(page), int(window), m, float(v), now)
+                for m in metrics.columns
+                for page, v in metrics[m].items() if pd.notna(v)]
+        with self._lock:
+            self._put(rows)
+
+    def merge_file(self, path: Path) -> None:
+        """Fusionne les observations d’une autre base (autre machine, autre run)."""
+        other = ReferenceStore(path)
+        rows = other._conn().execute("SELECT * FROM observations").fetchall()
+        with self._lock:
+            self._put(rows)
+
+    def to_percentiles(self, metrics: pd.DataFrame, lang: str,
+                       columns: List[str]) -> Tuple[pd.DataFrame, List[str]]:
+        """
+        Copie de `metrics` où chaque colonne de `columns` disposant d’une
+        esquisse suffisante (`MIN_COUNT`) est remplacée par son rang
+        percentile. Renvoie aussi la liste des colonnes converties.
+        """
+        out = metrics.copy()
+        done = []
+        for m in columns:
+            s = self.sketch(lang, m)
+            if s is None or s.count < MIN_COUNT or m not in out.columns:
+                continue
+            out[m] = s.rank(out[m].to_numpy(dtype=float))
+            done.append(m)
+        return out, done
+
+
+STORE = ReferenceStore()
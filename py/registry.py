@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# registry.py
+"""
+Registre des panels et de la blacklist (SQLite, `py/registry.sqlite`).
+
+Remplace la relecture de `panel.csv` / `blacklist.csv` à chaque usage :
+
+  • panels et appartenances indexés (panel → pages, page → panels) :
+    un panel de plusieurs centaines de milliers de pages se charge par une
+    lecture d’index, sans parcourir les autres ;
+  • appartenances versionnées : enregistrer un panel ajoute un instantané
+    (version n + 1, rien n’est écrasé) seulement si la liste a changé ;
+    les versions précédentes restent lisibles ;
+  • blacklist : un domaine ajouté ou retiré est une ligne insérée ou
+    supprimée, dans une transaction – deux éditeurs simultanés ne
+    s’écrasent pas (WAL, `BEGIN IMMEDIATE`, attente `BUSY_TIMEOUT`).
+
+Compatibilité CSV : à l’ouverture (et à chaque `sync`), `panel.csv` et
+`blacklist.csv` sont importés s’ils ont changé depuis le dernier import.
+Seuls les panels dont les lignes CSV ont changé depuis (empreinte par panel)
+reçoivent une nouvelle version : un panel rafraîchi entre-temps par
+`get_panel` n’est pas ramené à son ancienne liste. De même, seuls les
+domaines ajoutés au CSV ou qui en ont été retirés depuis le dernier import
+sont ajoutés au registre ou en sont retirés : un domaine retiré via
+`remove_domain` ne revient pas au prochain import. Un import explicite
+(`registry.py import`) ajoute sans rien supprimer.
+`export_panels_csv` / `export_blacklist_csv` régénèrent les fichiers au
+format historique.
+
+Usage :
+    python py/registry.py list
+    python py/registry.py versions "Personnalité du secteur des médias"
+    python py/registry.py import --panels autre_panel.csv
+    python py/registry.py remove exemple.com
+    python py/registry.py export --panels py/panel.csv --blacklist py/blacklist.csv
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Set
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import argparse
+import hashlib
+import sqlite3
+import threading
+import pandas as pd
+
+DB_PATH = Path("py/registry.sqlite")
+PANEL_CSV = Path("py/panel.csv")
+BLACKLIST_CSV = Path("py/blacklist.csv")
+BUSY_TIMEOUT = 30.0          # secondes d’attente d’un verrou d’écriture tenu par un autre processus
+BLACKLIST_COLS = ["lang", "domain", "url", "page_title", "wiki_link", "user", "timestamp"]
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def _views(views: Optional[Iterable], n: int) -> List[Optional[int]]:
+    return [None] * n if views is None else [None if pd.isna(v) else int(v) for v in views]
+
+
+def _digest(pages: List[str], views: List[Optional[int]]) -> str:
+    """Empreinte des lignes CSV d’un panel (pages et vues, dans l’ordre)."""
+    text = "\n".join(f"{p}\t{'' if v is None else v}" for p, v in zip(pages, views))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class Registry:
+    """Panels versionnés, appartenances et domaines blacklistés."""
+
+    def __init__(self, path: Path = DB_PATH, panel_csv: Optional[Path] = PANEL_CSV,
+                 blacklist_csv: Optional[Path] = BLACKLIST_CSV):
+        self.path = Path(path)
+        self.panel_csv = panel_csv
+        self.blacklist_csv = blacklist_csv
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=BUSY_TIMEOUT,
+                                       isolation_level=None)
+            self._db.executescript("""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS panels (
+                    id INTEGER PRIMARY KEY, name TEXT UNIQUE, lang TEXT,
+                    version INTEGER, updated_at TEXT);
+                CREATE TABLE IF NOT EXISTS versions (
+                    panel_id INTEGER, version INTEGER, created_at TEXT, source TEXT, size INTEGER,
+                    PRIMARY KEY (panel_id, version));
+                CREATE TABLE IF NOT EXISTS members (
+                    panel_id INTEGER, version INTEGER, rank INTEGER, page TEXT, views INTEGER,
+                    PRIMARY KEY (panel_id, version, rank)) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS members_page ON members (page);
+                CREATE TABLE IF NOT EXISTS blacklist (
+                    id INTEGER PRIMARY KEY, lang TEXT, domain TEXT, url TEXT, page_title TEXT,
+                    wiki_link TEXT, user TEXT, timestamp TEXT, added_at TEXT);
+                CREATE INDEX IF NOT EXISTS blacklist_domain ON blacklist (domain);
+                CREATE TABLE IF NOT EXISTS imports (path TEXT PRIMARY KEY, mtime REAL);
+                CREATE TABLE IF NOT EXISTS csv_panels (
+                    path TEXT, panel TEXT, digest TEXT, PRIMARY KEY (path, panel));
+                CREATE TABLE IF NOT EXISTS csv_domains (
+                    path TEXT, domain TEXT, PRIMARY KEY (path, domain)) WITHOUT ROWID;
+            """)
+            self.sync()
+        return self._db
+
+    @contextmanager
+    def _write(self):
+        """Transaction d’écriture : verrou pris d’emblée, annulée en cas d’erreur."""
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    # ─────────────────────────── panels ───────────────────────
+
+    def panels(self) -> List[str]:
+        with self._lock:
+            return [n for (n,) in self._conn().execute("SELECT name FROM panels ORDER BY name")]
+
+    def _panel(self, db: sqlite3.Connection, name: str) -> Optional[tuple]:
+        return db.execute("SELECT id, version FROM panels WHERE name=?", (name,)).fetchone()
+
+    def members(self, panel: str, version: Optional[int] = None) -> pd.DataFrame:
+        """Pages du panel (colonnes page, views), dans l’ordre d’enregistrement ; vide si inconnu."""
+        with self._lock:
+            db = self._conn()
+            row = self._panel(db, panel)
+            if row is None:
+                return pd.DataFrame(columns=["page", "views"])
+            rows = db.execute("SELECT page, views FROM members WHERE panel_id=? AND version=? ORDER BY rank",
+                              (row[0], row[1] if version is None else version)).fetchall()
+        return pd.DataFrame(rows, columns=["page", "views"])
+
+    def pages(self, panel: str, version: Optional[int] = None) -> List[str]:
+        return self.members(panel, version)["page"].tolist()
+
+    def versions(self, panel: str) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT v.version, v.created_at, v.source, v.size FROM versions v "
+                "JOIN panels p ON p.id = v.panel_id WHERE p.name=? ORDER BY v.version",
+                self._conn(), params=(panel,))
+
+    def panels_of(self, page: str) -> List[str]:
+        """Panels dont la version courante contient `page`."""
+        with self._lock:
+            return [n for (n,) in self._conn().execute(
+                "SELECT DISTINCT p.name FROM members m JOIN panels p "
+                "ON p.id = m.panel_id AND p.version = m.version WHERE m.page=? ORDER BY p.name", (page,))]
+
+    def save_panel(self, panel: str, pages: List[str], views: Optional[Iterable[Optional[int]]] = None,
+                   lang: str = "fr", source: str = "") -> int:
+        """
+        Enregistre la liste de pages du panel ; renvoie sa version courante
+        (inchangée si la liste est identique à la précédente).
+        """
+        views = _views(views, len(pages))
+        first: Dict[str, Optional[int]] = {}
+        for p, v in zip(pages, views):
+            first.setdefault(p, v)                           # doublons : première occurrence
+        pages, views = list(first), list(first.values())
+        with self._write() as db:
+            row = self._panel(db, panel)
+            if row is None:
+                pid = db.execute("INSERT INTO panels (name, lang, version, updated_at) VALUES (?, ?, 0, ?)",
+                                 (panel, lang, _now())).lastrowid
+                current = 0
+            else:
+                pid, current = row
+                old = [p for (p,) in db.execute(
+                    "SELECT page FROM members WHERE panel_id=? AND version=? ORDER BY rank", (pid, current))]
+                if old == pages:
+                    return current
+            version = current + 1
+            db.executemany("INSERT INTO members VALUES (?, ?, ?, ?, ?)",
+                           [(pid, version, k, p, v) for k, (p, v) in enumerate(zip(pages, views))])
+            db.execute("INSERT INTO versions VALUES (?, ?, ?, ?, ?)", (pid, version, _now(), source, len(pages)))
+            db.execute("UPDATE panels SET version=?, lang=?, updated_at=? WHERE id=?", (version, lang, _now(), pid))
+        return version
+
+    # ─────────────────────────── blacklist ────────────────────
+
+    def blacklist(self) -> Set[str]:
+        with self._lock:
+            return {d for (d,) in self._conn().execute("SELECT DISTINCT domain FROM blacklist")}
+
+    def blacklist_frame(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(f"SELECT {', '.join(BLACKLIST_COLS)} FROM blacklist ORDER BY id",
+                                     self._conn())
+
+    def add_domain(self, domain: str, **fields: str) -> bool:
+        """Ajoute `domain` (minuscules) ; False s’il est déjà listé."""
+        domain = domain.strip().lower()
+        if not domain:
+            return False
+        row = {c: fields.get(c) for c in BLACKLIST_COLS}
+        row["domain"] = domain
+        with self._write() as db:
+            cur = db.execute(
+                f"INSERT INTO blacklist ({', '.join(BLACKLIST_COLS)}, added_at) "
+                f"SELECT {', '.join('?' * len(BLACKLIST_COLS))}, ? "
+                "WHERE NOT EXISTS (SELECT 1 FROM blacklist WHERE domain=?)",
+                [*row.values(), _now(), domain])
+        return cur.rowcount > 0
+
+    def remove_domain(self, domain: str) -> int:
+        """Retire `domain` ; renvoie le nombre de lignes supprimées (0 s’il n’était pas listé)."""
+        with self._write() as db:
+            return db.execute("DELETE FROM blacklist WHERE domain=?", (domain.strip().lower(),)).rowcount
+
+    # ─────────────────────────── CSV ──────────────────────────
+
+    def import_panels_csv(self, path: Path, lang: str = "fr", changed_only: bool = False) -> Dict[str, int]:
+        """
+        `panel,page[,TotalViews]` → une version par panel ; renvoie {panel: version}.
+        `changed_only` : ignore les panels dont les lignes n’ont pas changé
+        depuis le dernier import (ou export) de ce fichier.
+        """
+        df = pd.read_csv(path)
+        key = str(Path(path).resolve())
+        with self._lock:
+            known = dict(self._conn().execute("SELECT panel, digest FROM csv_panels WHERE path=?", (key,)))
+        out, seen = {}, []
+        for panel, grp in df.groupby("panel", sort=False):
+            pages = grp["page"].astype(str).tolist()
+            views = _views(grp["TotalViews"] if "TotalViews" in grp.columns else None, len(pages))
+            digest = _digest(pages, views)
+            seen.append((key, panel, digest))
+            if changed_only and known.get(panel) == digest:
+                continue
+            out[panel] = self.save_panel(panel, pages, views, lang, source=f"csv:{Path(path).name}")
+        with self._write() as db:
+            db.executemany("INSERT OR REPLACE INTO csv_panels VALUES (?, ?, ?)", seen)
+        return out
+
+    def import_blacklist_csv(self, path: Path, changed_only: bool = False) -> int:
+        """
+        Ajoute les lignes dont le domaine n’est pas encore listé ; renvoie leur
+        nombre. `changed_only` : n’ajoute que les domaines apparus dans le
+        fichier depuis son dernier import (ou export) et retire ceux qui en
+        ont disparu.
+        """
+        df = pd.read_csv(path, dtype=str)
+        if "domain" not in df.columns:
+            df = df.rename(columns={df.columns[0]: "domain"})
+        df["domain"] = df["domain"].str.strip().str.lower()
+        df = df.dropna(subset=["domain"]).reindex(columns=BLACKLIST_COLS)
+        rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+        listed = set(df["domain"])
+        key = str(Path(path).resolve())
+        with self._write() as db:
+            last = {d for (d,) in db.execute("SELECT domain FROM csv_domains WHERE path=?", (key,))}
+            known = {d for (d,) in db.execute("SELECT DISTINCT domain FROM blacklist")}
+            if changed_only:
+                known |= last                                # retirés du registre depuis : pas de retour
+                db.executemany("DELETE FROM blacklist WHERE domain=?", [(d,) for d in last - listed])
+            new = [r for r in rows if r[1] not in known]
+            db.executemany(f"INSERT INTO blacklist ({', '.join(BLACKLIST_COLS)}, added_at) "
+                           f"VALUES ({', '.join('?' * len(BLACKLIST_COLS))}, ?)",
+                           [(*r, _now()) for r in new])
+            db.execute("DELETE FROM csv_domains WHERE path=?", (key,))
+            db.executemany("INSERT INTO csv_domains VALUES (?, ?)", [(key, d) for d in listed])
+        return len(new)
+
+    def export_panels_csv(self, path: Path, panels: Optional[List[str]] = None) -> int:
+        """Versions courantes au format `page,TotalViews,panel` ; renvoie le nombre de lignes."""
+        names = panels or self.panels()
+        frames = [self.members(p).astype({"views": "Int64"}).assign(panel=p) for p in names]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["page", "views", "panel"])
+        df = df.rename(columns={"views": "TotalViews"})[["page", "TotalViews", "panel"]]
+        self._export(df, Path(path))
+        key = str(Path(path).resolve())
+        with self._write() as db:
+            db.execute("DELETE FROM csv_panels WHERE path=?", (key,))
+            db.executemany("INSERT INTO csv_panels VALUES (?, ?, ?)", [
+                (key, p, _digest(f["page"].tolist(), _views(f["views"], len(f))))
+                for p, f in zip(names, frames)])
+        return len(df)
+
+    def export_blacklist_csv(self, path: Path) -> int:
+        df = self.blacklist_frame()
+        self._export(df, Path(path))
+        key = str(Path(path).resolve())
+        with self._write() as db:
+            db.execute("DELETE FROM csv_domains WHERE path=?", (key,))
+            db.executemany("INSERT OR IGNORE INTO csv_domains VALUES (?, ?)", [(key, d) for d in df["domain"]])
+        return len(df)
+
+    def _export(self, df: pd.DataFrame, path: Path) -> None:
+        # écriture atomique : un lecteur ne voit jamais un fichier à moitié écrit ;
+        # le fichier exporté n’est pas ré-importé par `sync`
+        tmp = path.with_name(f".{path.name}.tmp")
+        df.to_csv(tmp, index=False)
+        tmp.replace(path)
+        with self._write() as db:
+            db.execute("INSERT OR REPLACE INTO imports VALUES (?, ?)",
+                       (str(path.resolve()), path.stat().st_mtime))
+
+    def sync(self) -> List[str]:
+        """
+        Importe `panel_csv` / `blacklist_csv` s’ils ont changé depuis le
+        dernier import ; seuls les panels et domaines modifiés dans le CSV
+        depuis sont appliqués (domaines retirés du CSV compris).
+        """
+        done = []
+        for path, load in ((self.panel_csv, lambda p: self.import_panels_csv(p, changed_only=True)),
+                           (self.blacklist_csv, lambda p: self.import_blacklist_csv(p, changed_only=True))):
+            if path is None or not Path(path).exists():
+                continue
+            key, mtime = str(Path(path).resolve()), Path(path).stat().st_mtime
+            with self._lock:
+                row = self._conn().execute("SELECT mtime FROM imports WHERE path=?", (key,)).fetchone()
+            if row is not None and row[0] >= mtime:
+                continue
+            load(path)
+            with self._write() as db:
+                db.execute("INSERT OR REPLACE INTO imports VALUES (?, ?)", (key, mtime))
+            done.append(str(path))
+        return done
+
+
+REGISTRY = Registry()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Registre des panels et de la blacklist")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="Panels, version courante et taille")
+    v = sub.add_parser("versions", help="Historique des versions d’un panel")
+    v.add_argument("panel")
+    i = sub.add_parser("import", help="Importe des CSV (format panel.csv / blacklist.csv)")
+    i.add_argument("--panels")
+    i.add_argument("--blacklist")
+    i.add_argument("--lang", default="fr")
+    r = sub.add_parser("remove", help="Retire des domaines de la blacklist")
+    r.add_argument("domains", nargs="+")
+    e = sub.add_parser("export", help="Régénère les CSV depuis le registre")
+    e.add_argument("--panels")
+    e.add_argument("--blacklist")
+    ns = ap.parse_args()
+
+    if ns.cmd == "list":
+        with REGISTRY._lock:
+            df = pd.read_sql_query(
+                "SELECT p.name AS panel, p.lang, p.version, v.size AS pages, p.updated_at FROM panels p "
+                "JOIN versions v ON v.panel_id = p.id AND v.version = p.version ORDER BY p.name",
+                REGISTRY._conn())
+        print(df.to_markdown(index=False))
+        print(f"\n{len(REGISTRY.blacklist())} domaine(s) blacklisté(s)")
+    elif ns.cmd == "versions":
+        print(REGISTRY.versions(ns.panel).to_markdown(index=False))
+    elif ns.cmd == "import":
+        if ns.panels:
+            for panel, version in REGISTRY.import_panels_csv(Path(ns.panels), ns.lang).items():
+                print(f"✅ {panel} : version {version}")
+        if ns.blacklist:
+            print(f"✅ {REGISTRY.import_blacklist_csv(Path(ns.blacklist))} domaine(s) ajouté(s)")
+    elif ns.cmd == "remove":
+        for dom in ns.domains:
+            print(f"✅ {dom} retiré" if REGISTRY.remove_domain(dom) else f"⚠️  {dom} n’est pas listé")
+    else:
+        if ns.panels:
+            print(f"✅ {REGISTRY.export_panels_csv(Path(ns.panels))} ligne(s) → {ns.panels}")
+        if ns.blacklist:
+            print(f"✅ {REGISTRY.export_blacklist_csv(Path(ns.blacklist))} ligne(s) → {ns.blacklist}")
+
+
+if __name__ == "__main__":
+    main()
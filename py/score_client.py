@@ -0,0 +1,67 @@
+# score_client.py
+"""
+Client léger du service de scoring (`score_service.py`).
+
+Si la variable d’environnement `WIKI_SCORE_SERVICE` est définie (ex.
+`http://127.0.0.1:8765`), `compute_scores`, `collect_metrics` et
+`timeseries.get_series` délèguent au service au lieu de calculer dans le
+processus courant : dashboards et CLIs partagent alors les caches, pools de
+connexions et budgets de requêtes du service.
+"""
+
+from __future__ import annotations
+from typing import List, Optional
+import os
+import pandas as pd
+import requests
+
+SERVICE_URL: Optional[str] = os.environ.get("WIKI_SCORE_SERVICE")
+TIMEOUT = 3600               # un scoring de panel peut prendre plusieurs minutes
+
+_SESSION = requests.Session()
+
+
+def enabled() -> bool:
+    return bool(SERVICE_URL)
+
+
+def _post(path: str, payload: dict) -> dict:
+    r = _SESSION.post(f"{SERVICE_URL.rstrip('/')}{path}", json=payload, timeout=TIMEOUT)
+    r.raise_for_status()
+    return r.json()
+
+
+def frame_from_json(data: dict) -> pd.DataFrame:
+    return pd.DataFrame(data["data"], index=data["index"], columns=data["columns"])
+
+# ─────────────────────────── API publique ──────────────────────
+
+def compute_scores(pages: List[str], start: str, end: str, lang: str = "fr",
+                   normalization: str = "panel", deadline: Optional[float] = None):
+    """Même retour que `wikipedia_scoring_pipeline.compute_scores`."""
+    from wikipedia_scoring_pipeline import ScoringResult
+    data = _post("/scores", {"pages": pages, "start": start, "end": end, "lang": lang,
+                             "normalization": normalization, "deadline": deadline})
+    scores = frame_from_json(data["scores"])
+    metrics = frame_from_json(data["metrics"]).astype(float)
+    result = ScoringResult(scores["heat"], scores["quality"], scores["risk"], scores["sensitivity"],
+                           missing=metrics.isna().any(axis=1))
+    return result, metrics
+
+
+def collect_metrics(pages: List[str], start: str, end: str, lang: str = "fr",
+                    metrics: Optional[List[str]] = None, deadline: Optional[float] = None,
+                    page_deadline: Optional[float] = None) -> pd.DataFrame:
+    data = _post("/metrics", {"pages": pages, "start": start, "end": end, "lang": lang,
+                              "metrics": metrics, "deadline": deadline,
+                              "page_deadline": page_deadline})
+    return frame_from_json(data["metrics"])
+
+
+def get_series(site: str, title: str, metric: str, start: str, end: str,
+               agent: str = "user", granularity: str = "daily") -> pd.Series:
+    data = _post("/timeseries", {"site": site, "title": title, "metric": metric,
+                                 "start": str(start), "end": str(end),
+                                 "agent": agent, "granularity": granularity})
+    serie = pd.Series(data["values"], index=pd.to_datetime(data["dates"]), dtype="int64", name=title)
+    return serie
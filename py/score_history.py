@@ -0,0 +1,152 @@
+# score_history.py
+"""
+Historique des runs de scoring : jeu de données Parquet partitionné.
+
+Chaque run ajoute un fichier (jamais de réécriture) sous
+
+    py/history/date=<AAAA-MM-JJ>/panel=<panel>/<run_id>-0.parquet
+
+avec, par page : les métriques brutes (`METRICS`), les quatre scores,
+`missing`, et les métadonnées du run (run_id, computed_at, lang, start,
+end, window_days, normalization).
+
+La lecture passe par `pyarrow.dataset` : les filtres sur `panel` et `date`
+élaguent les répertoires, ceux sur `page`, `lang` et la fenêtre sont
+poussés dans la lecture des row groups. Rien n’est chargé en dehors des
+fichiers et colonnes utiles.
+
+Fonctions exposées :
+    append(panel, lang, start, end, metrics, scores, ...) -> run_id
+    read(panel=None, pages=None, lang=None, start=None, end=None, since=None, columns=None) -> DataFrame
+    latest(panel, lang, start=None, end=None, max_age=MAX_AGE) -> (frame indexé par page, méta) | None
+"""
+
+from __future__ import annotations
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import uuid
+import pandas as pd
+
+HISTORY_DIR = Path("py/history")
+MAX_AGE = timedelta(days=2)       # au-delà, `latest` ne propose plus un run
+SCORE_COLS = ["heat", "quality", "risk", "sensitivity"]
+META_COLS = ["run_id", "computed_at", "lang", "start", "end", "window_days", "normalization"]
+
+
+def _partitioning():
+    # types explicites : un panel « 2024 » reste une chaîne
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([("date", pa.string()), ("panel", pa.string())]), flavor="hive")
+
+
+def _metric_names() -> List[str]:
+    from wikipedia_scoring_pipeline import METRICS
+    return list(METRICS)
+
+# ─────────────────────────── écriture ──────────────────────────
+
+def append(panel: str, lang: str, start: str, end: str, metrics: pd.DataFrame, scores,
+           normalization: str = "panel", root: Optional[Path] = None) -> str:
+    """Ajoute un run (métriques brutes + `ScoringResult`) à l’historique ; renvoie son run_id."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    root = root or HISTORY_DIR
+    now = datetime.utcnow()
+    run_id = f"{now:%H%M%S}-{uuid.uuid4().hex[:8]}"
+    # schéma stable d’un run à l’autre : toutes les métriques, NaN si absentes
+    frame = metrics.reindex(columns=_metric_names()).astype("float64")
+    for c in SCORE_COLS:
+        frame[c] = getattr(scores, c).reindex(frame.index).astype("float64")
+    missing = scores.missing if scores.missing is not None else frame[_metric_names()].isna().any(axis=1)
+    frame["missing"] = missing.reindex(frame.index).fillna(True).astype(bool)
+    frame.index.name = "page"
+    frame = frame.reset_index()
+    frame["run_id"] = run_id
+    frame["computed_at"] = pd.Timestamp(now).floor("s")
+    frame["lang"] = lang
+    frame["start"] = str(start)[:10]
+    frame["end"] = str(end)[:10]
+    frame["window_days"] = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    frame["normalization"] = normalization
+    frame["date"] = now.date().isoformat()
+    frame["panel"] = panel
+
+    pq.write_to_dataset(
+        pa.Table.from_pandas(frame, preserve_index=False), root,
+        partitioning=_partitioning(), basename_template=f"{run_id}-{{i}}.parquet",
+    )
+    return run_id
+
+# ─────────────────────────── lecture ───────────────────────────
+
+def read(
+    panel: Optional[str] = None,
+    pages: Optional[List[str]] = None,
+    lang: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    since: Optional[date] = None,
+    columns: Optional[List[str]] = None,
+    normalization: Optional[str] = None,
+    root: Optional[Path] = None,
+) -> pd.DataFrame:
+    """
+    Lignes de l’historique filtrées (tout filtre à None est ignoré).
+    `since` : date de calcul minimale (élagage des partitions `date=`).
+    """
+    import pyarrow.dataset as ds
+
+    root = root or HISTORY_DIR
+    if not any(Path(root).rglob("*.parquet")):
+        return pd.DataFrame(columns=["page", *(columns or [])])
+    dataset = ds.dataset(root, format="parquet", partitioning=_partitioning())
+    f = None
+    for cond in (
+        ds.field("panel") == panel if panel is not None else None,
+        ds.field("date") >= since.isoformat() if since is not None else None,
+        ds.field("lang") == lang if lang is not None else None,
+        ds.field("start") == str(start)[:10] if start is not None else None,
+        ds.field("end") == str(end)[:10] if end is not None else None,
+        ds.field("page").isin(list(pages)) if pages is not None else None,
+        ds.field("normalization") == normalization if normalization is not None else None,
+    ):
+        if cond is not None:
+            f = cond if f is None else f & cond
+    cols = None if columns is None else list(dict.fromkeys(["page", *columns]))
+    return dataset.to_table(columns=cols, filter=f).to_pandas()
+
+
+def latest(panel: str, lang: str, start: Optional[str] = None, end: Optional[str] = None,
+           max_age: timedelta = MAX_AGE, normalization: str = "panel",
+           root: Optional[Path] = None) -> Optional[Tuple[pd.DataFrame, dict]]:
+    """
+    Dernier run du panel calculé depuis moins de `max_age` avec la
+    normalisation `normalization` (les scores « panel » et « percentile »
+    ne sont pas comparables) ; avec `start`/`end`, sur la même fenêtre (même
+    durée, fin au plus `max_age` avant `end`). (frame indexé par page :
+    métriques + scores, métadonnées), sinon None.
+    """
+    since = (datetime.utcnow() - max_age).date()
+    df = read(panel=panel, lang=lang, since=since, normalization=normalization, root=root)
+    if not df.empty and start is not None and end is not None:
+        days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+        ends = pd.to_datetime(df["end"])
+        df = df[(df["window_days"] == days)
+                & (pd.Timestamp(end) - ends <= max_age) & (ends <= pd.Timestamp(end))]
+    if df.empty:
+        return None
+    run = df.loc[df["computed_at"].idxmax(), "run_id"]
+    rows = df[df["run_id"] == run]
+    meta = {c: rows[c].iloc[0] for c in META_COLS}
+    meta["computed_at"] = pd.Timestamp(meta["computed_at"]).isoformat(timespec="seconds")
+    meta["pages"] = len(rows)
+    frame = rows.set_index("page")[[*_metric_names(), *SCORE_COLS]]
+    return frame, meta
+
+
+def freshness(meta: dict) -> str:
+    return (f"Run du {meta['computed_at']} UTC (historique, {meta['pages']} pages) – "
+            f"période {meta['start']} → {meta['end']}")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# score_service.py
+"""
+Service HTTP local autour de `compute_scores` et des séries temporelles.
+
+Un seul processus garde les caches chauds (`timeseries`, résultats de
+scoring), les pools de connexions et les budgets de requêtes (`wiki_http`) ;
+les dashboards et les CLIs deviennent des clients légers (`score_client`,
+activé par `WIKI_SCORE_SERVICE=http://hôte:port`).
+
+Routes (JSON) :
+    POST /scores      {pages, start, end, lang, normalization?, deadline?}
+                                                            → {scores, metrics}
+    POST /metrics     {pages, start, end, lang, metrics?, deadline?, page_deadline?}
+                                                            → {metrics}
+    POST /timeseries  {site, title, metric, start, end, agent?, granularity?}
+                                                            → {dates, values}
+    GET  /health                                            → état des caches
+
+Les requêtes identiques simultanées sont dédupliquées (un seul calcul, tous
+les appelants reçoivent le même résultat) ; les résultats de scoring sont
+gardés `RESULT_TTL` secondes.
+
+Usage :
+    python py/score_service.py --port 8765
+    WIKI_UPSTREAM=http://127.0.0.1:8900 python py/score_service.py   # API bouchon
+    python py/score_service.py --follow-changes   # caches invalidés par le flux (tous les panels)
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Hashable, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import json
+import threading
+import time
+import pandas as pd
+
+import change_feed
+import score_client
+import timeseries
+from wikipedia_scoring_pipeline import compute_scores, collect_metrics, PAGE_DEADLINE
+
+RESULT_TTL = 600             # secondes de validité d’un résultat de scoring
+
+# le service calcule lui-même : jamais de délégation vers un autre service
+score_client.SERVICE_URL = None
+
+# ─────────────────────────── déduplication ─────────────────────
+
+class SingleFlight:
+    """
+    Un seul calcul par clé en vol ; résultats gardés `ttl` secondes. Les
+    résultats sont rangés par date de calcul : chaque insertion purge ceux
+    qui ont expiré en tête.
+    """
+
+    def __init__(self, ttl: float = RESULT_TTL):
+        self.ttl = ttl
+        self._inflight: Dict[Hashable, Future] = {}
+        self._done: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.shared = self.computed = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            cached = self._done.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                self.hits += 1
+                return cached[1]
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+                self.computed += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return fut.result()
+        try:
+            value = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            with self._lock:
+                del self._inflight[key]
+            raise
+        fut.set_result(value)
+        with self._lock:
+            now = time.monotonic()
+            self._done.pop(key, None)
+            self._done[key] = (now, value)
+            while self._done:
+                oldest, (at, _) = next(iter(self._done.items()))
+                if now - at < self.ttl:
+                    break
+                del self._done[oldest]
+            del self._inflight[key]
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"cached": len(self._done), "in_flight": len(self._inflight),
+                    "hits": self.hits, "shared": self.shared, "computed": self.computed}
+
+
+_FLIGHT = SingleFlight()
+
+
+def frame_to_json(df: pd.DataFrame) -> dict:
+    return json.loads(df.to_json(orient="split", date_format="iso"))
+
+# ─────────────────────────── handlers ──────────────────────────
+
+def handle_scores(body: dict) -> dict:
+    pages, start, end, lang = list(body["pages"]), body["start"], body["end"], body.get("lang", "fr")
+    normalization, deadline = body.get("normalization", "panel"), body.get("deadline")
+    key = ("scores", tuple(pages), start, end, lang, normalization, deadline)
+
+    def run():
+        scores, metrics = compute_scores(pages, start, end, lang, normalization=normalization,
+                                         deadline=deadline)
+        final = pd.DataFrame({"heat": scores.heat, "quality": scores.quality,
+                              "risk": scores.risk, "sensitivity": scores.sensitivity})
+        return {"scores": frame_to_json(final), "metrics": frame_to_json(metrics)}
+    return _FLIGHT.do(key, run)
+
+
+def handle_metrics(body: dict) -> dict:
+    pages, start, end, lang = list(body["pages"]), body["start"], body["end"], body.get("lang", "fr")
+    metrics, deadline = body.get("metrics"), body.get("deadline")
+    page_deadline = body.get("page_deadline", PAGE_DEADLINE)
+    key = ("metrics", tuple(pages), start, end, lang, tuple(metrics or ()), deadline, page_deadline)
+    return _FLIGHT.do(key, lambda: {"metrics": frame_to_json(
+        collect_metrics(pages, start, end, lang, metrics=metrics, deadline=deadline,
+                        page_deadline=page_deadline))})
+
+
+def handle_timeseries(body: dict) -> dict:
+    # pas de TTL ici : le cache de `timeseries` fait déjà le travail
+    serie = timeseries.get_series(
+        body["site"], body["title"], body["metric"], body["start"], body["end"],
+        agent=body.get("agent", "user"), granularity=body.get("granularity", "daily"),
+    )
+    return {"dates": [d.date().isoformat() for d in serie.index],
+            "values": [int(v) for v in serie.values]}
+
+
+ROUTES: Dict[str, Callable[[dict], dict]] = {
+    "/scores": handle_scores,
+    "/metrics": handle_metrics,
+    "/timeseries": handle_timeseries,
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "WikiScoreService/1.0"
+
+    def _send(self, code: int, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"timeseries": timeseries.cache_info(), "results": _FLIGHT.stats()})
+        else:
+            self._send(404, {"error": f"route inconnue : {self.path}"})
+
+    def do_POST(self):
+        route = ROUTES.get(self.path)
+        if route is None:
+            self._send(404, {"error": f"route inconnue : {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            self._send(200, route(body))
+        except (KeyError, ValueError) as e:
+            self._send(400, {"error": f"requête invalide : {e}"})
+        except Exception as e:
+            self._send(502, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, fmt, *args):
+        print(f"[{self.log_date_time_string()}] {fmt % args}")
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Service local de scoring Wikipédia (caches partagés)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--follow-changes", nargs="*", metavar="PANEL",
+                    help="Invalider les caches via le flux des modifications des pages de ces panels "
+                         "(aucun : tous les panels du registre)")
+    ap.add_argument("--lang", nargs="+", default=["fr"], help="Wikis suivis (--follow-changes)")
+    ns = ap.parse_args()
+
+    if ns.follow_changes is not None:
+        inv = change_feed.Invalidator()
+        pages = change_feed._panel_pages(ns.follow_changes)
+        for lang in ns.lang:
+            inv.track(lang, pages)
+        change_feed.start_thread(inv, ns.lang)
+
+    srv = make_server(ns.host, ns.port)
+    print(f"🚀 Service de scoring sur http://{ns.host}:{ns.port}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -0,0 +1,140 @@
+# scoring_model.py
+"""
+Modèle de scoring déclaratif.
+
+Chaque métrique est décrite par un `MetricSpec` (groupe, poids, normaliseur) ;
+`ScoringModel` compile l’ensemble en trois tableaux NumPy :
+
+    N = min(X · a, cap)          normalisation (a = 1/max, 1/échelle ou facteur)
+    G = N @ W                    heat / quality / risk      (W : métriques × groupes)
+    s = G @ g                    sensitivity                (g : poids globaux)
+
+L’évaluation de 100 000 pages est une poignée d’opérations vectorisées, ce
+qui permet de re-pondérer des métriques brutes déjà collectées sans rien
+re-télécharger (`with_weights`).
+
+Normaliseurs :
+    "max"       valeur / max du lot (ou `max_vals`)
+    "fixed"     valeur / `scale`
+    "cap"       min(1, valeur × `scale`)
+    "identity"  valeur brute
+"""
+
+from __future__ import annotations
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass, field, replace
+import numpy as np
+import pandas as pd
+
+GROUPS = ("heat", "quality", "risk")
+NORMALIZERS = ("max", "fixed", "cap", "identity")
+EPS = 1e-9
+
+
+@dataclass(frozen=True)
+class MetricSpec:
+    name: str
+    group: str                   # "heat" | "quality" | "risk"
+    weight: float
+    norm: str = "identity"
+    scale: float = 1.0
+
+    def __post_init__(self):
+        if self.group not in GROUPS:
+            raise ValueError(f"groupe inconnu pour {self.name} : {self.group}")
+        if self.norm not in NORMALIZERS:
+            raise ValueError(f"normaliseur inconnu pour {self.name} : {self.norm}")
+
+
+@dataclass(frozen=True)
+class ScoringModel:
+    specs: Tuple[MetricSpec, ...]
+    glob: Tuple[float, float, float]          # poids de heat, quality, risk
+    _compiled: dict = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        a = np.array([1 / s.scale if s.norm == "fixed" else s.scale if s.norm == "cap" else 1.0
+                      for s in self.specs])
+        cap = np.array([1.0 if s.norm == "cap" else np.inf for s in self.specs])
+        by_max = np.array([s.norm == "max" for s in self.specs])
+        W = np.zeros((len(self.specs), len(GROUPS)))
+        for i, s in enumerate(self.specs):
+            W[i, GROUPS.index(s.group)] = s.weight
+        object.__setattr__(self, "_compiled", {
+            "names": [s.name for s in self.specs], "a": a, "cap": cap,
+            "by_max": by_max, "W": W, "g": np.asarray(self.glob, dtype=float),
+        })
+
+    @classmethod
+    def from_weights(
+        cls,
+        groups: Dict[str, Dict[str, float]],
+        glob: Dict[str, float],
+        norms: Dict[str, Tuple[str, float]],
+    ) -> "ScoringModel":
+        """Construit le modèle depuis des dicts de poids {groupe: {métrique: poids}}."""
+        specs = tuple(
+            MetricSpec(m, g, float(w), *norms.get(m, ("identity", 1.0)))
+            for g, weights in groups.items() for m, w in weights.items()
+        )
+        return cls(specs, tuple(float(glob[g]) for g in GROUPS))
+
+    # ─────────────────────────── poids ─────────────────────────
+
+    @property
+    def metric_names(self):
+        return list(self._compiled["names"])
+
+    def weights(self) -> Dict[str, float]:
+        """Poids courants : une entrée par métrique et par groupe."""
+        out = {s.name: s.weight for s in self.specs}
+        out.update(zip(GROUPS, self.glob))
+        return out
+
+    def with_weights(self, **weights: float) -> "ScoringModel":
+        """Copie du modèle avec d’autres poids (noms de métriques ou de groupes)."""
+        unknown = set(weights) - set(self.weights())
+        if unknown:
+            raise KeyError(f"poids inconnus : {sorted(unknown)}")
+        specs = tuple(replace(s, weight=float(weights.get(s.name, s.weight))) for s in self.specs)
+        glob = tuple(float(weights.get(g, w)) for g, w in zip(GROUPS, self.glob))
+        return ScoringModel(specs, glob)
+
+    # ─────────────────────────── évaluation ────────────────────
+
+    def evaluate(self, X: np.ndarray, max_vals: Optional[np.ndarray] = None,
+                 inplace: bool = False) -> np.ndarray:
+        """
+        X : (pages × métriques) dans l’ordre de `metric_names`.
+        Renvoie (pages × 4) : heat, quality, risk, sensitivity.
+        Les NaN comptent pour 0 dans les sommes pondérées.
+
+        `inplace=True` normalise X sur place et garde son dtype (float32
+        pour `CompactMetrics`) : aucune copie de la matrice des métriques.
+        """
+        c = self._compiled
+        if not inplace:
+            X = np.asarray(X, dtype=float)
+        if max_vals is None:
+            max_vals = np.fmax.reduce(X, axis=0) if len(X) else np.zeros(X.shape[1])
+        a = np.where(c["by_max"], 1 / (np.asarray(max_vals, dtype=float) + EPS), c["a"])
+        if inplace:
+            N = X
+            N *= a.astype(X.dtype)
+            np.minimum(N, c["cap"].astype(X.dtype), out=N)
+        else:
+            N = np.minimum(X * a, c["cap"])
+        np.nan_to_num(N, copy=False, nan=0.0)
+        out = np.empty((len(N), len(GROUPS) + 1), dtype=N.dtype)
+        np.matmul(N, c["W"].astype(N.dtype), out=out[:, :len(GROUPS)])
+        np.matmul(out[:, :len(GROUPS)], c["g"].astype(N.dtype), out=out[:, len(GROUPS)])
+        return out
+
+    def score(self, metrics: pd.DataFrame, max_vals: Optional[pd.Series] = None):
+        """Même retour que `wikipedia_scoring_pipeline.score_metrics`."""
+        from wikipedia_scoring_pipeline import ScoringResult
+        names = self._compiled["names"]
+        mx = None if max_vals is None else max_vals.reindex(names).to_numpy(dtype=float)
+        out = self.evaluate(metrics[names].to_numpy(dtype=float), mx)
+        cols = [pd.Series(out[:, k], index=metrics.index) for k in range(4)]
+        return ScoringResult(*cols, missing=metrics[names].isna().any(axis=1))
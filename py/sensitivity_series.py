@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# sensitivity_series.py
+"""
+Séries temporelles de sensibilité d’un panel, calculées en une passe.
+
+Au lieu d’appeler `compute_scores` une fois par fenêtre, on stocke les
+données quotidiennes de chaque page et on dérive les métriques de chaque
+pas de temps par calculs glissants :
+
+    pageview_spike, edit_spike   (max − médiane) / (médiane + 1) sur les
+                                 `window` + 1 derniers jours (jours sans
+                                 donnée = 0)
+    anon_edit                    Σ anon / Σ révisions sur la même fenêtre
+
+Les métriques « instantanées » (talk_intensity, protection_level,
+citation_gap, readability, blacklist_share) n’ont pas d’historique côté
+API : elles viennent des relevés datés (collecte du jour, runs de
+`score_history`) et sont jointes à chaque pas avec le dernier relevé
+antérieur (le plus ancien relevé pour les pas qui le précèdent).
+
+Chaque pas est ensuite noté comme un run (`score_metrics`, normalisation
+par le max du panel à ce pas) et stocké. Un appel ultérieur ne calcule que
+les pas manquants : le lendemain, un seul pas est ajouté, et seuls les
+jours récents de chaque page sont re-téléchargés. Les `SETTLE` derniers
+jours, dont les chiffres de l’API bougent encore, sont recalculés à chaque
+appel.
+
+Stockage : SQLite `py/cache/sensitivity.sqlite` (non versionné) – données
+quotidiennes, relevés instantanés, pas calculés. Une sélection libre de pages
+(hors registre) est stockée sous `adhoc_panel(pages)`, nom borné ; ses pas
+sont effacés après `ADHOC_TTL` sans usage.
+
+Fonctions exposées :
+    series(panel, pages, start, end, lang="fr", window=30, freq="D") -> DataFrame long
+        [date, page, <métriques>, heat, quality, risk, sensitivity, missing]
+    adhoc_panel(pages) -> str
+
+Usage :
+    python py/sensitivity_series.py "Personnalité du secteur des médias" --start 2025-01-01 --freq W
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import argparse
+import hashlib
+import sqlite3
+import sys
+import threading
+import numpy as np
+import pandas as pd
+
+import timeseries
+from ano_edit import get_anon_edit_daily
+from score_history import SCORE_COLS
+from wikipedia_scoring_pipeline import (
+    METRICS, ChunkCallback, ScoringCancelled, collect_metrics, score_metrics,
+)
+
+DB_PATH = Path("py/cache/sensitivity.sqlite")
+WINDOWED = ["pageview_spike", "edit_spike", "anon_edit"]
+SNAPSHOT = [m for m in METRICS if m not in WINDOWED]
+DAILY = ["views", "edits", "anon", "revs"]
+FREQS = {"D": 1, "W": 7}
+SETTLE = timeseries.SETTLE_DAYS   # jours récents re-téléchargés et recalculés à chaque appel
+SNAPSHOT_MAX_AGE = timedelta(days=7)
+HISTORY_BUDGET = 120.0       # secondes de pagination des révisions par page (rattrapage)
+WORKERS = 8
+ADHOC = "adhoc:"             # préfixe des panels ad hoc (sélections libres de pages)
+ADHOC_TTL = timedelta(days=30)
+LEGACY_ADHOC = "app1:"       # anciennes clés d’app_1 : liste complète des titres
+
+# ─────────────────────────── stockage ──────────────────────────
+
+class SeriesStore:
+    """Données quotidiennes par page, relevés instantanés et pas calculés."""
+
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            metric_cols = ", ".join(f"{m} REAL" for m in METRICS)
+            snap_cols = ", ".join(f"{m} REAL" for m in SNAPSHOT)
+            self._db.executescript(f"""
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS daily (
+                    lang TEXT, page TEXT, day TEXT,
+                    views INTEGER, edits INTEGER, anon INTEGER, revs INTEGER,
+                    PRIMARY KEY (lang, page, day));
+                CREATE TABLE IF NOT EXISTS coverage (
+                    lang TEXT, page TEXT, first TEXT, last TEXT, PRIMARY KEY (lang, page));
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    lang TEXT, page TEXT, day TEXT, {snap_cols}, PRIMARY KEY (lang, page, day));
+                CREATE TABLE IF NOT EXISTS runs (
+                    panel TEXT, lang TEXT, window INTEGER, freq TEXT, members TEXT, used TEXT,
+                    PRIMARY KEY (panel, lang, window, freq));
+                CREATE TABLE IF NOT EXISTS steps (
+                    panel TEXT, lang TEXT, window INTEGER, freq TEXT, day TEXT, page TEXT,
+                    {metric_cols}, heat REAL, quality REAL, risk REAL, sensitivity REAL,
+                    missing INTEGER,
+                    PRIMARY KEY (panel, lang, window, freq, day, page));
+            """)
+            if "used" not in {c for _, c, *_ in self._db.execute("PRAGMA table_info(runs)")}:
+                self._db.execute("ALTER TABLE runs ADD COLUMN used TEXT")
+        return self._db
+
+    def _select(self, sql: str, params: list, names: List[str]) -> List[tuple]:
+        """`sql` avec un `IN ({})` sur `names`, par tranches de 500."""
+        rows: List[tuple] = []
+        with self._lock:
+            db = self._conn()
+            for k in range(0, len(names), 500):
+                part = names[k:k + 500]
+                rows += db.execute(sql.format(",".join("?" * len(part))), [*params, *part]).fetchall()
+        return rows
+
+    # ─── données quotidiennes ───
+
+    def coverage(self, lang: str, pages: List[str]) -> Dict[str, Tuple[str, str]]:
+        rows = self._select("SELECT page, first, last FROM coverage WHERE lang=? AND page IN ({})",
+                            [lang], pages)
+        return {p: (a, b) for p, a, b in rows}
+
+    def put_daily(self, lang: str, page: str, frame: pd.DataFrame) -> None:
+        """`frame` : index jours contigus, colonnes `DAILY` ; étend la couverture."""
+        a, b = frame.index.min().date().isoformat(), frame.index.max().date().isoformat()
+        rows = [(lang, page, d.date().isoformat(), *map(int, r))
+                for d, r in zip(frame.index, frame[DAILY].to_numpy())]
+        with self._lock:
+            db = self._conn()
+            db.executemany("INSERT OR REPLACE INTO daily VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            db.execute("""
+                INSERT INTO coverage VALUES (?, ?, ?, ?)
+                ON CONFLICT (lang, page) DO UPDATE SET
+                    first = min(first, excluded.first), last = max(last, excluded.last)""",
+                       (lang, page, a, b))
+            db.commit()
+
+    def daily(self, lang: str, pages: List[str], start: str, end: str) -> pd.DataFrame:
+        rows = self._select(
+            "SELECT page, day, views, edits, anon, revs FROM daily "
+            "WHERE lang=? AND day BETWEEN ? AND ? AND page IN ({})", [lang, start, end], pages)
+        df = pd.DataFrame(rows, columns=["page", "day", *DAILY])
+        df["day"] = pd.to_datetime(df["day"])
+        return df
+
+    # ─── relevés instantanés ───
+
+    def put_snapshots(self, lang: str, day: str, frame: pd.DataFrame) -> None:
+        """`frame` : index pages, colonnes `SNAPSHOT`."""
+        rows = [(lang, p, day, *(None if pd.isna(v) else float(v) for v in r))
+                for p, r in zip(frame.index, frame[SNAPSHOT].to_numpy())]
+        with self._lock:
+            db = self._conn()
+            db.executemany(f"INSERT OR REPLACE INTO snapshots VALUES ({','.join('?' * (3 + len(SNAPSHOT)))})",
+                           rows)
+            db.commit()
+
+    def snapshots(self, lang: str, pages: List[str]) -> pd.DataFrame:
+        rows = self._select(f"SELECT page, day, {', '.join(SNAPSHOT)} FROM snapshots "
+                            f"WHERE lang=? AND page IN ({{}})", [lang], pages)
+        return pd.DataFrame(rows, columns=["page", "day", *SNAPSHOT])
+
+    # ─── pas calculés ───
+
+    def done(self, key: tuple, members: str, before: str) -> set:
+        """
+        Jours déjà calculés (avant `before`) dont toutes les pages ont leurs
+        métriques `WINDOWED` : un pas calculé pendant l’échec du téléchargement
+        d’une page est refait (une métrique instantanée absente, souvent
+        durable, ne suffit pas). Tout est effacé si le panel a changé.
+        """
+        today = date.today().isoformat()
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT members FROM runs WHERE panel=? AND lang=? AND window=? AND freq=?",
+                             key).fetchone()
+            if row is None or row[0] != members:
+                db.execute("DELETE FROM steps WHERE panel=? AND lang=? AND window=? AND freq=?", key)
+                db.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?)", (*key, members, today))
+                db.commit()
+                return set()
+            db.execute("UPDATE runs SET used=? WHERE panel=? AND lang=? AND window=? AND freq=?",
+                       (today, *key))
+            db.commit()
+            return {d for (d,) in db.execute(
+                "SELECT day FROM steps WHERE panel=? AND lang=? AND window=? AND freq=? "
+                f"AND day < ? GROUP BY day HAVING SUM({' OR '.join(f'{m} IS NULL' for m in WINDOWED)}) = 0",
+                (*key, before))}
+
+    def prune_adhoc(self, max_age: timedelta = ADHOC_TTL) -> int:
+        """Efface les runs ad hoc (et leurs pas) inutilisés depuis `max_age` ; renvoie leur nombre."""
+        stale = ("(panel LIKE ? OR panel LIKE ?) AND (used IS NULL OR used < ?)",
+                 (f"{ADHOC}%", f"{LEGACY_ADHOC}%", (date.today() - max_age).isoformat()))
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM steps WHERE (panel, lang, window, freq) IN "
+                       f"(SELECT panel, lang, window, freq FROM runs WHERE {stale[0]})", stale[1])
+            n = db.execute(f"DELETE FROM runs WHERE {stale[0]}", stale[1]).rowcount
+            db.commit()
+        return n
+
+    def put_steps(self, key: tuple, frame: pd.DataFrame) -> None:
+        cols = ["date", "page", *METRICS, *SCORE_COLS, "missing"]
+        frame = frame[cols].assign(missing=frame["missing"].astype(int)).astype(object)
+        rows = [(*key, *r) for r in frame.where(frame.notna(), None).to_numpy().tolist()]
+        with self._lock:
+            db = self._conn()
+            db.executemany(f"INSERT OR REPLACE INTO steps VALUES ({','.join('?' * (4 + len(cols)))})", rows)
+            db.commit()
+
+    def steps(self, key: tuple, start: str, end: str) -> pd.DataFrame:
+        with self._lock:
+            df = pd.read_sql_query(
+                f"SELECT day AS date, page, {', '.join(METRICS)}, {', '.join(SCORE_COLS)}, missing "
+                "FROM steps WHERE panel=? AND lang=? AND window=? AND freq=? AND day BETWEEN ? AND ? "
+                "ORDER BY day, page", self._conn(), params=(*key, start, end))
+        df["missing"] = df["missing"].astype(bool)
+        return df
+
+
+STORE = SeriesStore()
+
+# ─────────────────────────── collecte ──────────────────────────
+
+def _fetch_daily(page: str, lang: str, start: date, end: date) -> pd.DataFrame:
+    """
+    Données quotidiennes `DAILY` de `page` sur [start, end] (0 les jours sans
+    donnée). `timeseries` re-télécharge lui-même les `SETTLE` derniers jours.
+    """
+    days = pd.date_range(start, end, freq="D")
+    site = f"{lang}.wikipedia"
+    views = timeseries.get_series(site, page, "pageviews", start.isoformat(), end.isoformat())
+    edits = timeseries.get_series(site, page, "edits", start.isoformat(), end.isoformat())
+    anon = get_anon_edit_daily(page, start.isoformat(), end.isoformat(), lang, budget=HISTORY_BUDGET)
+    return pd.DataFrame({
+        "views": views.reindex(days, fill_value=0), "edits": edits.reindex(days, fill_value=0),
+        "anon": anon["anon"], "revs": anon["total"],
+    }).fillna(0).astype("int64")
+
+
+def _gaps(cov: Optional[Tuple[str, str]], start: date, end: date) -> List[Tuple[date, date]]:
+    """Fenêtres à télécharger pour couvrir [start, end] de façon contiguë."""
+    if cov is None:
+        return [(start, end)]
+    first, last = date.fromisoformat(cov[0]), date.fromisoformat(cov[1])
+    out = []
+    if start < first:
+        out.append((start, first - timedelta(days=1)))
+    settled = date.today() - timedelta(days=SETTLE)
+    if end > min(last, settled):
+        out.append((min(last + timedelta(days=1), settled), end))
+    return out
+
+
+def _ensure_daily(pages: List[str], lang: str, start: date, end: date, store: SeriesStore,
+                  on_chunk: Optional[ChunkCallback], cancel: Optional[threading.Event]) -> None:
+    cov = store.coverage(lang, pages)
+    todo = [(p, gaps) for p in pages if (gaps := _gaps(cov.get(p), start, end))]
+
+    def one(item):
+        page, gaps = item
+        if cancel is not None and cancel.is_set():
+            return page, None
+        try:
+            return page, [_fetch_daily(page, lang, a, b) for a, b in gaps]
+        except Exception as e:
+            print(f"⚠️  {page} : historique quotidien indisponible ({e})", file=sys.stderr)
+            return page, None
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for k, (page, frames) in enumerate(pool.map(one, todo), 1):
+            for f in frames or []:
+                store.put_daily(lang, page, f)
+            if on_chunk is not None:
+                on_chunk("historique quotidien", pd.Series({page: float(frames is not None)}), k, len(todo))
+    if cancel is not None and cancel.is_set():
+        raise ScoringCancelled("historique quotidien")
+
+
+def _ensure_snapshots(pages: List[str], lang: str, store: SeriesStore,
+                      on_chunk: Optional[ChunkCallback], cancel: Optional[threading.Event]) -> pd.DataFrame:
+    """Relevés instantanés connus (+ score_history) ; collecte du jour si trop anciens."""
+    import score_history
+    hist = score_history.read(pages=pages, lang=lang, columns=[*SNAPSHOT, "computed_at"])
+    if not hist.empty:
+        hist["day"] = pd.to_datetime(hist["computed_at"]).dt.date.astype(str)
+        hist = hist.drop_duplicates(["page", "day"], keep="last")
+        for day, grp in hist.groupby("day"):
+            store.put_snapshots(lang, day, grp.set_index("page"))
+    snaps = store.snapshots(lang, pages)
+    recent = (date.today() - SNAPSHOT_MAX_AGE).isoformat()
+    stale = sorted(set(pages) - set(snaps.loc[snaps["day"] >= recent, "page"]))
+    if stale:
+        today = date.today()
+        frame = collect_metrics(stale, (today - timedelta(days=30)).isoformat(), today.isoformat(), lang,
+                                metrics=SNAPSHOT, on_chunk=on_chunk, cancel=cancel)
+        store.put_snapshots(lang, today.isoformat(), frame)
+        snaps = store.snapshots(lang, pages)
+    return snaps
+
+# ─────────────────────────── calcul ────────────────────────────
+
+def _step_days(start: date, end: date, freq: str) -> List[date]:
+    """
+    Pas de `start` à `end` ; en hebdomadaire, les dimanches (fin de semaine
+    ISO) : les pas ne dépendent pas de `end` et restent valables d’un appel
+    à l’autre.
+    """
+    if freq == "W":
+        start += timedelta(days=6 - start.weekday())
+    if start > end:
+        return []
+    n = FREQS[freq]
+    return [start + timedelta(days=n * i) for i in range((end - start).days // n + 1)]
+
+
+def _windowed(daily: pd.DataFrame, pages: List[str], days: List[date], window: int) -> Dict[str, pd.DataFrame]:
+    """
+    Métriques `WINDOWED` (pas × pages) sur les `window` + 1 jours finissant
+    à chaque pas ; NaN si un jour de la fenêtre manque (page non couverte).
+    """
+    full = pd.date_range(days[0] - timedelta(days=window), days[-1], freq="D")
+    cube = {c: daily.pivot(index="day", columns="page", values=c).reindex(index=full, columns=pages)
+                    .astype(float) for c in DAILY}
+    roll = {c: f.rolling(window + 1, min_periods=window + 1) for c, f in cube.items()}
+    at = pd.DatetimeIndex(days)
+
+    def spike(c: str) -> pd.DataFrame:
+        med, mx = roll[c].median(), roll[c].max()
+        return ((mx - med) / (med + 1)).reindex(at).round(4)
+
+    revs = roll["revs"].sum().reindex(at)
+    anon = (roll["anon"].sum().reindex(at) / revs).where(revs > 0, 0.0).where(revs.notna())
+    return {"pageview_spike": spike("views"), "edit_spike": spike("edits"), "anon_edit": anon}
+
+
+def _as_of(snaps: pd.DataFrame, pages: List[str], days: List[date]) -> pd.DataFrame:
+    """Relevé applicable à chaque (pas, page) : dernier antérieur, sinon le plus ancien."""
+    grid = pd.DataFrame([(d, p) for d in days for p in pages], columns=["day", "page"])
+    grid["day"] = pd.to_datetime(grid["day"])
+    if snaps.empty:
+        return grid.assign(**{m: np.nan for m in SNAPSHOT})
+    s = snaps.assign(day=pd.to_datetime(snaps["day"])).sort_values("day")
+    grid = grid.sort_values("day")
+    back = pd.merge_asof(grid, s, on="day", by="page", direction="backward")
+    fwd = pd.merge_asof(grid, s, on="day", by="page", direction="forward")
+    back[SNAPSHOT] = back[SNAPSHOT].fillna(fwd[SNAPSHOT])
+    return back
+
+
+def _compute(pages: List[str], lang: str, days: List[date], window: int,
+             store: SeriesStore, snaps: pd.DataFrame) -> pd.DataFrame:
+    first = days[0] - timedelta(days=window)
+    daily = store.daily(lang, pages, first.isoformat(), days[-1].isoformat())
+    win = _windowed(daily, pages, days, window)
+    frame = _as_of(snaps, pages, days).set_index(["day", "page"])
+    for m, f in win.items():
+        frame[m] = f.stack(future_stack=True).reindex(frame.index)
+    frame = frame[METRICS]
+
+    parts = []
+    for day, grp in frame.groupby(level="day", sort=True):
+        metrics = grp.droplevel("day")
+        scores = score_metrics(metrics, lang=lang)
+        out = metrics.copy()
+        for c in SCORE_COLS:
+            out[c] = getattr(scores, c)
+        out["missing"] = scores.missing
+        out.insert(0, "date", day.date().isoformat())
+        parts.append(out.rename_axis("page").reset_index())
+    return pd.concat(parts, ignore_index=True)
+
+# ─────────────────────────── API publique ──────────────────────
+
+def _members(pages: List[str]) -> str:
+    return hashlib.sha1("\n".join(sorted(pages)).encode()).hexdigest()[:16]
+
+
+def adhoc_panel(pages: List[str]) -> str:
+    """Nom de stockage (borné) d’une sélection libre de pages."""
+    return ADHOC + _members(list(dict.fromkeys(pages)))
+
+
+def series(
+    panel: str,
+    pages: List[str],
+    start: str,
+    end: str,
+    lang: str = "fr",
+    window: int = 30,
+    freq: str = "D",
+    store: Optional[SeriesStore] = None,
+    on_chunk: Optional[ChunkCallback] = None,
+    cancel: Optional[threading.Event] = None,
+) -> pd.DataFrame:
+    """
+    Série de sensibilité du panel, un pas par jour (`freq="D"`) ou par
+    semaine (`"W"`, le dimanche), chaque pas notant la fenêtre de `window` jours qui s’y
+    termine. Ne calcule que les pas absents du stockage (et les `SETTLE`
+    derniers jours). `end` est ramené à hier : le jour courant est incomplet.
+    """
+    if freq not in FREQS:
+        raise ValueError(f"pas inconnu : {freq}")
+    store = store or STORE
+    pages = list(dict.fromkeys(pages))
+    start_d = date.fromisoformat(str(start)[:10])
+    end_d = min(date.fromisoformat(str(end)[:10]), date.today() - timedelta(days=1))
+    key = (panel, lang, window, freq)
+    members = _members(pages)
+    store.prune_adhoc()
+
+    days = _step_days(start_d, end_d, freq)
+    settled = (date.today() - timedelta(days=SETTLE)).isoformat()
+    done = store.done(key, members, settled)
+    todo = [d for d in days if d.isoformat() not in done]
+    if todo:
+        _ensure_daily(pages, lang, todo[0] - timedelta(days=window), todo[-1], store, on_chunk, cancel)
+        snaps = _ensure_snapshots(pages, lang, store, on_chunk, cancel)
+        store.put_steps(key, _compute(pages, lang, todo, window, store, snaps))
+    out = store.steps(key, start_d.isoformat(), end_d.isoformat())
+    return out[out["date"].isin({d.isoformat() for d in days})].reset_index(drop=True)
+
+
+def trend(frame: pd.DataFrame, top: int = 10, column: str = "sensitivity") -> pd.DataFrame:
+    """Lignes des `top` pages les plus sensibles au dernier pas (pour un graphique)."""
+    if frame.empty:
+        return frame
+    last = frame[frame["date"] == frame["date"].max()]
+    pages = last.nlargest(top, column)["page"]
+    return frame[frame["page"].isin(pages)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Série de sensibilité d’un panel")
+    ap.add_argument("panel")
+    ap.add_argument("--start", default=(date.today() - timedelta(days=90)).isoformat())
+    ap.add_argument("--end", default=(date.today() - timedelta(days=1)).isoformat())
+    ap.add_argument("--lang", default="fr")
+    ap.add_argument("--window", type=int, default=30)
+    ap.add_argument("--freq", choices=list(FREQS), default="D")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--out", help="Écrit la série complète (CSV)")
+    ns = ap.parse_args()
+
+    from registry import REGISTRY
+    pages = REGISTRY.pages(ns.panel)
+    t0 = datetime.now()
+    out = series(ns.panel, pages, ns.start, ns.end, ns.lang, ns.window, ns.freq)
+    print(f"✅ {out['date'].nunique()} pas × {len(pages)} pages en "
+          f"{(datetime.now() - t0).total_seconds():.1f} s")
+    if ns.out:
+        out.to_csv(ns.out, index=False)
+    wide = trend(out, ns.top).pivot(index="date", columns="page", values="sensitivity")
+    print(wide.round(3).tail(10).to_markdown())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# spikes.py
+"""
+Détection multi-pics sur fenêtre glissante.
+
+Le score « spike » historique compare le maximum à la médiane de toute la
+fenêtre : sur une année, il ne voit qu’un seul événement. Ici, chaque jour
+est comparé à la **médiane glissante des `window` jours précédents** :
+
+    magnitude(t) = (x(t) − med_w(t)) / (med_w(t) + 1)
+
+(même normalisation que `pageviews.py`, mais locale). Un jour est un pic si
+  • magnitude ≥ `threshold` ;
+  • c’est le maximum local sur ± `min_gap` jours (un pic par rafale ; sur
+    un plateau, seul le premier jour est retenu).
+
+La médiane glissante de pandas (skiplist) coûte O(n log w) par série, et le
+calcul est vectorisé sur toutes les colonnes (pages) d’un même DataFrame.
+
+Fonction exposée :
+    detect_peaks(frame, window=28, threshold=1.0, min_gap=7) -> pd.DataFrame
+"""
+
+from __future__ import annotations
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+# ─────────────────────────── helpers ────────────────────────────
+
+def to_frame(series: Dict[str, pd.Series]) -> pd.DataFrame:
+    """{page: Series} → DataFrame quotidien (dates × pages), jours manquants = 0."""
+    series = {p: s for p, s in series.items() if not s.empty}
+    if not series:
+        return pd.DataFrame()
+    frame = pd.DataFrame(series)
+    full = pd.date_range(frame.index.min(), frame.index.max(), freq="D")
+    return frame.reindex(full).fillna(0).astype("float64")
+
+# ─────────────────────────── API publique ──────────────────────
+
+def detect_peaks(
+    frame: pd.DataFrame,
+    window: int = 28,
+    threshold: float = 1.0,
+    min_gap: int = 7,
+) -> pd.DataFrame:
+    """
+    `frame` : DataFrame quotidien (index : dates, colonnes : pages).
+
+    Renvoie un DataFrame long `[page, peak_day, peak_views, baseline, spike]`,
+    un pic par ligne, trié par page puis date.
+    """
+    cols = ["page", "peak_day", "peak_views", "baseline", "spike"]
+    if frame.empty:
+        return pd.DataFrame(columns=cols)
+
+    min_periods = max(3, window // 4)
+    baseline = frame.shift(1).rolling(window, min_periods=min_periods).median()
+    magnitude = (frame - baseline) / (baseline + 1)
+
+    local_max = frame.rolling(2 * min_gap + 1, center=True, min_periods=1).max()
+    # plateau : seul le premier jour d’une égalité dans la fenêtre compte
+    prior_max = frame.shift(1).rolling(min_gap, min_periods=1).max().fillna(-np.inf)
+    mask = (magnitude >= threshold) & (frame >= local_max) & (frame > prior_max) & (frame > 0)
+
+    rows, cols_idx = np.nonzero(mask.to_numpy())
+    if rows.size == 0:
+        return pd.DataFrame(columns=cols)
+
+    out = pd.DataFrame({
+        "page":       frame.columns[cols_idx],
+        "peak_day":   frame.index[rows].strftime("%Y-%m-%d"),
+        "peak_views": frame.to_numpy()[rows, cols_idx].astype(int),
+        "baseline":   baseline.to_numpy()[rows, cols_idx],
+        "spike":      magnitude.to_numpy()[rows, cols_idx].round(4),
+    })
+    return out.sort_values(["page", "peak_day"]).reset_index(drop=True)
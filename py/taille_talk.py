@@ -4,56 +4,44 @@ Extraction de l’activité (proxy = taille brute) des pages de discussion Wikip
 Adapté depuis le notebook `taille_talk.ipynb`.
 
 Fonction principale :
-    get_talk_activity(pages: list[str], start: str, end: str) -> pandas.Series
+    get_talk_activity(pages: list[str], start: str, end: str, lang: str = "fr") -> pandas.Series
 
 • `pages` : titres d’articles sans préfixe « Discussion: »
 • `start`, `end` : réservés pour une future version (filtrage temporel). Pour
   l’instant ignorés, mais gardés pour compatibilité avec le pipeline.
+• `lang` : code langue du wiki (le préfixe de discussion est adapté).
 
 Retour :
     pd.Series indexés par titre de page, contenant la taille de la page de
     discussion en nombre de caractères (int). Les pages sans discussion
     renvoient 0.
+
+Le wikitext des discussions vient de `page_cache` : revalidé par lots
+(`prop=info`), re-téléchargé seulement si la discussion a changé.
 """
 
 from __future__ import annotations
-import requests
 import pandas as pd
+import page_cache
 from typing import List
 
-API_URL = "https://fr.wikipedia.org/w/api.php"
-USER_AGENT = "TalkPageSizeBot/1.0 (mailto:alefichoux@gmail.com)"
-_headers = {"User-Agent": USER_AGENT}
-
-
-def _talk_size(title: str) -> int:
-    talk_title = f"Discussion:{title}"
-    params = {
-        "action": "query",
-        "format": "json",
-        "prop": "revisions",
-        "titles": talk_title,
-        "rvslots": "main",
-        "rvprop": "content",
-        "redirects": 1,
-    }
-    try:
-        resp = requests.get(API_URL, params=params, headers=_headers, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        page = next(iter(data["query"]["pages"].values()))
-        if "revisions" not in page:
-            return 0  # pas de discussion → 0 caractères
-        content = page["revisions"][0]["slots"]["main"].get("*", "")
-        return len(content)
-    except Exception:
-        return 0  # fallback silencieux (peut logguer si besoin)
-
-
-def get_talk_activity(pages: List[str], start: str | None = None, end: str | None = None):
-    """Renvoie la taille (nb caractères) des pages de discussion."""
-    data = {p: _talk_size(p) for p in pages}
-    return pd.Series(data, name="talk_intensity")
+# nom local de l’espace « Discussion » ; le nom canonique « Talk » marche partout
+TALK_PREFIX = {"fr": "Discussion"}
+
+
+def _talk_title(title: str, lang: str = "fr") -> str:
+    return f"{TALK_PREFIX.get(lang, 'Talk')}:{title}"
+
+
+def get_talk_activity(
+    pages: List[str], start: str | None = None, end: str | None = None, lang: str = "fr"
+):
+    """Renvoie la taille (nb caractères) des pages de discussion ; NaN en cas d’échec."""
+    talk = {p: _talk_title(p, lang) for p in pages}
+    texts = page_cache.wikitexts(list(talk.values()), lang)
+    # pas de discussion → "" → 0 caractères
+    data = {p: float("nan") if texts.get(t) is None else len(texts[t]) for p, t in talk.items()}
+    return pd.Series(data, name="talk_intensity", dtype=float)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,7 @@
+# conftest.py
+"""Les modules de `py/` s’importent à plat, comme depuis les scripts."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,76 @@
+# test_blacklist_metric.py
+"""Parité des sources `wikitext` et `extlinks` sur des réponses API enregistrées."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+import blacklist_metric
+import page_cache
+import wiki_http
+
+FIXTURE = Path(__file__).parent / "fixtures" / "blacklist_api.json"
+PAGES = ["Parité", "Doublons", "Modèles", "Sans_lien"]
+
+
+class _Resp:
+    def __init__(self, data: dict):
+        self._data = data
+        self.content = json.dumps(data).encode()
+        self.status_code = 200
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def json(self) -> dict:
+        return self._data
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    recorded = json.loads(FIXTURE.read_text())
+    calls = []
+
+    def get(url, params=None, **kw):
+        calls.append(dict(params))
+        prop = params["prop"]
+        if prop == "extlinks":
+            return _Resp(recorded["extlinks"][1 if "elcontinue" in params else 0])
+        return _Resp(recorded[prop])
+
+    monkeypatch.setattr(wiki_http, "get", get)
+    monkeypatch.setattr(page_cache, "STORE", page_cache.PageStore(tmp_path / "pages.sqlite"))
+    return calls
+
+
+@pytest.fixture
+def blacklist(tmp_path):
+    p = tmp_path / "blacklist.txt"
+    p.write_text("breitbart.com\n")
+    return p
+
+
+def test_sources_agree_on_plain_references(api, blacklist):
+    wikitext = blacklist_metric.get_blacklist_share(PAGES, blacklist, source="wikitext")
+    extlinks = blacklist_metric.get_blacklist_share(PAGES, blacklist, source="extlinks")
+    for page in ("Parité", "Sans_lien"):
+        assert extlinks[page] == pytest.approx(wikitext[page])
+    assert wikitext["Parité"] == pytest.approx(0.5)
+    # titre normalisé et continuation suivie
+    assert [c.get("elcontinue") for c in api if c["prop"] == "extlinks"] == [None, "12|1"]
+
+
+def test_documented_differences(api, blacklist):
+    df = blacklist_metric.compare_sources(PAGES, blacklist)
+
+    # extlinks dédupliqué par page, le wikitext compte chaque occurrence
+    assert df.loc["Doublons", ["n_wikitext", "n_extlinks"]].tolist() == [3, 2]
+    assert df.loc["Doublons", "wikitext"] == pytest.approx(2 / 3)
+    assert df.loc["Doublons", "extlinks"] == pytest.approx(1 / 2)
+
+    # extlinks voit les liens produits par les modèles, pas ceux en commentaire
+    assert df.loc["Modèles", "wikitext"] == pytest.approx(1 / 2)
+    assert df.loc["Modèles", "extlinks"] == 0.0
+
+    assert df["diff"].abs().gt(1e-9).sum() == 2
@@ -0,0 +1,99 @@
+# test_change_feed.py
+"""Rejeu d’un flux enregistré : quels caches sont invalidés, et lesquels restent fiables."""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import category_graph
+import change_feed
+import page_cache
+import protection
+import timeseries
+
+FIXTURE = Path(__file__).parent / "fixtures" / "recentchange.jsonl"
+PAGES = ["Tracked A", "Tracked B", "Untracked", "Discussion:Tracked B"]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    st = page_cache.PageStore(tmp_path / "pages.sqlite")
+    monkeypatch.setattr(page_cache, "STORE", st)
+    st.put("fr", [(t, 1, "", f"texte {t}") for t in PAGES])
+    st.put("en", [("Tracked A", 1, "", "texte en")])
+    return st
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    seen = {"protect": [], "categorize": []}
+    monkeypatch.setattr(protection.STORE, "invalidate",
+                        lambda lang, titles: seen["protect"].extend(titles) or len(titles))
+    monkeypatch.setattr(category_graph.GRAPH, "flag",
+                        lambda lang, titles: seen["categorize"].extend(titles) or len(titles))
+    return seen
+
+
+def _series(title: str) -> None:
+    e = timeseries._entry(("fr.wikipedia.org", title, "edits", "user", "daily"))
+    days = pd.date_range("2025-10-01", "2025-10-14")
+    e.series = pd.Series(1, index=days, dtype="int64")
+    e.covered = [(days[0], days[-1])]
+
+
+def test_replay_invalidates_tracked_pages_only(store, calls):
+    timeseries.clear()
+    _series("Tracked A")
+    _series("Untracked")
+    inv = change_feed.Invalidator()
+    inv.track("fr", ["Tracked A", "Tracked B"])
+
+    done = inv.apply(change_feed.replay(FIXTURE))
+
+    # wikidata et le blocage sont ignorés ; le reste est lu
+    assert inv.stats["seen"] == 7
+    # Tracked A (deux fois), discussion de Tracked B, protection, catégorie
+    assert inv.stats["relevant"] == 5
+    assert set(store.get("fr", PAGES)) == {"Tracked B", "Untracked"}
+    assert set(store.get("en", ["Tracked A"])) == {"Tracked A"}          # autre wiki non suivi
+    assert calls == {"protect": ["Tracked B"], "categorize": ["Catégorie:Exemple"]}
+
+    # séries d’éditions coupées au plus ancien changement (2025-10-09)
+    kept = timeseries._entry(("fr.wikipedia.org", "Tracked A", "edits", "user", "daily"))
+    assert kept.series.index.max() == pd.Timestamp("2025-10-08")
+    other = timeseries._entry(("fr.wikipedia.org", "Untracked", "edits", "user", "daily"))
+    assert other.series.index.max() == pd.Timestamp("2025-10-14")
+    assert done == {"edit": 2 + 1, "protect": 1, "categorize": 1}
+    timeseries.clear()
+
+
+def test_only_watched_pages_are_trusted(store, monkeypatch):
+    now = datetime.utcnow()
+    store.watch("fr", ["Tracked A"])
+    store.put("fr", [("Tracked A", 1, "", "texte Tracked A")])      # téléchargée sous surveillance
+    store.mark_synced("fr", (now - timedelta(hours=1)).isoformat(timespec="seconds"),
+                      now.isoformat(timespec="seconds"))
+    revalidated = []
+
+    def info(titles, lang):
+        revalidated.extend(titles)
+        return {t: (1, "") for t in titles}
+    monkeypatch.setattr(page_cache, "_info", info)
+
+    out = page_cache.wikitexts(["Tracked A", "Untracked"], store=store)
+
+    assert out == {"Tracked A": "texte Tracked A", "Untracked": "texte Untracked"}
+    assert revalidated == ["Untracked"]
+
+    # revalidée, la page non surveillée n’en devient pas fiable pour autant
+    revalidated.clear()
+    page_cache.wikitexts(["Untracked"], store=store)
+    assert revalidated == ["Untracked"]
+
+    # une page qui n’est plus suivie perd sa garantie
+    store.watch("fr", [])
+    revalidated.clear()
+    page_cache.wikitexts(["Tracked A"], store=store)
+    assert revalidated == ["Tracked A"]
@@ -0,0 +1,37 @@
+# test_reference_dist.py
+"""Distributions de référence : une page compte une fois par fenêtre, quel que soit le nombre de runs."""
+
+import numpy as np
+import pandas as pd
+
+import reference_dist
+
+PAGES = [f"Page {k}" for k in range(50)]
+
+
+def _run(values, pages=PAGES):
+    return pd.DataFrame({"pageview_spike": values}, index=pages)
+
+
+def test_rescoring_a_panel_does_not_reweight_it(tmp_path):
+    store = reference_dist.ReferenceStore(tmp_path / "ref.sqlite")
+    for _ in range(10):
+        store.update("fr", _run(np.arange(50.0)), window=30)
+    store.update("fr", _run(np.arange(50.0)), window=7)          # autre fenêtre : autres observations
+    store.update("fr", _run([1000.0] * 5, PAGES[:5]), window=30)  # dernière valeur de 5 pages
+
+    s = store.sketch("fr", "pageview_spike")
+    assert s.count == 100
+    assert s.rank(np.array([500.0]))[0] == 0.95             # 95 valeurs ≤ 500 sur 100
+
+
+def test_missing_value_keeps_previous_and_other_processes_see_updates(tmp_path):
+    path = tmp_path / "ref.sqlite"
+    store, other = reference_dist.ReferenceStore(path), reference_dist.ReferenceStore(path)
+    store.update("fr", _run(np.arange(50.0)), window=30)
+    assert other.sketch("fr", "pageview_spike").count == 50
+
+    store.update("fr", _run([np.nan] * 50), window=30)
+    store.update("fr", _run([5.0], ["Nouvelle page"]), window=30)
+    assert other.sketch("fr", "pageview_spike").count == 51
+    assert other.sketch("en", "pageview_spike") is None
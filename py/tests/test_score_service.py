@@ -0,0 +1,78 @@
+# test_score_service.py
+"""Délégation au service de scoring : mêmes résultats, progression, annulation et échéances."""
+
+import threading
+
+import pandas as pd
+import pytest
+
+import score_client
+import score_service
+import wikipedia_scoring_pipeline as wsp
+
+PAGES = [f"Page {k}" for k in range(5)]
+ARGS = ("2025-09-01", "2025-10-01", "fr")
+
+
+def _fake_collectors(start, end, lang):
+    # valeurs déterministes, sans réseau : une colonne distincte par métrique
+    return {m: (lambda ps, i=i: pd.Series({p: float(len(p) * (i + 1)) for p in ps}))
+            for i, m in enumerate(wsp.METRICS)}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(wsp, "_collectors", _fake_collectors)
+    monkeypatch.setattr(wsp, "_update_reference", lambda *a: None)
+    monkeypatch.setattr(score_service, "_FLIGHT", score_service.SingleFlight())
+    seen = []
+    real = score_service.collect_metrics
+
+    def spy(*args, **kwargs):
+        seen.append(kwargs)
+        return real(*args, **kwargs)
+    monkeypatch.setattr(score_service, "collect_metrics", spy)
+
+    srv = score_service.make_server("127.0.0.1", 0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    # le service tourne dans ce processus : seul le thread du test délègue
+    main = threading.current_thread()
+    monkeypatch.setattr(score_client, "enabled", lambda: threading.current_thread() is main)
+    monkeypatch.setattr(score_client, "SERVICE_URL", f"http://127.0.0.1:{srv.server_address[1]}")
+    yield seen
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_collect_reports_each_chunk_and_forwards_deadlines(service):
+    progress = []
+    frame = wsp.collect_metrics(PAGES, *ARGS, metrics=["pageview_spike", "readability"],
+                                chunk_size=2, deadline=60, page_deadline=5.0,
+                                on_chunk=lambda m, values, done, total: progress.append((m, done, total)))
+
+    assert progress == [("pageview_spike", 2, 5), ("pageview_spike", 4, 5), ("pageview_spike", 5, 5),
+                        ("readability", 2, 5), ("readability", 4, 5), ("readability", 5, 5)]
+    assert len(service) == 6                                  # une requête par tranche
+    assert all(kw["page_deadline"] == 5.0 for kw in service)
+    assert all(0 < kw["deadline"] <= 60 for kw in service)   # budget restant du run
+    collectors = _fake_collectors(*ARGS)
+    expected = pd.DataFrame({m: collectors[m](PAGES) for m in ["pageview_spike", "readability"]})
+    pd.testing.assert_frame_equal(frame, expected)
+
+
+def test_cancel_stops_between_chunks(service):
+    cancel = threading.Event()
+    with pytest.raises(wsp.ScoringCancelled):
+        wsp.collect_metrics(PAGES, *ARGS, chunk_size=2, cancel=cancel,
+                            on_chunk=lambda *a: cancel.set())
+    assert len(service) == 1
+
+
+def test_compute_scores_without_hooks_uses_scores_route(service):
+    scores, metrics = wsp.compute_scores(PAGES, *ARGS)
+
+    assert service == []                                      # /scores, pas /metrics
+    assert score_service._FLIGHT.stats()["computed"] == 1
+    expected = wsp.score_metrics(metrics)
+    pd.testing.assert_series_equal(scores.sensitivity, expected.sensitivity, check_names=False)
+    assert not scores.missing.any()
@@ -0,0 +1,40 @@
+# test_spikes.py
+"""Détection multi-pics : un pic par plateau, un pic par rafale séparée."""
+
+import pandas as pd
+
+import spikes
+
+DAYS = pd.date_range("2025-01-01", periods=90, freq="D")
+
+
+def _series(bursts):
+    """Fond à 10 vues par jour, `bursts` : {premier jour (indice): [vues, …]}."""
+    s = pd.Series(10.0, index=DAYS)
+    for start, values in bursts.items():
+        s.iloc[start:start + len(values)] = values
+    return s
+
+
+def test_flat_top_gives_one_peak_on_its_first_day():
+    frame = pd.DataFrame({"Plateau": _series({40: [100, 100, 100, 100]})})
+
+    peaks = spikes.detect_peaks(frame)
+
+    assert peaks["peak_day"].tolist() == ["2025-02-10"]         # jour 40
+    assert peaks["peak_views"].tolist() == [100]
+
+
+def test_two_separated_bursts_give_two_peaks():
+    frame = pd.DataFrame({
+        "Deux rafales": _series({35: [60, 100, 60], 65: [80, 80]}),
+        "Plateau":      _series({40: [100, 100, 100]}),        # même frame : calcul vectorisé
+    })
+
+    peaks = spikes.detect_peaks(frame)
+
+    two = peaks[peaks["page"] == "Deux rafales"]
+    assert two["peak_day"].tolist() == ["2025-02-06", "2025-03-07"]   # jours 36 et 65
+    assert two["peak_views"].tolist() == [100, 80]
+    assert (peaks["page"] == "Plateau").sum() == 1
+    assert (peaks["baseline"] == 10).all()
@@ -0,0 +1,262 @@
+# timeseries.py
+"""
+Service de séries temporelles partagé (pages vues / éditions).
+
+Toutes les séries quotidiennes de l’API REST Wikimedia passent par ici, que
+ce soit pour le scoring (`pageviews`, `edit`) ou pour les graphiques
+(`gaph_1`, `graph_2`) :
+
+  • mémoïsation en mémoire par (site, titre, métrique, type d’agent,
+    granularité) ;
+  • chaque entrée garde les fenêtres déjà couvertes : une sous-fenêtre est
+    découpée dans la série en cache, seules les portions manquantes sont
+    téléchargées ;
+  • les `SETTLE_DAYS` derniers jours (le mois en cours en mensuel) ne sont
+    jamais marqués couverts : l’API ne les a pas encore publiés ou les
+    complète encore, ils sont re-téléchargés à chaque demande ;
+  • un verrou par clé évite que deux threads récupèrent la même série.
+
+Chaque série distincte n’est donc téléchargée qu’une fois par processus.
+
+Granularité : l’API REST accepte `daily` et `monthly`. `pick_granularity`
+choisit selon la durée demandée et l’usage (vue d’ensemble vs détail/scoring) ;
+`peak_windows` donne les fenêtres quotidiennes à récupérer autour des pics
+d’une série mensuelle.
+
+Fonctions exposées :
+    get_series(site, title, metric, start, end, agent="user", granularity="daily") -> pd.Series
+    pick_granularity(start, end, purpose="overview") -> str
+    peak_windows(series, top=1, radius_days=15) -> list[(start, end)]
+    invalidate(site, titles, since, metrics=("edits",)) -> int
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import threading
+import pandas as pd
+import requests
+import wiki_http
+import score_client
+
+REST_ROOT = "https://wikimedia.org/api/rest_v1/metrics"
+UA = {"User-Agent": "WikiTimeSeries/1.0 (opsci)", "Accept": "application/json"}
+MAX_SERIES = 20_000          # nb max de séries gardées en mémoire (LRU)
+MONTHLY_AFTER_DAYS = 548     # au-delà (~18 mois), vue d’ensemble en mensuel
+SETTLE_DAYS = 2              # jours récents pas encore définitifs côté API (jamais mis en cache)
+
+METRICS = ("pageviews", "edits")
+GRANULARITIES = ("daily", "monthly")
+PURPOSES = ("overview", "detail", "score")
+
+Key = Tuple[str, str, str, str, str]
+
+# ─────────────────────────── helpers ────────────────────────────
+
+def normalize_site(site: str) -> str:
+    """`fr.wikipedia` / `fr.wikipedia.org` → `fr.wikipedia.org`."""
+    site = site.strip().lower()
+    return site if site.endswith(".org") else f"{site}.org"
+
+
+def _day(date: str | datetime) -> pd.Timestamp:
+    return pd.Timestamp(date).normalize().tz_localize(None)
+
+
+def _align(start: pd.Timestamp, end: pd.Timestamp, granularity: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """En mensuel, étend la fenêtre aux mois entiers."""
+    if granularity == "monthly":
+        return start.replace(day=1), end + pd.offsets.MonthEnd(0)
+    return start, end
+
+
+def _settled(granularity: str) -> pd.Timestamp:
+    """Dernier jour dont les données sont définitives (en mensuel : fin du dernier mois complet)."""
+    last = _day(datetime.utcnow()) - timedelta(days=SETTLE_DAYS)
+    if granularity == "monthly":
+        last = (last + timedelta(days=1)).replace(day=1) - timedelta(days=1)
+    return last
+
+
+def _url(site: str, title: str, metric: str, agent: str, granularity: str,
+         start: pd.Timestamp, end: pd.Timestamp) -> str:
+    enc = requests.utils.quote(title.replace(" ", "_"), safe="")
+    a, b = start.strftime("%Y%m%d"), end.strftime("%Y%m%d")
+    if metric == "pageviews":
+        return f"{REST_ROOT}/pageviews/per-article/{site}/all-access/{agent}/{enc}/{granularity}/{a}/{b}"
+    return f"{REST_ROOT}/edits/per-page/{site}/{enc}/{agent}/{granularity}/{a}/{b}"
+
+
+def _fetch(site: str, title: str, metric: str, agent: str, granularity: str,
+           start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+    """Appel REST brut (lève en cas d’erreur HTTP)."""
+    r = wiki_http.get(_url(site, title, metric, agent, granularity, start, end),
+                      headers=UA, timeout=30, wiki=site)
+    if r.status_code == 404:                # aucune donnée sur la période
+        return pd.Series(dtype="int64")
+    r.raise_for_status()
+    items = r.json().get("items", [])
+    if metric == "pageviews":
+        data = {pd.to_datetime(i["timestamp"][:8], format="%Y%m%d"): i["views"] for i in items}
+    else:
+        results = items[0].get("results", []) if items else []
+        key = "count" if results and "count" in results[0] else "edits"
+        data = {_day(x["timestamp"]): x.get(key, 0) for x in results}
+    return pd.Series(data, dtype="int64").sort_index()
+
+
+def _gaps(covered: List[Tuple[pd.Timestamp, pd.Timestamp]],
+          start: pd.Timestamp, end: pd.Timestamp) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Sous-fenêtres de [start, end] non couvertes par `covered` (triée)."""
+    one = timedelta(days=1)
+    gaps, cur = [], start
+    for a, b in covered:
+        if b < cur or a > end:
+            continue
+        if a > cur:
+            gaps.append((cur, a - one))
+        cur = max(cur, b + one)
+        if cur > end:
+            break
+    if cur <= end:
+        gaps.append((cur, end))
+    return gaps
+
+
+def _merge(covered: List[Tuple[pd.Timestamp, pd.Timestamp]]) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    one = timedelta(days=1)
+    out: List[Tuple[pd.Timestamp, pd.Timestamp]] = []
+    for a, b in sorted(covered):
+        if out and a <= out[-1][1] + one:
+            out[-1] = (out[-1][0], max(out[-1][1], b))
+        else:
+            out.append((a, b))
+    return out
+
+# ─────────────────────────── cache ─────────────────────────────
+
+class _Entry:
+    __slots__ = ("series", "covered", "lock")
+
+    def __init__(self):
+        self.series = pd.Series(dtype="int64")
+        self.covered: List[Tuple[pd.Timestamp, pd.Timestamp]] = []
+        self.lock = threading.Lock()
+
+
+_CACHE: "OrderedDict[Key, _Entry]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def _entry(key: Key) -> _Entry:
+    with _CACHE_LOCK:
+        e = _CACHE.get(key)
+        if e is None:
+            e = _CACHE[key] = _Entry()
+            while len(_CACHE) > MAX_SERIES:
+                _CACHE.popitem(last=False)
+        else:
+            _CACHE.move_to_end(key)
+        return e
+
+
+def clear() -> None:
+    """Vide le cache (tests, changement de configuration)."""
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+
+def invalidate(site: str, titles: List[str], since: str | datetime,
+               metrics: Tuple[str, ...] = ("edits",)) -> int:
+    """
+    Oublie, pour ces titres, les points à partir du jour `since` (une
+    modification ne change pas l’historique antérieur) : la prochaine
+    demande ne re-télécharge que cette fin de série. Renvoie le nombre de
+    séries touchées.
+    """
+    site = normalize_site(site)
+    wanted = set(titles)
+    with _CACHE_LOCK:
+        hit = [(k, e) for k, e in _CACHE.items()
+               if k[0] == site and k[1] in wanted and k[2] in metrics]
+    for (*_, granularity), e in hit:
+        cut, _ = _align(_day(since), _day(since), granularity)     # mensuel : tout le mois
+        last = cut - timedelta(days=1)
+        with e.lock:
+            e.series = e.series.loc[:last]
+            e.covered = [(a, min(b, last)) for a, b in e.covered if a < cut]
+    return len(hit)
+
+
+def cache_info() -> Dict[str, int]:
+    with _CACHE_LOCK:
+        return {"series": len(_CACHE), "points": sum(len(e.series) for e in _CACHE.values())}
+
+# ─────────────────────────── granularité ───────────────────────
+
+def pick_granularity(start: str | datetime, end: str | datetime, purpose: str = "overview") -> str:
+    """
+    `overview` (graphique d’ensemble) : mensuel au-delà de MONTHLY_AFTER_DAYS.
+    `detail` (zoom) et `score` (métriques de pic) : toujours quotidien.
+    """
+    if purpose not in PURPOSES:
+        raise ValueError(f"Usage inconnu : {purpose}")
+    if purpose != "overview":
+        return "daily"
+    span = (_day(end) - _day(start)).days
+    return "monthly" if span > MONTHLY_AFTER_DAYS else "daily"
+
+
+def peak_windows(series: pd.Series, top: int = 1, radius_days: int = 15) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Fenêtres [début, fin] à détailler en quotidien autour des `top` plus fortes
+    valeurs d’une série mensuelle (mois entier ± `radius_days`), fusionnées.
+    """
+    if series.empty:
+        return []
+    pad = timedelta(days=radius_days)
+    wins = [
+        (m - pad, m + pd.offsets.MonthEnd(0) + pad)
+        for m in series.nlargest(top).index
+    ]
+    return _merge(wins)
+
+# ─────────────────────────── API publique ──────────────────────
+
+def get_series(
+    site: str,
+    title: str,
+    metric: str,
+    start: str | datetime,
+    end: str | datetime,
+    agent: str = "user",
+    granularity: str = "daily",
+) -> pd.Series:
+    """
+    Série (index : datetime naïf, valeurs : int) pour `metric`
+    ∈ {"pageviews", "edits"}. `agent` = type d’agent (pages vues) ou
+    d’éditeur (éditions). En `monthly`, un point par mois (1er du mois).
+    Lève `requests.HTTPError` si l’API échoue.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Métrique inconnue : {metric}")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularité inconnue : {granularity}")
+    if score_client.enabled():
+        return score_client.get_series(site, title, metric, start, end, agent, granularity)
+    site = normalize_site(site)
+    start, end = _align(_day(start), _day(end), granularity)
+    e = _entry((site, title, metric, agent, granularity))
+    with e.lock:
+        gaps = _gaps(e.covered, start, end)
+        if gaps:
+            parts = [e.series] + [_fetch(site, title, metric, agent, granularity, a, b) for a, b in gaps]
+            parts = [s for s in parts if not s.empty]
+            merged = pd.concat(parts) if parts else pd.Series(dtype="int64")
+            e.series = merged[~merged.index.duplicated(keep="last")].sort_index()
+            settled = _settled(granularity)
+            e.covered = _merge(e.covered + [(a, min(b, settled)) for a, b in gaps if a <= settled])
+        serie = e.series.loc[start:end].copy()
+    serie.name = title
+    return serie
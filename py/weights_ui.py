@@ -0,0 +1,49 @@
+# weights_ui.py
+"""
+Curseurs de pondération du modèle de scoring (`scoring_model`).
+
+Les poids choisis produisent un nouveau `ScoringModel` ; les dashboards
+re-scorent alors les métriques brutes déjà collectées (`score_metrics(...,
+model=…)`) sans relancer la moindre requête.
+"""
+
+from __future__ import annotations
+import streamlit as st
+
+from scoring_model import GROUPS, ScoringModel
+from wikipedia_scoring_pipeline import MODEL
+
+
+def weight_sliders(key: str, model: ScoringModel = MODEL) -> ScoringModel:
+    """Expander de curseurs ; renvoie `model` tel quel si rien n’a bougé."""
+    with st.expander("Pondérations du score"):
+        if st.button("Poids par défaut", key=f"{key}_reset"):
+            for name in model.weights():
+                st.session_state.pop(f"{key}_w_{name}", None)
+        cols = st.columns(len(GROUPS))
+        weights = {}
+        for col, group in zip(cols, GROUPS):
+            col.markdown(f"**{group}**")
+            for name, w in model.weights().items():
+                in_group = name == group or any(s.name == name and s.group == group for s in model.specs)
+                if not in_group:
+                    continue
+                bound = max(1.0, abs(w) * 2)
+                weights[name] = col.slider(
+                    "poids global" if name == group else name,
+                    min_value=-bound, max_value=bound, value=float(w),
+                    step=bound / 100, key=f"{key}_w_{name}",
+                )
+    if weights == model.weights():
+        return model
+    return model.with_weights(**weights)
+
+
+NORMALIZATION_LABELS = {"panel": "Max du panel", "percentile": "Percentiles de référence du wiki"}
+
+
+def normalization_choice(key: str) -> str:
+    return st.radio(
+        "Normalisation", list(NORMALIZATION_LABELS), format_func=NORMALIZATION_LABELS.get,
+        horizontal=True, key=f"{key}_norm",
+    )
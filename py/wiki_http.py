@@ -0,0 +1,273 @@
+# wiki_http.py
+"""
+Couche HTTP commune aux collecteurs Wikipédia / Wikimedia.
+
+Chaque wiki (`fr.wikipedia.org`, `en.wikipedia.org`, …) dispose de :
+  • sa propre `requests.Session` (pool de connexions dédié) ;
+  • son propre budget de requêtes (token bucket, `RATE_PER_WIKI` req/s).
+
+Les appels à l’API REST (`wikimedia.org`) partagent un même hôte pour tous
+les wikis : on passe alors `wiki=` pour imputer la requête au bon budget.
+
+Pour les tests, `WIKI_UPSTREAM=http://127.0.0.1:8900` redirige toutes les
+requêtes vers un serveur bouchon : `https://fr.wikipedia.org/w/api.php`
+devient `http://127.0.0.1:8900/fr.wikipedia.org/w/api.php`.
+
+Latence de queue :
+  • `with deadline(s):` borne toutes les requêtes du bloc (et des blocs
+    imbriqués) ; le timeout de chaque appel est réduit au temps restant et
+    `DeadlineExceeded` est levée une fois l’échéance passée ;
+  • `with page_budget(s):` fixe le budget par page ; les collecteurs
+    entourent chaque page de `with page_scope():` ;
+  • les GET (idempotents) sont doublés (« hedged ») s’ils n’ont pas répondu
+    après le p95 des latences récentes du wiki : la première réponse gagne.
+
+Fonction exposée :
+    get(url, params=None, headers=None, timeout=20, wiki=None) -> requests.Response
+"""
+
+from __future__ import annotations
+from typing import Deque, Dict, Iterator, Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlparse
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+RATE_PER_WIKI = 10.0      # requêtes / seconde / wiki
+BURST_PER_WIKI = 10       # rafale autorisée
+POOL_SIZE = 8             # connexions HTTP max par wiki
+UPSTREAM = os.environ.get("WIKI_UPSTREAM")   # serveur bouchon (tests)
+
+HEDGE = True              # doublement des GET lents
+HEDGE_MIN_DELAY = 0.5     # secondes avant le doublement, au minimum
+HEDGE_SAMPLES = 200       # latences récentes gardées par wiki (p95)
+HEDGE_WORKERS = 32
+
+# ─────────────────────────── rate limiter ───────────────────────
+
+class RateLimiter:
+    """Token bucket thread-safe : `wait()` bloque jusqu’à obtenir un jeton."""
+
+    def __init__(self, rate: float = RATE_PER_WIKI, burst: int = BURST_PER_WIKI):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self, until: Optional[float] = None) -> None:
+        """`until` (horloge monotone) : lève `DeadlineExceeded` plutôt que d’attendre au-delà."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            if until is not None and now + delay > until:
+                raise DeadlineExceeded("échéance dépassée en attente du budget de requêtes")
+            time.sleep(delay)
+
+# ─────────────────────────── pools par wiki ─────────────────────
+
+_SESSIONS: Dict[str, requests.Session] = {}
+_LIMITERS: Dict[str, RateLimiter] = {}
+_LOCK = threading.Lock()
+
+
+def session_for(wiki: str) -> requests.Session:
+    """Session (pool de connexions) dédiée à `wiki`."""
+    with _LOCK:
+        s = _SESSIONS.get(wiki)
+        if s is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _SESSIONS[wiki] = s
+        return s
+
+
+def limiter_for(wiki: str) -> RateLimiter:
+    """Budget de requêtes dédié à `wiki`."""
+    with _LOCK:
+        lim = _LIMITERS.get(wiki)
+        if lim is None:
+            lim = _LIMITERS[wiki] = RateLimiter()
+        return lim
+
+
+def wiki_host(lang: str) -> str:
+    return f"{lang}.wikipedia.org"
+
+
+def _target(url: str) -> str:
+    if not UPSTREAM:
+        return url
+    u = urlparse(url)
+    return f"{UPSTREAM.rstrip('/')}/{u.hostname}{u.path}" + (f"?{u.query}" if u.query else "")
+
+# ─────────────────────────── échéances ─────────────────────────
+
+class DeadlineExceeded(requests.Timeout):
+    """Budget de temps épuisé avant (ou pendant) la requête."""
+
+
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("wiki_http_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Échéance à `seconds` d’ici (None : inchangée) ; l’échéance englobante prime si plus proche."""
+    if seconds is None:
+        yield
+        return
+    outer = _DEADLINE.get()
+    at = time.monotonic() + seconds
+    token = _DEADLINE.set(at if outer is None else min(outer, at))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+_PAGE_BUDGET: ContextVar[Optional[float]] = ContextVar("wiki_http_page_budget", default=None)
+
+
+@contextmanager
+def page_budget(seconds: Optional[float]) -> Iterator[None]:
+    """Budget appliqué à chaque `page_scope()` du bloc (fixé par l’appelant, ex. le pipeline)."""
+    token = _PAGE_BUDGET.set(seconds)
+    try:
+        yield
+    finally:
+        _PAGE_BUDGET.reset(token)
+
+
+def page_scope():
+    """Échéance d’une page : les collecteurs entourent le traitement de chaque page."""
+    return deadline(_PAGE_BUDGET.get())
+
+
+def remaining() -> Optional[float]:
+    """Secondes restantes avant l’échéance courante (None : pas d’échéance)."""
+    at = _DEADLINE.get()
+    return None if at is None else at - time.monotonic()
+
+
+def _budget(timeout: float, at: Optional[float]) -> float:
+    """Timeout réduit au temps restant avant `at` ; lève si `at` est passé."""
+    if at is None:
+        return timeout
+    left = at - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("échéance dépassée")
+    return min(timeout, left)
+
+# ─────────────────────────── hedging ───────────────────────────
+
+_LATENCIES: Dict[str, Deque[float]] = {}
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="wiki-hedge")
+hedge_stats = {"hedged": 0, "hedge_won": 0}
+
+
+def _record(key: str, seconds: float) -> None:
+    with _LOCK:
+        _LATENCIES.setdefault(key, deque(maxlen=HEDGE_SAMPLES)).append(seconds)
+
+
+def _count(stat: str) -> None:
+    with _LOCK:
+        hedge_stats[stat] += 1
+
+
+def _hedge_delay(key: str) -> float:
+    with _LOCK:
+        lat = sorted(_LATENCIES.get(key, ()))
+    if len(lat) < 20:
+        return max(HEDGE_MIN_DELAY, 2.0)        # pas assez d’historique : prudence
+    return max(HEDGE_MIN_DELAY, lat[int(0.95 * (len(lat) - 1))])
+
+
+def _timed_get(key: str, url: str, params, headers, timeout: float,
+               at: Optional[float]) -> requests.Response:
+    limiter_for(key).wait(until=at)
+    t0 = time.monotonic()
+    r = session_for(key).get(url, params=params, headers=headers, timeout=_budget(timeout, at))
+    _record(key, time.monotonic() - t0)
+    return r
+
+
+def _wait_first(futures, at: Optional[float]):
+    """Première réponse réussie parmi `futures`, dans la limite de `at`."""
+    pending, error = set(futures), None
+    while pending:
+        left = None if at is None else max(0.0, at - time.monotonic())
+        done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded("échéance dépassée en attente de réponse")
+        for fut in done:
+            if fut.exception() is None:
+                return fut
+            error = fut.exception()
+    raise error
+
+
+def _hedged_get(key: str, url: str, params, headers, timeout: float,
+                at: Optional[float]) -> requests.Response:
+    first = _HEDGE_POOL.submit(_timed_get, key, url, params, headers, timeout, at)
+    delay = min(_hedge_delay(key), timeout)
+    if at is not None:
+        delay = min(delay, max(0.0, at - time.monotonic()))
+    done, _ = wait([first], timeout=delay)
+    if done or (at is not None and at <= time.monotonic()):
+        return _wait_first([first], at).result()
+    _count("hedged")
+    second = _HEDGE_POOL.submit(_timed_get, key, url, params, headers, timeout, at)
+    winner = _wait_first([first, second], at)
+    if winner is second:
+        _count("hedge_won")
+    return winner.result()
+
+# ─────────────────────────── API publique ──────────────────────
+
+def get(
+    url: str,
+    params: Optional[dict] = None,
+    headers: Optional[dict] = None,
+    timeout: float = 20,
+    wiki: Optional[str] = None,
+) -> requests.Response:
+    """
+    GET soumis au budget du wiki (par défaut : l’hôte de `url`) et à
+    l’échéance courante ; doublé après le p95 du wiki si `HEDGE`.
+    """
+    key = wiki or urlparse(url).hostname or ""
+    at = _DEADLINE.get()
+    _budget(timeout, at)
+    if HEDGE:
+        return _hedged_get(key, _target(url), params, headers, timeout, at)
+    return _timed_get(key, _target(url), params, headers, timeout, at)
+
+
+def post(
+    url: str,
+    data=None,
+    headers: Optional[dict] = None,
+    timeout: float = 20,
+    wiki: Optional[str] = None,
+) -> requests.Response:
+    """POST soumis au budget du wiki et à l’échéance courante (jamais doublé)."""
+    key = wiki or urlparse(url).hostname or ""
+    at = _DEADLINE.get()
+    limiter_for(key).wait(until=at)
+    return session_for(key).post(_target(url), data=data, headers=headers,
+                                 timeout=_budget(timeout, at))
@@ -8,11 +8,23 @@ avec :
 """
 
 from __future__ import annotations
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterable, Iterator, Callable, Optional
+from contextlib import nullcontext
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
+import importlib
 import re
+import sys
+import threading
+import time
+
+import profiling
+import score_client
+import wiki_http
+from scoring_model import ScoringModel
+import reference_dist
 
 # ───────────────────────────  Poids ────────────────────────────
 HEAT_W = {
@@ -40,51 +52,183 @@ GLOB_W = {
 
 ANON_EDIT_FACTOR = 2         # amplification contrôlée de anon_edit
 
+# normaliseur par métrique (cf. scoring_model) ; blacklist_share reste brut
+NORMS = {
+    "pageview_spike":   ("max", 1.0),      # Heat (linéaire relatif)
+    "edit_spike":       ("max", 1.0),
+    "talk_intensity":   ("max", 1.0),
+    "protection_level": ("fixed", 4.0),    # 0–4 → 0–1
+    "citation_gap":     ("max", 1.0),      # DIRECT : plus de gap → plus de pénalité
+    "readability":      ("max", 1.0),      # DIRECT : plus c’est difficile → plus de pénalité
+    "anon_edit":        ("cap", ANON_EDIT_FACTOR),   # amplification contrôlée, capée à 1
+}
+
+MODEL = ScoringModel.from_weights(
+    {"heat": HEAT_W, "quality": QUAL_W, "risk": RISK_W}, GLOB_W, NORMS,
+)
+
 @dataclass
 class ScoringResult:
     heat: pd.Series
     quality: pd.Series
     risk: pd.Series
     sensitivity: pd.Series
+    # True si au moins une métrique de la page manque (échec, échéance) :
+    # les scores de la page sont alors partiels
+    missing: Optional[pd.Series] = None
+
+METRICS = [
+    "pageview_spike", "edit_spike", "talk_intensity", "protection_level",
+    "citation_gap", "readability", "anon_edit", "blacklist_share",
+]
+CHUNK_SIZE = 10              # pages par appel de collecteur (granularité de la progression)
+PAGE_DEADLINE = 20.0         # secondes par page et par métrique
+
+# on_chunk(metric, valeurs_de_la_tranche, nb_pages_faites, nb_pages_total)
+ChunkCallback = Callable[[str, pd.Series, int, int], None]
+
+
+class ScoringCancelled(Exception):
+    """Levée entre deux tranches quand l’événement `cancel` est positionné."""
+
+
+def _collectors(start: str, end: str, lang: str) -> Dict[str, Callable[[List[str]], pd.Series]]:
+    """
+    Collecteur par métrique : liste de pages → Series indexée par page.
+    Le module d’un collecteur n’est importé qu’au premier appel : une
+    collecte limitée à quelques métriques ne charge pas les autres.
+    """
+    calls = {
+        "pageview_spike":   ("pageviews", "get_pageview_spikes",
+                             lambda f, ps: f(ps, start, end, lang)),
+        "edit_spike":       ("edit", "get_edit_spikes",
+                             lambda f, ps: f(ps, start, end, lang)),
+        "talk_intensity":   ("taille_talk", "get_talk_activity",
+                             lambda f, ps: f(ps, lang=lang)),
+        "protection_level": ("protection", "protection_rating",
+                             lambda f, ps: f(ps, lang)["Score"].astype(float)),
+        "citation_gap":     ("ref", "get_citation_gap",
+                             lambda f, ps: f(ps, lang)),
+        "readability":      ("readability", "get_readability_scores",
+                             lambda f, ps: f(ps, lang)),
+        "anon_edit":        ("ano_edit", "get_anon_edit_share",
+                             lambda f, ps: f(ps, start, end, lang)),
+        "blacklist_share":  ("blacklist_metric", "get_blacklist_share",
+                             lambda f, ps: f(ps, None, lang)),
+    }
+    return {m: _lazy(*spec) for m, spec in calls.items()}
+
+
+def _lazy(module: str, name: str, call) -> Callable[[List[str]], pd.Series]:
+    def run(ps: List[str]) -> pd.Series:
+        return call(getattr(importlib.import_module(module), name), ps)
+    return run
+
+
+def collect_metrics(
+    pages: List[str],
+    start: str,
+    end: str,
+    lang: str = "fr",
+    metrics: Optional[List[str]] = None,
+    on_chunk: Optional[ChunkCallback] = None,
+    cancel: Optional[threading.Event] = None,
+    chunk_size: int = CHUNK_SIZE,
+    deadline: Optional[float] = None,
+    page_deadline: Optional[float] = PAGE_DEADLINE,
+) -> pd.DataFrame:
+    """
+    Collecte les métriques brutes, métrique par métrique, par tranches de
+    `chunk_size` pages. `on_chunk` est appelé après chaque tranche (suivi de
+    progression, tables partielles) ; `cancel` interrompt la collecte.
+    Si `WIKI_SCORE_SERVICE` est défini, chaque tranche est collectée par le
+    service (progression, annulation et échéances restent celles-ci).
+
+    Échéances (secondes) : `deadline` pour tout le run, `page_deadline` par
+    page et par métrique. Une valeur qui n’a pu être obtenue à temps (ou
+    dont l’appel a échoué) reste NaN : la page est manquante, pas notée 0.
+    """
+    pages = list(dict.fromkeys(pages))
+    if score_client.enabled():
+        run_at = None if deadline is None else time.monotonic() + deadline
+
+        def collect(m: str, ps: List[str]) -> pd.Series:
+            left = None if run_at is None else max(0.0, run_at - time.monotonic())
+            return score_client.collect_metrics(ps, start, end, lang, [m], deadline=left,
+                                                page_deadline=page_deadline)[m]
+    else:
+        collectors = _collectors(start, end, lang)
+
+        def collect(m: str, ps: List[str]) -> pd.Series:
+            return collectors[m](ps)
+
+    raw: Dict[str, pd.Series] = {}
+    with wiki_http.deadline(deadline), wiki_http.page_budget(page_deadline):
+        for m in metrics or METRICS:
+            parts = []
+            for k in range(0, len(pages), chunk_size):
+                if cancel is not None and cancel.is_set():
+                    raise ScoringCancelled(m)
+                with profiling.stage(f"collect:{m}"):
+                    chunk = collect(m, pages[k:k + chunk_size])
+                parts.append(chunk)
+                if on_chunk is not None:
+                    on_chunk(m, chunk, min(k + chunk_size, len(pages)), len(pages))
+            raw[m] = pd.concat(parts) if parts else pd.Series(dtype=float)
+    return pd.DataFrame(raw, index=pages).apply(pd.to_numeric, errors="coerce")
+
+
+def _update_reference(lang: str, metrics: pd.DataFrame, start: str, end: str) -> None:
+    # une observation par (page, fenêtre) ; stderr : stdout peut porter un flux JSONL (iter_scores)
+    try:
+        reference_dist.STORE.update(lang, metrics, window=(pd.Timestamp(end) - pd.Timestamp(start)).days)
+    except OSError as e:
+        print(f"⚠️  Distributions de référence non enregistrées : {e}", file=sys.stderr)
+
 
 def compute_scores(
     pages: List[str],
     start: str,
     end: str,
-    lang: str = "fr"
+    lang: str = "fr",
+    on_chunk: Optional[ChunkCallback] = None,
+    cancel: Optional[threading.Event] = None,
+    normalization: str = "panel",
+    deadline: Optional[float] = None,
 ) -> Tuple[ScoringResult, pd.DataFrame]:
     """
     Renvoie (ScoringResult, DataFrame des métriques brutes).
+    `normalization` : "panel" (max du lot) ou "percentile" (distributions
+    de référence du wiki, cf. reference_dist). `deadline` : budget du run en
+    secondes ; les pages hors délai sont marquées dans `missing`.
+    Sans `on_chunk` ni `cancel`, délègue tout le run au service de scoring
+    s’il est actif ; sinon la collecte y est déléguée tranche par tranche.
     """
-    from pageviews   import get_pageview_spikes
-    from edit        import get_edit_spikes
-    from taille_talk import get_talk_activity
-    from protection  import protection_rating
-    from ref         import get_citation_gap
-    from readability import get_readability_score
-    from ano_edit    import get_anon_edit_share
-    from blacklist_metric import get_blacklist_share
-
-
-    # extract readability float
-    def _readab(p: str) -> float:
-        txt = get_readability_score([p], lang)
-        m = re.search(r"([0-9]*\.?[0-9]+)", str(txt))
-        return float(m.group(1)) if m else 0.0
-
+    if score_client.enabled() and on_chunk is None and cancel is None:
+        return score_client.compute_scores(pages, start, end, lang, normalization, deadline)
     # 1. Collecte des métriques brutes
-    raw: Dict[str, pd.Series] = {
-        "pageview_spike":   get_pageview_spikes(pages, start, end, lang),
-        "edit_spike":       get_edit_spikes(pages, start, end, lang),
-        "talk_intensity":   get_talk_activity(pages),
-        "protection_level": protection_rating(pages, lang)["Score"].astype(float),
-        "citation_gap":     get_citation_gap(pages),
-        "readability":      pd.Series({p: _readab(p) for p in pages}),
-        "anon_edit":        get_anon_edit_share(pages, start, end, lang),
-        "blacklist_share" : get_blacklist_share(pages, "py/blacklist.csv", lang)
+    metrics = collect_metrics(pages, start, end, lang, on_chunk=on_chunk, cancel=cancel,
+                              deadline=deadline)
+    # 2. Alimentation des distributions de référence
+    _update_reference(lang, metrics, start, end)
+    return score_metrics(metrics, normalization=normalization, lang=lang), metrics
 
-    }
-    metrics = pd.DataFrame(raw).apply(pd.to_numeric, errors="coerce").fillna(0)
+
+def score_metrics(
+    metrics: pd.DataFrame,
+    max_vals: Optional[pd.Series] = None,
+    model: Optional[ScoringModel] = None,
+    normalization: str = "panel",
+    lang: str = "fr",
+) -> ScoringResult:
+    """
+    Normalisation + agrégation à partir des métriques brutes. `max_vals`
+    remplace les maxima du panel (scores provisoires en streaming) ;
+    `model` remplace le modèle par défaut (re-pondération sans re-collecte).
+    En mode "percentile", les métriques normalisées par le max sont
+    remplacées par leur rang dans la distribution de référence de `lang`
+    (celles sans référence suffisante gardent le max du panel).
+    """
     """    
     # ── Normalisation des métriques ─────────────────────────────────────
     # On ramène chaque métrique sur une échelle [0,1] pour pouvoir les
@@ -129,51 +273,141 @@ def compute_scores(
 
         """
     
-    # ── Normalisation Quality corrigée ────────────────────────────
+    model = model or MODEL
+    with profiling.stage("normalize"):
+        if normalization == "percentile":
+            by_max = [s.name for s in model.specs if s.norm == "max"]
+            metrics, ranked = reference_dist.STORE.to_percentiles(metrics, lang, by_max)
+            max_vals = (metrics.max() if max_vals is None else max_vals.copy()).reindex(by_max)
+            max_vals[ranked] = 1.0
+        elif normalization != "panel":
+            raise ValueError(f"normalisation inconnue : {normalization}")
 
-    pos_metrics = ["pageview_spike", "edit_spike", "talk_intensity"]
-    neg_metrics = ["citation_gap", "readability", "blacklist_share"]
+        # ── Normalisation + agrégation vectorisées (scoring_model) ────
+        return model.score(metrics, max_vals)
 
-    max_vals = metrics[[*pos_metrics, *neg_metrics]].max()
-    eps = 1e-9
-    metrics_norm = pd.DataFrame(index=metrics.index)
 
-# dans la boucle de normalisation, remplacez la partie "elif m in neg_metrics" par : 
+def _num(x) -> Optional[float]:
+    # NaN → None : les événements restent du JSON valide
+    return None if pd.isna(x) else float(x)
 
-    for m in metrics.columns:
-        if m in pos_metrics:
-        # Heat (linéaire relatif)
-            metrics_norm[m] = metrics[m] / (max_vals[m] + eps)
-    
-        elif m == "protection_level":
-            metrics_norm[m] = metrics[m] / 4
 
-        elif m == "citation_gap":
-        # DIRECT : plus de gap → plus de pénalité
-            metrics_norm[m] = metrics[m] / (max_vals[m] + eps)
+def _score_rows(scores: ScoringResult, pages: List[str], provisional: bool) -> Iterator[dict]:
+    for p in pages:
+        yield {
+            "type": "score", "page": p, "provisional": provisional,
+            "heat": float(scores.heat[p]), "quality": float(scores.quality[p]),
+            "risk": float(scores.risk[p]), "sensitivity": float(scores.sensitivity[p]),
+            "missing": bool(scores.missing[p]),
+        }
 
-        elif m == "readability":
-        # DIRECT : plus c’est difficile (raw élevé) → plus de pénalité
-            metrics_norm[m] = metrics[m] / (max_vals[m] + eps)
 
-        elif m == "anon_edit":
-        # amplification contrôlée car unique metrique de risque
-            metrics_norm[m] = metrics[m].apply(lambda x: min(1, x * ANON_EDIT_FACTOR))
+def iter_scores(
+    pages: List[str],
+    start: str,
+    end: str,
+    lang: str = "fr",
+    max_workers: int = 8,
+    deadline: Optional[float] = None,
+    page_deadline: Optional[float] = PAGE_DEADLINE,
+) -> Iterator[dict]:
+    """
+    Variante streaming de `compute_scores` : les pages sont collectées en
+    parallèle et les événements sont produits au fil de l’eau :
 
-        else:
-            metrics_norm[m] = metrics[m]
+      • {"type": "raw", "page", "metrics": {...}}      dès qu’une page est complète ;
+      • {"type": "score", "page", "provisional": True, heat, quality, risk, sensitivity}
+        normalisé avec les maxima observés jusque-là ;
+      • {"type": "error", "page", "error"}             si un collecteur échoue ;
+      • puis, une fois toutes les pages reçues, un {"type": "score",
+        "provisional": False, …} par page avec les maxima du panel complet.
 
+    Une métrique hors échéance (`deadline` pour le run, `page_deadline` par
+    page et par métrique) vaut None et la page est marquée `missing`.
+    """
+    pages = list(dict.fromkeys(pages))
+    collectors = _collectors(start, end, lang)
+    run_at = None if deadline is None else time.monotonic() + deadline
 
-    # 3. Agrégation par pondération
-    heat    = (metrics_norm[list(HEAT_W)] * pd.Series(HEAT_W)).sum(axis=1)
-    quality = (metrics_norm[list(QUAL_W)] * pd.Series(QUAL_W)).sum(axis=1)
-    risk    = (metrics_norm[list(RISK_W)] * pd.Series(RISK_W)).sum(axis=1)
+    def one(p: str) -> Dict[str, float]:
+        # thread du pool : l’échéance du run est reportée explicitement
+        left = None if run_at is None else run_at - time.monotonic()
+        out = {}
+        with wiki_http.deadline(left), wiki_http.page_budget(page_deadline):
+            for m in METRICS:
+                out[m] = collectors[m]([p]).get(p, float("nan"))
+        return out
 
-    sens_df = pd.concat([heat, quality, risk], axis=1)
-    sens_df.columns = ["heat", "quality", "risk"]
-    sensitivity = (sens_df * pd.Series(GLOB_W)).sum(axis=1)
+    rows: Dict[str, Dict[str, float]] = {}
+    running_max: Optional[pd.Series] = None
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(one, p): p for p in pages}
+        for fut in as_completed(futures):
+            p = futures[fut]
+            try:
+                raw = fut.result()
+            except Exception as e:
+                yield {"type": "error", "page": p, "error": f"{type(e).__name__}: {e}"}
+                continue
+            row = pd.DataFrame([raw], index=[p]).apply(pd.to_numeric, errors="coerce")
+            rows[p] = row.iloc[0].to_dict()
+            yield {"type": "raw", "page": p, "metrics": {m: _num(v) for m, v in rows[p].items()}}
 
-    return ScoringResult(heat, quality, risk, sensitivity), metrics
+            running_max = row.max() if running_max is None else running_max.combine(row.max(), np.fmax)
+            yield from _score_rows(score_metrics(row, running_max), [p], provisional=True)
+
+    if rows:
+        metrics = pd.DataFrame.from_dict(rows, orient="index")
+        _update_reference(lang, metrics, start, end)
+        yield from _score_rows(score_metrics(metrics), list(metrics.index), provisional=False)
+
+
+def compute_scores_multi(
+    pairs: Iterable[Tuple[str, str]],
+    start: str,
+    end: str,
+    max_wikis: int = 8,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Scoring multi-wikis à partir de paires (lang, titre).
+
+    Les pages sont regroupées par wiki ; chaque lot est calculé par
+    `compute_scores` dans son propre thread. Les wikis tournent donc en
+    parallèle, chacun avec son pool de connexions et son budget de requêtes
+    (`wiki_http`). La normalisation reste relative au lot d’un même wiki.
+
+    Renvoie (scores, métriques brutes), deux DataFrames indexés (lang, page).
+    """
+    groups: Dict[str, List[str]] = {}
+    for lang, title in pairs:
+        titles = groups.setdefault(lang, [])
+        if title not in titles:
+            titles.append(title)
+    if not groups:
+        empty = pd.MultiIndex.from_tuples([], names=["lang", "page"])
+        return pd.DataFrame(index=empty), pd.DataFrame(index=empty)
+
+    with ThreadPoolExecutor(max_workers=min(max_wikis, len(groups))) as pool:
+        futures = {
+            lang: pool.submit(compute_scores, titles, start, end, lang)
+            for lang, titles in groups.items()
+        }
+        results = {lang: fut.result() for lang, fut in futures.items()}
+
+    scores = pd.concat({
+        lang: pd.DataFrame({
+            "heat":        res.heat,
+            "quality":     res.quality,
+            "risk":        res.risk,
+            "sensitivity": res.sensitivity,
+        })
+        for lang, (res, _) in results.items()
+    }, names=["lang", "page"])
+    raw = pd.concat(
+        {lang: detail for lang, (_, detail) in results.items()},
+        names=["lang", "page"],
+    )
+    return scores, raw
 
 # CLI pour tests
 if __name__ == "__main__":
@@ -183,14 +417,69 @@ if __name__ == "__main__":
     ap.add_argument("--start", default="2025-04-21")
     ap.add_argument("--end",   default="2025-05-21")
     ap.add_argument("--lang",  default="fr")
+    ap.add_argument("--multi", action="store_true",
+                    help="Pages au format lang:Titre, scorées par wiki en parallèle")
+    ap.add_argument("--jsonl", action="store_true",
+                    help="Écrit les résultats page par page en JSONL au fil de l’eau")
+    ap.add_argument("--norm", choices=["panel", "percentile"], default="panel",
+                    help="Normalisation : max du panel ou percentiles de référence du wiki")
+    ap.add_argument("--deadline", type=float,
+                    help="Budget du run en secondes (pages hors délai marquées manquantes)")
+    ap.add_argument("--profile", nargs="?", const=str(profiling.PROFILE_ROOT), metavar="DOSSIER",
+                    help="Profil CPU (piles repliées) et mémoire du run, écrit dans DOSSIER")
+    ap.add_argument("--history", metavar="PANEL",
+                    help="Ajoute le run à l’historique Parquet (score_history) sous ce panel")
     ns = ap.parse_args()
 
-    scores, detail = compute_scores(ns.pages, ns.start, ns.end, ns.lang)
-    print("\n### Métriques brutes\n", detail.round(3).to_markdown())
-    final = pd.DataFrame({
-        "heat":       scores.heat.round(3),
-        "quality":    scores.quality.round(3),
-        "risk":       scores.risk.round(3),
-        "sensitivity": scores.sensitivity.round(3)
-    }, index=ns.pages)
-    print("\n### Scores finaux\n", final.to_markdown())
+    def record(lang: str, detail: pd.DataFrame, scores: ScoringResult, normalization: str = "panel"):
+        if ns.history:
+            import score_history
+            score_history.append(ns.history, lang, ns.start, ns.end, detail, scores,
+                                 normalization=normalization)
+
+    profile = profiling.session(ns.profile, "scoring") if ns.profile else nullcontext()
+    with profile:
+        if ns.jsonl:
+            import json
+            raw_rows, final_rows = {}, {}
+            for event in iter_scores(ns.pages, ns.start, ns.end, ns.lang, deadline=ns.deadline):
+                sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+                sys.stdout.flush()
+                if event["type"] == "raw":
+                    raw_rows[event["page"]] = event["metrics"]
+                elif event["type"] == "score" and not event["provisional"]:
+                    final_rows[event["page"]] = event
+            if final_rows:
+                # le run tel que publié : métriques des événements "raw", scores finaux
+                final = pd.DataFrame.from_dict(final_rows, orient="index")
+                detail = pd.DataFrame.from_dict(raw_rows, orient="index").astype(float)
+                record(ns.lang, detail, ScoringResult(
+                    *(final[c].astype(float) for c in ("heat", "quality", "risk", "sensitivity")),
+                    missing=final["missing"].astype(bool)))
+            raise SystemExit(0)
+
+        if ns.multi:
+            pairs = [
+                (m.group(1), m.group(2)) if (m := re.match(r"^([a-z-]{2,12}):(.+)$", p)) else (ns.lang, p)
+                for p in ns.pages
+            ]
+            final, detail = compute_scores_multi(pairs, ns.start, ns.end)
+            print("\n### Métriques brutes\n", detail.round(3).to_markdown())
+            print("\n### Scores finaux\n", final.round(3).to_markdown())
+            for lang in final.index.unique("lang"):          # un run par wiki
+                sub, raw = final.loc[lang], detail.loc[lang]
+                record(lang, raw, ScoringResult(sub["heat"], sub["quality"], sub["risk"],
+                                                sub["sensitivity"], missing=raw.isna().any(axis=1)))
+            raise SystemExit(0)
+
+        scores, detail = compute_scores(ns.pages, ns.start, ns.end, ns.lang,
+                                        normalization=ns.norm, deadline=ns.deadline)
+        print("\n### Métriques brutes\n", detail.round(3).to_markdown())
+        final = pd.DataFrame({
+            "heat":       scores.heat.round(3),
+            "quality":    scores.quality.round(3),
+            "risk":       scores.risk.round(3),
+            "sensitivity": scores.sensitivity.round(3)
+        }, index=ns.pages)
+        print("\n### Scores finaux\n", final.to_markdown())
+        record(ns.lang, detail, scores, ns.norm)